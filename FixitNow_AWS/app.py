@@ -1,21 +1,42 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, current_app, render_template, request, redirect, url_for, session, flash, jsonify, g
+from flask import before_render_template, template_rendered
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 import uuid
-import boto3
-from botocore.exceptions import ClientError
 import json
 from dotenv import load_dotenv
+from markupsafe import Markup
 import logging
-from decimal import Decimal
+import base64
+import binascii
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from functools import partial, wraps
+from werkzeug.local import LocalProxy
+from aws import SETTING_NAMES as AWS_SETTING_NAMES, AWSClients, AWSSettings
+from capacity import capacity_handlers
+from events import StreamLimitReached, create_broker
+from export import csv_stream, decode_checkpoint, ndjson_stream, parallel_scan
+from matching import KEY_FIELDS, MatchingEngine
+from metrics import Instrumentation, server_timing
+from notifications import NotificationDispatcher
+from passwords import HasherBusy, PasswordHasher
+from readiness import ReadinessChecker
+from response_encoding import compress_response, json_provider_class
+from records import Service, User, parse_timestamp, to_attribute
+from usernames import UsernameFilter
+from storage import (
+    ConditionFailed, StorageError, create_storage, user_stats_id,
+    LIST_ATTRIBUTES, OPEN_REQUEST_MARKER, OPEN_REQUESTS_STATS_ID, USER_COUNTS_ID, USER_PAGE_KEYS,
+    CHANGED_AT, VERSION_COUNTER
+)
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
-
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,124 +45,399 @@ logger = logging.getLogger(__name__)
 AWS_REGION = 'us-east-1'
 USERS_TABLE = 'fixitnow_user'
 SERVICES_TABLE = 'fixitnow_service'
-SNS_TOPIC_ARN = "arn:aws:sns:us-east-1:241533142623:fixitnow_topic"
-
-# Initialize AWS clients
-try:
-    dynamodb = boto3.resource('dynamodb', region_name=AWS_REGION)
-    sns_client = boto3.client('sns', region_name=AWS_REGION)
-    
-    users_table = dynamodb.Table(USERS_TABLE)
-    services_table = dynamodb.Table(SERVICES_TABLE)
-    
-    logger.info("AWS services initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize AWS services: {e}")
-    raise
-
-# Helper function to convert float to Decimal for DynamoDB
-def float_to_decimal(value):
-    """Convert float to Decimal for DynamoDB compatibility"""
-    if isinstance(value, float):
-        return Decimal(str(value))
-    return value
+STATS_TABLE = 'fixitnow_stats'
+SNS_TOPIC_ARN = os.getenv('SNS_TOPIC_ARN', "arn:aws:sns:us-east-1:241533142623:fixitnow_topic")
 
-# Helper function to convert datetime to string for DynamoDB
-def serialize_datetime(obj):
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    return obj
-
-# Helper function to convert DynamoDB response to regular dict
-def deserialize_item(item):
-    if not item:
-        return None
+# Storage backend: 'dynamodb' in production, 'memory' for local runs and benchmarks
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'dynamodb')
+
+# /api/available-requests pages through the backlog ranked by priority, then
+# earliest preferred date, then age
+OPEN_REQUESTS_PAGE_SIZE = 50
+OPEN_REQUESTS_MAX_PAGE_SIZE = 100
+
+# Dashboards render the DASHBOARD_PAGE_SIZE most recently updated services and
+# link to older pages; /api/get-services?page= serves the same pages as JSON.
+# Rendered service cards are cached per worker by service_id and updated_at.
+DASHBOARD_PAGE_SIZE = int(os.getenv('DASHBOARD_PAGE_SIZE', '50'))
+# Open work is always shown in full, whatever page of history is on screen
+DASHBOARD_ACTIVE_STATUSES = {
+    'homeowner': ('pending', 'scheduled', 'in_progress'),
+    'service_provider': ('scheduled', 'in_progress')
+}
+DASHBOARD_MAX_PAGE_SIZE = 100
+FRAGMENT_CACHE_SIZE = int(os.getenv('FRAGMENT_CACHE_SIZE', '4096'))
+FRAGMENT_CACHE_TTL = float(os.getenv('FRAGMENT_CACHE_TTL', '3600'))
+
+# Largest list accepted by the /api/batch/* endpoints
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '100'))
+
+# Pending job cards show the description; every other list view leaves it to
+# the /api/services/<service_id> detail view
+OPEN_REQUEST_ATTRIBUTES = LIST_ATTRIBUTES + ('description',)
+# So do providers' active job cards. Their open work is a handful of jobs, so
+# the dashboard reads it with the descriptions rather than one detail view each
+ACTIVE_JOB_ATTRIBUTES = {
+    'homeowner': LIST_ATTRIBUTES,
+    'service_provider': LIST_ATTRIBUTES + ('description',)
+}
+
+# Allowed service status transitions (from -> to). Re-entering scheduled is a
+# reschedule and re-entering completed records a rating.
+SERVICE_TRANSITIONS = {
+    'pending': {'scheduled', 'cancelled'},
+    'scheduled': {'scheduled', 'in_progress', 'cancelled'},
+    'in_progress': {'completed'},
+    'completed': {'completed'}
+}
+# The only fields a completed -> completed change may carry
+RATING_FIELDS = frozenset({'service_id', 'status', 'rating'})
+
+# Polling endpoints are versioned by the change counters on their stats
+# records. A record changed within the settle window gets no ETag, since the
+# index queries behind the list may not reflect that write yet.
+LIST_ETAG_SETTLE_SECONDS = float(os.getenv('LIST_ETAG_SETTLE_SECONDS', '2'))
+
+# /api/get-services?since=<cursor> returns only services updated after the
+# cursor's watermark. The watermark trails the server clock by the overlap so
+# writes that reach the indexes late are picked up by the next sync.
+SYNC_CURSOR_KEYS = ('since', 'user_version', 'open_version')
+DELTA_OVERLAP_SECONDS = float(os.getenv('DELTA_OVERLAP_SECONDS', '5'))
+
+# Admin table exports (/api/admin/export/<table>) are off unless ADMIN_TOKEN
+# is set; callers send it as "Authorization: Bearer <token>". Each export
+# reads EXPORT_SEGMENTS parallel scan segments on EXPORT_SCAN_WORKERS threads
+# and buffers at most EXPORT_BUFFERED_PAGES pages of EXPORT_PAGE_SIZE items.
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+EXPORT_SEGMENTS = int(os.getenv('EXPORT_SEGMENTS', '8'))
+EXPORT_MAX_SEGMENTS = 64
+EXPORT_SCAN_WORKERS = int(os.getenv('EXPORT_SCAN_WORKERS', '4'))
+EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', '500'))
+EXPORT_BUFFERED_PAGES = int(os.getenv('EXPORT_BUFFERED_PAGES', '8'))
+
+# JSON encoding: 'orjson', 'stdlib', or 'auto' (orjson when installed). Text
+# responses of at least COMPRESS_MIN_SIZE bytes are sent brotli- (when the
+# brotli package is installed) or gzip-compressed to clients that accept it.
+JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'auto')
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '5'))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '4'))
+
+# Per-worker user profile cache
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1024'))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '60'))
+
+# Password hashing runs in a small process pool per worker so the KDF does not
+# hold the GIL. PASSWORD_HASH_METHOD uses werkzeug's syntax (scrypt:N:r:p or
+# pbkdf2:sha256:iterations); after changing it, each stored hash is upgraded
+# at the user's next sign-in.
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', '16'))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', '32'))
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '10'))
+
+# /api/check-username answers definite misses from a per-worker Bloom filter
+# of registered usernames, rebuilt from a users table scan on this interval.
+# Misses also read the shared signup counter, at most every
+# USERNAME_FILTER_VERSION_SECONDS, and are looked up while it is ahead of the
+# filter, so another worker's signup is not reported as available.
+USERNAME_FILTER_REFRESH_SECONDS = float(os.getenv('USERNAME_FILTER_REFRESH_SECONDS', '300'))
+USERNAME_FILTER_ERROR_RATE = float(os.getenv('USERNAME_FILTER_ERROR_RATE', '0.01'))
+USERNAME_FILTER_VERSION_SECONDS = float(os.getenv('USERNAME_FILTER_VERSION_SECONDS', '1'))
+
+# /readyz and /health answer from a per-worker background check of storage (one
+# data-plane read across the tables) run every READINESS_INTERVAL seconds. A
+# worker drops out after READINESS_FAILURE_THRESHOLD failures in a row.
+# /livez never touches a dependency.
+READINESS_INTERVAL = float(os.getenv('READINESS_INTERVAL', '10'))
+READINESS_FAILURE_THRESHOLD = int(os.getenv('READINESS_FAILURE_THRESHOLD', '2'))
+
+# Background SNS delivery
+NOTIFICATION_WORKERS = int(os.getenv('NOTIFICATION_WORKERS', '2'))
+NOTIFICATION_QUEUE_SIZE = int(os.getenv('NOTIFICATION_QUEUE_SIZE', '1000'))
+NOTIFICATION_MAX_RETRIES = int(os.getenv('NOTIFICATION_MAX_RETRIES', '3'))
+
+# Server-sent service updates. The in-process broker only reaches streams on
+# the same worker; set EVENT_BROKER_URL=redis://... when running several.
+# Each open stream holds a worker thread, so streams are capped per process
+# and recycled; dashboards fall back to polling when refused.
+EVENT_BROKER_URL = os.getenv('EVENT_BROKER_URL', '')
+EVENT_QUEUE_SIZE = int(os.getenv('EVENT_QUEUE_SIZE', '100'))
+EVENT_STREAM_LIMIT = int(os.getenv('EVENT_STREAM_LIMIT', '8'))
+EVENT_STREAM_MAX_SECONDS = float(os.getenv('EVENT_STREAM_MAX_SECONDS', '300'))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv('EVENT_HEARTBEAT_SECONDS', '15'))
+OPEN_REQUESTS_CHANNEL = 'open'
+
+# Per-route timings of AWS calls, template renders and password hashing are
+# exported at /metrics (Prometheus text format, per worker) and, unless
+# SERVER_TIMING is off, echoed in each response's Server-Timing header. Set
+# METRICS_TOKEN to require "Authorization: Bearer <token>" on /metrics.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes', 'on')
+# DynamoDB capacity accounting: 'reported' (ReturnConsumedCapacity on every
+# call), 'estimated' (sized from the items touched, for local stand-ins that
+# report a fixed cost per call) or 'off'
+DYNAMODB_CAPACITY = os.getenv('DYNAMODB_CAPACITY', 'reported')
+
+# create_app(config) starts from these settings and config overrides any of
+# them. AWS clients are created lazily, once per process, on first use; pool
+# size, timeouts and retries come from AWS_MAX_POOL_CONNECTIONS,
+# AWS_CONNECT_TIMEOUT, AWS_READ_TIMEOUT, AWS_RETRY_MODE, AWS_MAX_ATTEMPTS and
+# AWS_TCP_KEEPALIVE.
+DEFAULT_CONFIG = {
+    'SECRET_KEY': os.getenv('SECRET_KEY', 'your-secret-key-change-in-production'),
+    'AWS_REGION': AWS_REGION,
+    'USERS_TABLE': USERS_TABLE,
+    'SERVICES_TABLE': SERVICES_TABLE,
+    'STATS_TABLE': STATS_TABLE,
+    'STORAGE_BACKEND': STORAGE_BACKEND,
+    'DYNAMODB_CAPACITY': DYNAMODB_CAPACITY,
+    'SNS_TOPIC_ARN': SNS_TOPIC_ARN,
+    'JSON_PROVIDER': JSON_PROVIDER,
+    'COMPRESS_MIN_SIZE': COMPRESS_MIN_SIZE,
+    'COMPRESS_GZIP_LEVEL': COMPRESS_GZIP_LEVEL,
+    'COMPRESS_BROTLI_QUALITY': COMPRESS_BROTLI_QUALITY,
+    'USER_CACHE_SIZE': USER_CACHE_SIZE,
+    'USER_CACHE_TTL': USER_CACHE_TTL,
+    'FRAGMENT_CACHE_SIZE': FRAGMENT_CACHE_SIZE,
+    'FRAGMENT_CACHE_TTL': FRAGMENT_CACHE_TTL,
+    'PASSWORD_HASH_METHOD': PASSWORD_HASH_METHOD,
+    'PASSWORD_SALT_LENGTH': PASSWORD_SALT_LENGTH,
+    'PASSWORD_HASH_WORKERS': PASSWORD_HASH_WORKERS,
+    'PASSWORD_HASH_MAX_PENDING': PASSWORD_HASH_MAX_PENDING,
+    'PASSWORD_HASH_TIMEOUT': PASSWORD_HASH_TIMEOUT,
+    'USERNAME_FILTER_REFRESH_SECONDS': USERNAME_FILTER_REFRESH_SECONDS,
+    'USERNAME_FILTER_ERROR_RATE': USERNAME_FILTER_ERROR_RATE,
+    'USERNAME_FILTER_VERSION_SECONDS': USERNAME_FILTER_VERSION_SECONDS,
+    'READINESS_INTERVAL': READINESS_INTERVAL,
+    'READINESS_FAILURE_THRESHOLD': READINESS_FAILURE_THRESHOLD,
+    'NOTIFICATION_WORKERS': NOTIFICATION_WORKERS,
+    'NOTIFICATION_QUEUE_SIZE': NOTIFICATION_QUEUE_SIZE,
+    'NOTIFICATION_MAX_RETRIES': NOTIFICATION_MAX_RETRIES,
+    'EVENT_BROKER_URL': EVENT_BROKER_URL,
+    'EVENT_QUEUE_SIZE': EVENT_QUEUE_SIZE,
+    'EVENT_STREAM_LIMIT': EVENT_STREAM_LIMIT,
+    'ADMIN_TOKEN': ADMIN_TOKEN,
+    'METRICS_TOKEN': METRICS_TOKEN,
+    'SERVER_TIMING': SERVER_TIMING,
+    **{name: os.environ[name] for name in AWS_SETTING_NAMES if name in os.environ}
+}
+
+# Each app keeps its clients and per-process helpers in
+# app.extensions['fixitnow']. These names resolve to the current app's, so
+# views and helpers use them as plain objects; code that runs on a thread of
+# its own is handed the objects themselves by create_app.
+def app_component(name):
+    return LocalProxy(lambda: current_app.extensions['fixitnow'][name])
+
+instrumentation = app_component('instrumentation')
+aws = app_component('aws')
+storage = app_component('storage')
+user_cache = app_component('user_cache')
+fragment_cache = app_component('fragment_cache')
+password_hasher = app_component('password_hasher')
+readiness = app_component('readiness')
+username_filter = app_component('username_filter')
+notification_dispatcher = app_component('notification_dispatcher')
+event_broker = app_component('event_broker')
+matching_engine = app_component('matching_engine')
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a fixed number of seconds"""
+    
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
     
-    result = {}
-    for key, value in item.items():
-        if isinstance(value, str) and 'T' in value:
-            try:
-                result[key] = datetime.fromisoformat(value)
-            except ValueError:
-                result[key] = value
-        elif isinstance(value, Decimal):
-            result[key] = float(value)
-        else:
-            result[key] = value
-    return result
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Helper functions to turn a LastEvaluatedKey into an opaque API cursor and back
+def encode_cursor(last_key):
+    if not last_key:
+        return None
+    raw = json.dumps(last_key, separators=(',', ':'), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, allowed_keys):
+    """Decode a cursor, raising ValueError if it is malformed or foreign"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if (not isinstance(key, dict) or set(key) != set(allowed_keys)
+            or not all(isinstance(value, str) for value in key.values())):
+        raise ValueError('Invalid cursor')
+    return key
+
+# SNS notification helpers
+def publish_notification(clients, topic_arn, message, subject):
+    """Deliver one notification; the dispatcher's workers call this bound to an app's clients"""
+    if not topic_arn:
+        logger.info(f"SNS disabled, dropping notification: {subject}")
+        return
+    response = clients.client('sns').publish(
+        TopicArn=topic_arn,
+        Message=message,
+        Subject=subject
+    )
+    logger.info(f"SNS notification sent: {response['MessageId']}")
 
-# SNS notification helper
 def send_notification(message, subject="FixItNow Notification"):
+    """Queue an SNS notification for background delivery"""
+    return notification_dispatcher.submit(message, subject)
+
+def user_channel(username):
+    return f"user:{username}"
+
+def service_fields(service, attributes):
+    data = service.to_json()
+    return {key: data[key] for key in attributes if key in data}
+
+def publish_service_event(old_service, new_service):
+    """Push a changed service to everyone whose lists contain it, before or after"""
+    channels = {user_channel(new_service.homeowner)}
+    open_backlog = False
+    for service in (old_service, new_service):
+        if service is None:
+            continue
+        if service.service_provider:
+            channels.add(user_channel(service.service_provider))
+        if service.open_request:
+            open_backlog = True
+    matching_engine.apply(old_service, new_service)
     try:
-        response = sns_client.publish(
-            TopicArn=SNS_TOPIC_ARN,
-            Message=message,
-            Subject=subject
-        )
-        logger.info(f"SNS notification sent: {response['MessageId']}")
-        return True
+        event_broker.publish(channels, {'type': 'service', 'data': service_fields(new_service, LIST_ATTRIBUTES)})
+        # Providers' pending cards also show the description
+        if open_backlog:
+            event_broker.publish([OPEN_REQUESTS_CHANNEL],
+                                 {'type': 'service', 'data': service_fields(new_service, OPEN_REQUEST_ATTRIBUTES)})
     except Exception as e:
-        logger.error(f"Failed to send SNS notification: {e}")
-        return False
+        # Clients still converge through polling
+        logger.error(f"Error publishing event for {new_service.service_id}: {e}")
 
 # Database helper functions
 def get_user_by_username(username):
+    cached = user_cache.get(username)
+    if cached is not None:
+        return cached
+    
     try:
-        response = users_table.get_item(Key={'username': username})
-        return deserialize_item(response.get('Item'))
-    except ClientError as e:
+        user = User.from_item(storage.get_user(username))
+        # Only existing users are cached so a fresh signup is visible on every worker
+        if user:
+            user_cache.set(username, user)
+        return user
+    except StorageError as e:
         logger.error(f"Error getting user {username}: {e}")
         return None
 
 def create_user(username, password, user_type):
+    """Create a user; raises HasherBusy when password hashing is saturated"""
+    with instrumentation.timed('hash'):
+        password_hash = password_hasher.hash(password)
     try:
         user_data = {
             'username': username,
-            'password': generate_password_hash(password),
+            'password': password_hash,
             'user_type': user_type,
             'created_at': datetime.now().isoformat()
         }
         
-        users_table.put_item(
-            Item=user_data,
-            ConditionExpression='attribute_not_exists(username)'
-        )
+        # The backend bumps the user counters in the same write
+        storage.create_user(user_data)
+        user_cache.invalidate(username)
+        username_filter.add(username)
         return True
-    except ClientError as e:
-        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
-            return False  # User already exists
+    except ConditionFailed:
+        user_cache.invalidate(username)
+        username_filter.add(username)
+        return False  # User already exists
+    except StorageError as e:
+        user_cache.invalidate(username)
         logger.error(f"Error creating user {username}: {e}")
         return False
 
+def registered_users(store):
+    """The shared count of signups, bumped in the same write as each new user"""
+    record = store.get_stats([USER_COUNTS_ID]).get(USER_COUNTS_ID) or {}
+    return int(record.get('total_users', 0))
+
+def upgrade_password_hash(user, new_hash):
+    """Store a password re-hashed with the current parameters after a sign-in"""
+    try:
+        storage.update_user_password(user.username, user.password, new_hash)
+        logger.info(f"Upgraded password hash for {user.username}")
+    except ConditionFailed:
+        pass  # Changed elsewhere in the meantime; that hash wins
+    except StorageError as e:
+        # The user stays signed in; the upgrade is retried next time
+        logger.warning(f"Error upgrading password hash for {user.username}: {e}")
+    user_cache.invalidate(user.username)
+
 def get_user_services(username, user_type):
     try:
         if user_type == 'homeowner':
-            response = services_table.scan(
-                FilterExpression='homeowner = :username',
-                ExpressionAttributeValues={':username': username}
-            )
+            items = storage.homeowner_services(username, LIST_ATTRIBUTES)
         else:  # service_provider
-            response = services_table.scan(
-                FilterExpression='service_provider = :username OR (service_provider = :null_val AND #status = :pending)',
-                ExpressionAttributeValues={
-                    ':username': username,
-                    ':null_val': None,
-                    ':pending': 'pending'
-                },
-                ExpressionAttributeNames={'#status': 'status'}
-            )
+            items = storage.provider_services(username, LIST_ATTRIBUTES)
+            items.extend(storage.open_requests(attributes=LIST_ATTRIBUTES)[0])
         
-        services = []
-        for item in response.get('Items', []):
-            services.append(deserialize_item(item))
-        
-        return services
-    except ClientError as e:
+        return [Service.from_item(item) for item in items]
+    except StorageError as e:
         logger.error(f"Error getting services for {username}: {e}")
         return []
 
+def get_dashboard_page(user, page=None, limit=DASHBOARD_PAGE_SIZE):
+    """One page of the user's services, newest change first, and the cursor of the next.
+    
+    Raises ValueError for a cursor that is malformed or belongs to someone else.
+    """
+    start_key = None
+    if page:
+        start_key = decode_cursor(page, USER_PAGE_KEYS[user.user_type])
+        if start_key[user.user_type] != user.username:
+            raise ValueError('Invalid cursor')
+    items, last_key = storage.user_services_page(user.user_type, user.username, limit, start_key, LIST_ATTRIBUTES)
+    return [Service.from_item(item) for item in items], encode_cursor(last_key)
+
+def load_open_backlog():
+    """Every open request with the backlog version it reflects and whether that had settled"""
+    versions, settled = read_list_versions([OPEN_REQUESTS_STATS_ID])
+    items, _ = storage.open_requests(attributes=OPEN_REQUEST_ATTRIBUTES)
+    version = versions[OPEN_REQUESTS_STATS_ID] if versions else None
+    return [Service.from_item(item) for item in items], version, settled
+
 def create_service_request(homeowner, service_type, priority, description, preferred_date=None):
     try:
         service_id = f"service_{str(uuid.uuid4())[:8]}"
@@ -149,7 +445,6 @@ def create_service_request(homeowner, service_type, priority, description, prefe
         service_request = {
             'service_id': service_id,
             'homeowner': homeowner,
-            'service_provider': None,
             'service': f"{service_type.title()} Service Request",
             'service_type': service_type,
             'priority': priority,
@@ -158,13 +453,16 @@ def create_service_request(homeowner, service_type, priority, description, prefe
             'start_date': None,
             'cost': None,
             'status': 'pending',
+            'open_request': OPEN_REQUEST_MARKER,
             'duration': None,
             'rating': None,
             'created_at': datetime.now().isoformat(),
             'updated_at': datetime.now().isoformat()
         }
         
-        services_table.put_item(Item=service_request)
+        # Write the request together with the homeowner's and the backlog's stats
+        storage.put_service(service_request)
+        publish_service_event(None, Service.from_item(service_request))
         
         # Send notification
         send_notification(
@@ -173,80 +471,418 @@ def create_service_request(homeowner, service_type, priority, description, prefe
         )
         
         return service_id
-    except ClientError as e:
+    except StorageError as e:
         logger.error(f"Error creating service request: {e}")
         return None
 
-def update_service_status(service_id, status, **kwargs):
+class TransitionError(Exception):
+    """A service status change was rejected; http_status says why"""
+    
+    def __init__(self, message, http_status=409, current=None):
+        super().__init__(message)
+        self.http_status = http_status
+        self.current = current
+
+def build_status_change(old_service, status, **kwargs):
+    """The stored image of old_service after a transition to status.
+    
+    Raises TransitionError when the transition is not allowed.
+    """
+    old_status = old_service.get('status')
+    if status not in SERVICE_TRANSITIONS.get(old_status, ()):
+        raise TransitionError(f"Cannot change a {old_status} service to {status}", 400, Service.from_item(old_service))
+    
+    new_service = dict(old_service, status=status, updated_at=datetime.now().isoformat())
+    for key, value in kwargs.items():
+        if value is not None:
+            new_service[key] = to_attribute(value)
+    
+    # Assigned or closed requests drop out of the sparse open-requests index
+    if status != 'pending':
+        new_service.pop('open_request', None)
+    return new_service
+
+def status_notification(old_service, new_service):
+    """(subject, message) announcing a transition, or None for transitions nobody is told about"""
+    old_status = old_service.get('status')
+    status = new_service.get('status')
+    homeowner = new_service.get('homeowner', 'Unknown')
+    service_provider = new_service.get('service_provider', 'Unknown')
+    
+    if status == 'scheduled' and old_status == 'pending':
+        return "Service Request Accepted", f"Service request accepted by {service_provider} for homeowner {homeowner}"
+    if status == 'completed' and old_status != 'completed':
+        return "Service Completed", f"Service completed by {service_provider} for homeowner {homeowner}"
+    return None
+
+def lost_race_error(error):
+    """TransitionError for a ConditionFailed raised by a service write"""
+    latest = Service.from_item(error.current)
+    if latest is None:
+        return TransitionError('Service no longer exists', 404)
+    return TransitionError(f"Service was changed concurrently and is now {latest.status}", 409, latest)
+
+def update_service_status(service_id, status, current=None, **kwargs):
+    """Apply one allowed status transition as a single conditional write.
+    
+    current is the caller's copy of the service; it is only read from the
+    table when omitted. Returns (old_service, new_service), None if the
+    service does not exist or the write failed, and raises TransitionError
+    when the transition is not allowed or another writer got there first.
+    """
     try:
-        # Get current service
-        response = services_table.get_item(Key={'service_id': service_id})
-        if 'Item' not in response:
-            return False
-        
-        # Prepare update expression
-        update_expression = "SET #status = :status, updated_at = :updated_at"
-        expression_values = {
-            ':status': status,
-            ':updated_at': datetime.now().isoformat()
-        }
-        expression_names = {'#status': 'status'}
+        if current is None:
+            old_service = storage.get_service(service_id)
+            if old_service is None:
+                return None
+        else:
+            old_service = current.to_item()
         
-        # Add additional fields
-        for key, value in kwargs.items():
-            if value is not None:
-                placeholder = f":{key}"
-                
-                # Handle reserved keywords by adding them to ExpressionAttributeNames
-                if key in ['duration', 'status', 'count', 'size', 'timestamp', 'type']:
-                    # Use a placeholder for the attribute name
-                    attr_name = f"#{key}"
-                    expression_names[attr_name] = key
-                    update_expression += f", {attr_name} = {placeholder}"
-                else:
-                    update_expression += f", {key} = {placeholder}"
-                
-                if isinstance(value, datetime):
-                    expression_values[placeholder] = value.isoformat()
-                elif isinstance(value, float):
-                    # Convert float to Decimal for DynamoDB
-                    expression_values[placeholder] = Decimal(str(value))
-                else:
-                    expression_values[placeholder] = value
+        new_service = build_status_change(old_service, status, **kwargs)
         
-        services_table.update_item(
-            Key={'service_id': service_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_values,
-            ExpressionAttributeNames=expression_names
-        )
+        # One round trip: the backend only applies the change if the service is
+        # still exactly what old_service describes, which also keeps the stats
+        # deltas computed from it correct. Losers get the winning image back.
+        storage.update_service(old_service, new_service)
+        old_record, new_record = Service.from_item(old_service), Service.from_item(new_service)
+        publish_service_event(old_record, new_record)
         
         # Send notification for status changes
-        service = deserialize_item(response['Item'])
-        homeowner = service.get('homeowner', 'Unknown')
-        service_provider = service.get('service_provider', 'Unknown')
-        
-        if status == 'scheduled':
-            send_notification(
-                f"Service request accepted by {service_provider} for homeowner {homeowner}",
-                "Service Request Accepted"
-            )
-        elif status == 'completed':
-            send_notification(
-                f"Service completed by {service_provider} for homeowner {homeowner}",
-                "Service Completed"
-            )
+        notification = status_notification(old_service, new_service)
+        if notification:
+            subject, message = notification
+            send_notification(message, subject)
         
-        return True
-    except ClientError as e:
+        return old_record, new_record
+    except ConditionFailed as e:
+        raise lost_race_error(e)
+    except StorageError as e:
         logger.error(f"Error updating service {service_id}: {e}")
-        return False
+        return None
+
+def update_service_statuses(changes):
+    """Apply several transitions with batched writes and coalesced notifications.
+    
+    changes holds (old_service, status, fields) tuples, old_service as stored.
+    Returns, in order, an (old_service, new_service) pair or a TransitionError
+    for each change. Notifications go out as one SNS message per subject.
+    """
+    results = [None] * len(changes)
+    writes = []
+    for index, (old_service, status, fields) in enumerate(changes):
+        try:
+            writes.append((index, old_service, build_status_change(old_service, status, **fields)))
+        except TransitionError as e:
+            results[index] = e
+    
+    outcomes = storage.update_services([(old, new) for _, old, new in writes]) if writes else []
+    notifications = {}
+    for (index, old_service, new_service), outcome in zip(writes, outcomes):
+        if isinstance(outcome, ConditionFailed):
+            results[index] = lost_race_error(outcome)
+        elif outcome is not None:
+            logger.error(f"Error updating service {new_service['service_id']}: {outcome}")
+            results[index] = TransitionError('Failed to update service', 500)
+        else:
+            old_record, new_record = Service.from_item(old_service), Service.from_item(new_service)
+            publish_service_event(old_record, new_record)
+            results[index] = (old_record, new_record)
+            notification = status_notification(old_service, new_service)
+            if notification:
+                notifications.setdefault(notification[0], []).append(notification[1])
+    
+    for subject, messages in notifications.items():
+        if len(messages) > 1:
+            subject = f"{subject} ({len(messages)})"
+        send_notification('\n'.join(messages), subject)
+    return results
+
+def prepare_status_update(user, service, data):
+    """Authorize one /api/update-service-status change and parse its fields.
+    
+    Returns (status, update_fields); raises TransitionError carrying the
+    response status when the user may not make the change or a field is bad.
+    """
+    new_status = data.get('status')
+    
+    # Authorization checks
+    if new_status == 'scheduled' and service.status == 'pending':
+        if user.user_type != 'service_provider':
+            raise TransitionError('Only service providers can accept requests', 403)
+    elif user.user_type == 'homeowner' and service.homeowner != user.username:
+        raise TransitionError('Permission denied', 403)
+    elif user.user_type == 'service_provider' and service.service_provider != user.username:
+        if not (service.status == 'pending' and service.service_provider is None):
+            raise TransitionError('Permission denied', 403)
+    
+    # Re-entering completed only records a rating; cost and duration were
+    # settled when the job was completed
+    if new_status == 'completed' and service.status == 'completed':
+        fields = sorted(key for key, value in data.items() if key not in RATING_FIELDS and value)
+        if fields:
+            raise TransitionError(f"A completed service only accepts a rating, not {', '.join(fields)}", 400)
+        if not data.get('rating'):
+            raise TransitionError('Rating is required', 400)
+    
+    update_fields = {}
+    if data.get('cost'):
+        try:
+            update_fields['cost'] = float(data['cost'])
+        except (TypeError, ValueError):
+            raise TransitionError('Invalid cost value', 400)
+    
+    if data.get('rating'):
+        try:
+            rating = int(data['rating'])
+        except (TypeError, ValueError):
+            raise TransitionError('Invalid rating value', 400)
+        if not 1 <= rating <= 5:
+            raise TransitionError('Rating must be between 1 and 5', 400)
+        update_fields['rating'] = rating
+    
+    if data.get('start_date'):
+        try:
+            update_fields['start_date'] = datetime.strptime(data['start_date'], '%Y-%m-%d %H:%M')
+        except (TypeError, ValueError):
+            raise TransitionError('Invalid start_date format. Use YYYY-MM-DD HH:MM', 400)
+    
+    # Set service provider for pending requests
+    if new_status == 'scheduled' and service.status == 'pending':
+        update_fields['service_provider'] = user.username
+    
+    # Calculate duration when the job is completed, not when it is rated
+    if new_status == 'completed' and service.status == 'in_progress' and service.start_date:
+        update_fields['duration'] = hours_since(service.start_date)
+    
+    return new_status, update_fields
+
+def prepare_completion(user, service, data):
+    """Authorize one /api/complete-service call and parse its fields; raises TransitionError"""
+    if service.service_provider != user.username:
+        raise TransitionError('Permission denied', 403)
+    
+    if service.status != 'in_progress':
+        raise TransitionError('Service must be in progress to complete', 400)
+    
+    update_fields = {}
+    
+    if data.get('cost'):
+        try:
+            # Convert to float first, then it will be converted to Decimal in update_service_status
+            update_fields['cost'] = float(data['cost'])
+        except (TypeError, ValueError):
+            raise TransitionError('Invalid cost value', 400)
+    
+    if data.get('notes'):
+        update_fields['completion_notes'] = data['notes']
+    
+    # Calculate duration
+    if service.start_date:
+        update_fields['duration'] = hours_since(service.start_date)
+    
+    return update_fields
+
+def hours_since(timestamp):
+    try:
+        return (datetime.now() - parse_timestamp(timestamp)).total_seconds() / 3600
+    except Exception as e:
+        logger.error(f"Error calculating duration: {e}")
+        return None
+
+def read_batch(key):
+    """The list of batch entries under key, or an error response"""
+    data = request.get_json(silent=True) or {}
+    entries = data.get(key)
+    if not isinstance(entries, list) or not entries:
+        return None, (jsonify({'error': f"{key} must be a non-empty list"}), 400)
+    if len(entries) > BATCH_MAX_ITEMS:
+        return None, (jsonify({'error': f"At most {BATCH_MAX_ITEMS} {key} per request"}), 400)
+    return entries, None
+
+def run_batch(entries, prepare):
+    """Shared body of the batch endpoints.
+    
+    Every service is read with one batch get, prepare(service, entry) checks
+    and parses each entry into (status, fields), and the accepted changes are
+    written by update_service_statuses. Returns the JSON response with one
+    result per entry, in order.
+    """
+    results = [None] * len(entries)
+    seen = set()
+    for index, entry in enumerate(entries):
+        service_id = entry.get('service_id') if isinstance(entry, dict) else None
+        if not service_id or not isinstance(service_id, str):
+            results[index] = TransitionError('service_id is required', 400)
+        elif service_id in seen:
+            # Two writes to one item cannot share a transaction
+            results[index] = TransitionError('Duplicate service_id in batch', 400)
+        else:
+            seen.add(service_id)
+    
+    try:
+        services = storage.get_services(seen) if seen else {}
+    except StorageError as e:
+        logger.error(f"Error reading services for batch: {e}")
+        return jsonify({'error': 'Failed to read services'}), 500
+    
+    changes, positions = [], []
+    for index, entry in enumerate(entries):
+        if results[index] is not None:
+            continue
+        item = services.get(entry['service_id'])
+        if item is None:
+            results[index] = TransitionError('Service not found', 404)
+            continue
+        try:
+            status, fields = prepare(Service.from_item(item), entry)
+        except TransitionError as e:
+            results[index] = e
+            continue
+        changes.append((item, status, fields))
+        positions.append(index)
+    
+    for index, outcome in zip(positions, update_service_statuses(changes)):
+        results[index] = outcome
+    
+    items = []
+    for entry, result in zip(entries, results):
+        item = {'service_id': entry.get('service_id') if isinstance(entry, dict) else None}
+        if isinstance(result, TransitionError):
+            item.update(success=False, error=str(result), status=result.http_status)
+        else:
+            item.update(success=True, service=result[1].to_json())
+        items.append(item)
+    succeeded = sum(1 for item in items if item['success'])
+    return jsonify({'results': items, 'succeeded': succeeded, 'failed': len(items) - succeeded})
+
+def get_dashboard_stats(user):
+    """The stat cards of the user's dashboard and the list versions they were read at.
+    
+    Reads the user's stats record and the open-request counter in one batch;
+    versions is None when they cannot be read.
+    """
+    stat_id = user_stats_id(user.username)
+    try:
+        records = storage.get_stats([stat_id, OPEN_REQUESTS_STATS_ID])
+        versions = {sid: str(records.get(sid, {}).get(VERSION_COUNTER, 0)) for sid in dashboard_stat_ids(user)}
+    except StorageError as e:
+        logger.error(f"Error getting dashboard stats for {user.username}: {e}")
+        records, versions = {}, None
+    user_stats = records.get(stat_id) or {}
+    
+    stats = {'active': sum(int(user_stats.get(status, 0)) for status in DASHBOARD_ACTIVE_STATUSES[user.user_type])}
+    if user.user_type == 'homeowner':
+        stats.update({
+            'total_requests': int(user_stats.get('total_requests', 0)),
+            'in_progress': int(user_stats.get('in_progress', 0)),
+            'completed': int(user_stats.get('completed', 0)),
+            'scheduled': int(user_stats.get('scheduled', 0))
+        })
+    else:
+        stats.update({
+            'pending': int((records.get(OPEN_REQUESTS_STATS_ID) or {}).get('count', 0)),
+            'in_progress': int(user_stats.get('in_progress', 0)),
+            'completed': int(user_stats.get('completed', 0)),
+            'total_earnings': float(user_stats.get('total_earnings', 0))
+        })
+    return stats, versions
+
+def dashboard_stat_ids(user):
+    """Stats records whose versions cover the user's /api/get-services list"""
+    stat_ids = [user_stats_id(user.username)]
+    if user.user_type == 'service_provider':
+        stat_ids.append(OPEN_REQUESTS_STATS_ID)
+    return stat_ids
+
+def read_list_versions(stat_ids):
+    """Change counters of the given stats records and whether all have settled.
+    
+    Returns (None, False) when the stats cannot be read.
+    """
+    try:
+        records = storage.get_stats(stat_ids)
+    except StorageError as e:
+        logger.error(f"Error reading list versions: {e}")
+        return None, False
+    
+    now = time.time()
+    versions = {}
+    settled = True
+    for stat_id in stat_ids:
+        record = records.get(stat_id, {})
+        versions[stat_id] = str(record.get(VERSION_COUNTER, 0))
+        if now - float(record.get(CHANGED_AT, 0)) < LIST_ETAG_SETTLE_SECONDS:
+            settled = False
+    return versions, settled
+
+def list_etag(versions, settled, *parts):
+    """ETag for a list built from the given record versions, or None if unsettled"""
+    if not settled:
+        return None
+    for stat_id in sorted(versions):
+        parts += (stat_id, versions[stat_id])
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+def sync_cursor(user, versions):
+    if versions is None:
+        return None
+    return encode_cursor({
+        'since': (datetime.now() - timedelta(seconds=DELTA_OVERLAP_SECONDS)).isoformat(),
+        'user_version': versions[user_stats_id(user.username)],
+        'open_version': versions.get(OPEN_REQUESTS_STATS_ID, '')
+    })
+
+def get_service_changes(user, cursor):
+    """Services on the user's dashboard updated after the cursor.
+    
+    Returns (services, open_ids, next_cursor). When the open backlog changed,
+    open_ids lists every open request so providers can drop the ones taken
+    by someone else; otherwise it is None. Unchanged versions short-circuit
+    to an empty delta after a single stats read. Raises ValueError for a bad
+    cursor.
+    """
+    state = decode_cursor(cursor, SYNC_CURSOR_KEYS)
+    versions, settled = read_list_versions(dashboard_stat_ids(user))
+    if versions is None:
+        raise StorageError('List versions unavailable')
+    
+    is_provider = user.user_type == 'service_provider'
+    user_changed = not settled or state['user_version'] != versions[user_stats_id(user.username)]
+    open_changed = is_provider and (not settled or state['open_version'] != versions[OPEN_REQUESTS_STATS_ID])
+    if not user_changed and not open_changed:
+        return [], None, cursor
+    
+    next_cursor = sync_cursor(user, versions)
+    items = []
+    if user_changed:
+        if is_provider:
+            items = storage.provider_services(user.username, LIST_ATTRIBUTES, since=state['since'])
+        else:
+            items = storage.homeowner_services(user.username, LIST_ATTRIBUTES, since=state['since'])
+    
+    open_ids = None
+    if open_changed:
+        items.extend(storage.open_requests(attributes=LIST_ATTRIBUTES, created_after=state['since'])[0])
+        open_ids = [item['service_id'] for item in storage.open_requests(attributes=('service_id',))[0]]
+    
+    return [Service.from_item(item) for item in items], open_ids, next_cursor
+
+def list_response(etag, build):
+    """Answer If-None-Match with 304 before the list is even queried"""
+    # Weak comparison: compressed responses carry the ETag as W/"..."
+    if etag and request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 def get_service_by_id(service_id):
     try:
-        response = services_table.get_item(Key={'service_id': service_id})
-        return deserialize_item(response.get('Item'))
-    except ClientError as e:
+        return Service.from_item(storage.get_service(service_id))
+    except StorageError as e:
         logger.error(f"Error getting service {service_id}: {e}")
         return None
 
@@ -302,13 +938,11 @@ def initialize_sample_data():
         
         for service in sample_services:
             try:
-                services_table.put_item(
-                    Item=service,
-                    ConditionExpression='attribute_not_exists(service_id)'
-                )
-            except ClientError as e:
-                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
-                    logger.error(f"Error creating sample service: {e}")
+                storage.put_service(service, if_absent=True)
+            except ConditionFailed:
+                pass
+            except StorageError as e:
+                logger.error(f"Error creating sample service: {e}")
         
         logger.info("Sample data initialized successfully")
     except Exception as e:
@@ -319,9 +953,18 @@ def is_signed_in():
     return 'user_id' in session
 
 def get_current_user():
-    if is_signed_in():
-        return get_user_by_username(session['user_id'])
-    return None
+    if not is_signed_in():
+        return None
+    
+    # Memoize per request: routes and the inject_user context processor share one lookup
+    username = session['user_id']
+    memo = g.get('current_user_memo')
+    if memo is not None and memo[0] == username:
+        return memo[1]
+    
+    user = get_user_by_username(username)
+    g.current_user_memo = (username, user)
+    return user
 
 def require_signin():
     def decorator(f):
@@ -334,27 +977,203 @@ def require_signin():
         return wrapper
     return decorator
 
+class Views:
+    """Routes, hooks and template helpers, registered on each app create_app builds.
+    
+    The decorators mirror Flask's. Endpoints keep their function names, so
+    url_for('signin') works unchanged in views and templates.
+    """
+    
+    def __init__(self):
+        self._registrations = []
+    
+    def _decorator(self, method, *args, **kwargs):
+        def decorator(f):
+            self._registrations.append(lambda app: getattr(app, method)(*args, **kwargs)(f))
+            return f
+        return decorator
+    
+    def _hook(self, method, f):
+        self._registrations.append(lambda app: getattr(app, method)(f))
+        return f
+    
+    def route(self, rule, **options):
+        return self._decorator('route', rule, **options)
+    
+    def template_filter(self, name):
+        return self._decorator('template_filter', name)
+    
+    def template_global(self):
+        return self._decorator('template_global')
+    
+    def before_request(self, f):
+        return self._hook('before_request', f)
+    
+    def after_request(self, f):
+        return self._hook('after_request', f)
+    
+    def context_processor(self, f):
+        return self._hook('context_processor', f)
+    
+    def register(self, app):
+        for registration in self._registrations:
+            registration(app)
+
+views = Views()
+
+def in_app_context(app, f):
+    """f wrapped to run inside app's context, for callbacks made from helper threads"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        with app.app_context():
+            return f(*args, **kwargs)
+    return wrapper
+
+def create_app(config=None):
+    """Build the app with its AWS clients, storage and per-process helpers.
+    
+    Settings are DEFAULT_CONFIG updated with config. Nothing connects to AWS
+    here, so an app built before gunicorn forks is safe to share: each worker
+    makes its own clients on first use.
+    """
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    if config:
+        app.config.update(config)
+    settings = app.config
+    
+    instrumentation = Instrumentation()
+    aws = AWSClients(settings['AWS_REGION'], AWSSettings.from_mapping(settings), event_handlers=(
+        instrumentation.botocore_handlers()
+        + capacity_handlers(instrumentation.record_capacity, settings['DYNAMODB_CAPACITY'])))
+    storage = create_storage(settings['STORAGE_BACKEND'], aws, settings['USERS_TABLE'],
+                             settings['SERVICES_TABLE'], settings['STATS_TABLE'])
+    
+    app.json_provider_class = json_provider_class(settings['JSON_PROVIDER'])
+    app.json = app.json_provider_class(app)
+    
+    # The checker, filter, dispatcher and engine call back from threads of
+    # their own, outside any request, so they get storage and aws directly
+    app.extensions['fixitnow'] = {
+        'instrumentation': instrumentation,
+        'aws': aws,
+        'storage': storage,
+        'user_cache': TTLCache(settings['USER_CACHE_SIZE'], settings['USER_CACHE_TTL']),
+        'fragment_cache': TTLCache(settings['FRAGMENT_CACHE_SIZE'], settings['FRAGMENT_CACHE_TTL']),
+        'password_hasher': PasswordHasher(
+            method=settings['PASSWORD_HASH_METHOD'],
+            salt_length=settings['PASSWORD_SALT_LENGTH'],
+            workers=settings['PASSWORD_HASH_WORKERS'],
+            max_pending=settings['PASSWORD_HASH_MAX_PENDING'],
+            wait_timeout=settings['PASSWORD_HASH_TIMEOUT']
+        ),
+        'readiness': ReadinessChecker(
+            {'storage': storage.check_health},
+            interval=settings['READINESS_INTERVAL'],
+            failure_threshold=settings['READINESS_FAILURE_THRESHOLD']
+        ),
+        'username_filter': UsernameFilter(
+            storage.scan_usernames,
+            refresh_seconds=settings['USERNAME_FILTER_REFRESH_SECONDS'],
+            error_rate=settings['USERNAME_FILTER_ERROR_RATE'],
+            load_version=partial(registered_users, storage),
+            version_seconds=settings['USERNAME_FILTER_VERSION_SECONDS']
+        ),
+        'notification_dispatcher': NotificationDispatcher(
+            partial(publish_notification, aws, settings['SNS_TOPIC_ARN']),
+            workers=settings['NOTIFICATION_WORKERS'],
+            queue_size=settings['NOTIFICATION_QUEUE_SIZE'],
+            max_retries=settings['NOTIFICATION_MAX_RETRIES']
+        ).register_atexit(),
+        'event_broker': create_broker(settings['EVENT_BROKER_URL'], settings['EVENT_QUEUE_SIZE'],
+                                      max_subscriptions=settings['EVENT_STREAM_LIMIT']),
+        # Ranks the backlog for /api/available-requests; see matching.py
+        'matching_engine': MatchingEngine(in_app_context(app, load_open_backlog),
+                                          settle_seconds=LIST_ETAG_SETTLE_SECONDS)
+    }
+    
+    views.register(app)
+    before_render_template.connect(on_template_start, app)
+    template_rendered.connect(on_template_rendered, app)
+    return app
+
+@views.before_request
+def start_timings():
+    # The rule, not the path, so each route is one series however many ids it sees
+    instrumentation.start(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@views.after_request
+def record_timings(response):
+    # Registered before compress, so it runs after it and times it too
+    timings = instrumentation.finish(request.method, response.status_code)
+    if timings is not None and current_app.config['SERVER_TIMING']:
+        response.headers['Server-Timing'] = server_timing(timings)
+    return response
+
+def on_template_start(sender, template, context, **extra):
+    instrumentation.template_started(template)
+
+def on_template_rendered(sender, template, context, **extra):
+    instrumentation.template_rendered(template)
+
+@views.after_request
+def compress(response):
+    config = current_app.config
+    compress_response(response, request.accept_encodings, config['COMPRESS_MIN_SIZE'],
+                      config['COMPRESS_GZIP_LEVEL'], config['COMPRESS_BROTLI_QUALITY'])
+    return response
+
 # Main routes
-@app.route('/')
+@views.route('/')
 def home():
     user = get_current_user()
     return render_template('home.html', user=user)
 
-@app.route('/health')
+@views.route('/health')
 def health_check():
-    try:
-        # Test DynamoDB connection
-        users_table.describe_table()
-        services_table.describe_table()
-        return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()}), 200
-    except Exception as e:
-        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+    # The cached background check; probes never reach AWS themselves
+    ready, details = readiness.status()
+    return jsonify({
+        'status': 'healthy' if ready else 'unhealthy',
+        'timestamp': datetime.now().isoformat(),
+        'readiness': details,
+        'notifications': notification_dispatcher.stats(),
+        'password_hashing': password_hasher.stats(),
+        'username_filter': username_filter.stats(),
+        'matching': matching_engine.stats()
+    }), 200 if ready else 503
+
+@views.route('/livez')
+def livez():
+    """Liveness: the worker is serving requests"""
+    return jsonify({'status': 'ok'})
+
+@views.route('/readyz')
+def readyz():
+    """Readiness for load balancers, from the last background check"""
+    ready, details = readiness.status()
+    details['status'] = 'ready' if ready else 'not ready'
+    response = jsonify(details)
+    response.status_code = 200 if ready else 503
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
-@app.route('/signin', methods=['GET', 'POST'])
+@views.route('/metrics')
+def metrics():
+    """Prometheus metrics for this worker process"""
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            return jsonify({'error': 'Metrics token required'}), 401
+    return current_app.response_class(instrumentation.render(), content_type='text/plain; version=0.0.4; charset=utf-8',
+                              headers={'Cache-Control': 'no-store'})
+
+@views.route('/signin', methods=['GET', 'POST'])
 def signin():
     if is_signed_in():
         user = get_current_user()
-        if user and user['user_type'] == 'homeowner':
+        if user and user.user_type == 'homeowner':
             return redirect(url_for('homeowner_dashboard'))
         elif user:
             return redirect(url_for('service_provider_dashboard'))
@@ -372,26 +1191,36 @@ def signin():
             flash('Invalid username or password.', 'error')
             return render_template('signin.html')
         
-        if not check_password_hash(user['password'], password):
+        try:
+            with instrumentation.timed('hash'):
+                matched, new_hash = password_hasher.check(user.password, password)
+        except HasherBusy:
+            flash('We are handling a lot of sign-ins right now. Please try again in a moment.', 'error')
+            return render_template('signin.html'), 503
+        
+        if not matched:
             flash('Invalid username or password.', 'error')
             return render_template('signin.html')
         
+        if new_hash:
+            upgrade_password_hash(user, new_hash)
+        
         session['user_id'] = username
-        session['user_type'] = user['user_type']
+        session['user_type'] = user.user_type
         flash(f'Welcome back, {username}!', 'success')
         
-        if user['user_type'] == 'homeowner':
+        if user.user_type == 'homeowner':
             return redirect(url_for('homeowner_dashboard'))
         else:
             return redirect(url_for('service_provider_dashboard'))
     
     return render_template('signin.html')
 
-@app.route('/signup', methods=['GET', 'POST'])
+@views.route('/signup', methods=['GET', 'POST'])
 def signup():
     if is_signed_in():
         user = get_current_user()
-        if user and user['user_type'] == 'homeowner':
+        if user and user.user_type == 'homeowner':
             return redirect(url_for('homeowner_dashboard'))
         elif user:
             return redirect(url_for('service_provider_dashboard'))
@@ -422,7 +1251,13 @@ def signup():
             flash('Please select a valid user type.', 'error')
             return render_template('signup.html')
         
-        if create_user(username, password, user_type):
+        try:
+            created = create_user(username, password, user_type)
+        except HasherBusy:
+            flash('We are handling a lot of sign-ups right now. Please try again in a moment.', 'error')
+            return render_template('signup.html'), 503
+        
+        if created:
             flash('Account created successfully! Please sign in.', 'success')
             send_notification(f"New user registered: {username} ({user_type})", "New User Registration")
             return redirect(url_for('signin'))
@@ -432,7 +1267,7 @@ def signup():
     
     return render_template('signup.html')
 
-@app.route('/logout')
+@views.route('/logout')
 def logout():
     if is_signed_in():
         username = session.get('user_id', 'User')
@@ -441,66 +1276,98 @@ def logout():
     return redirect(url_for('home'))
 
 # Dashboard routes
-@app.route('/homeowner_dashboard')
+@views.route('/homeowner_dashboard')
 def homeowner_dashboard():
     if not is_signed_in():
         flash('Please sign in to access your dashboard.', 'warning')
         return redirect(url_for('signin'))
     
     user = get_current_user()
-    if not user or user['user_type'] != 'homeowner':
+    if not user or user.user_type != 'homeowner':
         flash('Access denied. This page is for homeowners only.', 'error')
         return redirect(url_for('home'))
     
-    user_services = get_user_services(user['username'], 'homeowner')
-    
-    total_requests = len(user_services)
-    in_progress = len([s for s in user_services if s['status'] == 'in_progress'])
-    completed = len([s for s in user_services if s['status'] == 'completed'])
-    scheduled = len([s for s in user_services if s['status'] == 'scheduled'])
-    
-    stats = {
-        'total_requests': total_requests,
-        'in_progress': in_progress,
-        'completed': completed,
-        'scheduled': scheduled
+    stats, versions = get_dashboard_stats(user)
+    active, services, next_page = dashboard_services(user, stats)
+    if active is None:
+        return redirect(url_for('homeowner_dashboard'))
+    
+    # The page carries its data so the dashboard script starts without refetching it
+    dashboard = {
+        'services': [service.to_json() for service in services],
+        'next_page': next_page,
+        'cursor': sync_cursor(user, versions),
+        'stats': stats
     }
-    
-    return render_template('homeowner_dashboard.html', user=user, services=user_services, stats=stats)
+    return render_template('homeowner_dashboard.html', user=user, stats=stats, active=active,
+                           services=services, dashboard=dashboard)
 
-@app.route('/service_provider_dashboard')
+@views.route('/service_provider_dashboard')
 def service_provider_dashboard():
     if not is_signed_in():
         flash('Please sign in to access your dashboard.', 'warning')
         return redirect(url_for('signin'))
     
     user = get_current_user()
-    if not user or user['user_type'] != 'service_provider':
+    if not user or user.user_type != 'service_provider':
         flash('Access denied. This page is for service providers only.', 'error')
         return redirect(url_for('home'))
     
-    provider_services = get_user_services(user['username'], 'service_provider')
+    stats, versions = get_dashboard_stats(user)
+    active, services, next_page = dashboard_services(user, stats)
+    if active is None:
+        return redirect(url_for('service_provider_dashboard'))
     
-    stats = {
-        'pending': len([s for s in provider_services if s['status'] == 'pending']),
-        'in_progress': len([s for s in provider_services if s['status'] == 'in_progress']),
-        'completed': len([s for s in provider_services if s['status'] == 'completed']),
-        'total_earnings': sum(s.get('cost', 0) or 0 for s in provider_services if s['status'] == 'completed')
+    try:
+        matching_engine.sync(versions[OPEN_REQUESTS_STATS_ID] if versions else None)
+        available, _ = matching_engine.top(limit=OPEN_REQUESTS_PAGE_SIZE)
+    except StorageError as e:
+        logger.error(f"Error getting available requests for the dashboard: {e}")
+        available = []
+    
+    dashboard = {
+        'user': user.to_json(),
+        'services': [service.to_json() for service in services],
+        'available': [service.to_json() for service in available],
+        'next_page': next_page,
+        'cursor': sync_cursor(user, versions),
+        'stats': stats
     }
+    return render_template('service_provider_dashboard.html', user=user, stats=stats, active=active,
+                           services=services, available=available, dashboard=dashboard)
+
+def dashboard_services(user, stats):
+    """The user's open work and the page of history named by ?page=.
     
-    return render_template('service_provider_dashboard.html', 
-                         user=user, 
-                         services=provider_services,
-                         stats=stats)
+    Returns (active, services, next_page); services also holds the active
+    ones, as read with ACTIVE_JOB_ATTRIBUTES, newest change first. active is
+    None for a cursor that is not the user's.
+    """
+    try:
+        services, next_page = get_dashboard_page(user, request.args.get('page'))
+        active = [Service.from_item(item) for item in storage.active_services(
+            user.user_type, user.username, DASHBOARD_ACTIVE_STATUSES[user.user_type],
+            ACTIVE_JOB_ATTRIBUTES[user.user_type], expected=stats['active'])]
+    except ValueError:
+        return None, [], None
+    except StorageError as e:
+        # The page still renders; the dashboard script retries with a full load
+        logger.error(f"Error getting dashboard services for {user.username}: {e}")
+        return [], [], None
+    
+    active_ids = {service.service_id for service in active}
+    services = sorted([service for service in services if service.service_id not in active_ids] + active,
+                      key=lambda service: service.updated_at or '', reverse=True)
+    return active, services, next_page
 
 # API routes - Service management
-@app.route('/api/create-service-request', methods=['POST'])
+@views.route('/api/create-service-request', methods=['POST'])
 def api_create_service_request():
     if not is_signed_in():
         return jsonify({'error': 'Not signed in'}), 401
     
     user = get_current_user()
-    if not user or user['user_type'] != 'homeowner':
+    if not user or user.user_type != 'homeowner':
         return jsonify({'error': 'Only homeowners can create service requests'}), 403
     
     data = request.get_json()
@@ -527,7 +1394,7 @@ def api_create_service_request():
                 return jsonify({'error': 'Invalid date format. Expected YYYY-MM-DD'}), 400
     
     service_id = create_service_request(
-        homeowner=user['username'],
+        homeowner=user.username,
         service_type=data['service_type'],
         priority=data['priority'],
         description=data['description'],
@@ -543,7 +1410,7 @@ def api_create_service_request():
     else:
         return jsonify({'error': 'Failed to create service request'}), 500
 
-@app.route('/api/update-service-status', methods=['POST'])
+@views.route('/api/update-service-status', methods=['POST'])
 def api_update_service_status():
     if not is_signed_in():
         return jsonify({'error': 'Not signed in'}), 401
@@ -563,66 +1430,24 @@ def api_update_service_status():
     if not user:
         return jsonify({'error': 'User not found'}), 401
     
-    # Authorization checks
-    if new_status == 'scheduled' and service['status'] == 'pending':
-        if user['user_type'] != 'service_provider':
-            return jsonify({'error': 'Only service providers can accept requests'}), 403
-    elif user['user_type'] == 'homeowner' and service['homeowner'] != user['username']:
-        return jsonify({'error': 'Permission denied'}), 403
-    elif user['user_type'] == 'service_provider' and service.get('service_provider') != user['username']:
-        if not (service['status'] == 'pending' and service.get('service_provider') is None):
-            return jsonify({'error': 'Permission denied'}), 403
-    
-    update_fields = {}
-    if data.get('cost'):
-        try:
-            update_fields['cost'] = float(data['cost'])
-        except ValueError:
-            return jsonify({'error': 'Invalid cost value'}), 400
-    
-    if data.get('rating'):
-        try:
-            rating = int(data['rating'])
-            if 1 <= rating <= 5:
-                update_fields['rating'] = rating
-            else:
-                return jsonify({'error': 'Rating must be between 1 and 5'}), 400
-        except ValueError:
-            return jsonify({'error': 'Invalid rating value'}), 400
-    
-    if data.get('start_date'):
-        try:
-            update_fields['start_date'] = datetime.strptime(data['start_date'], '%Y-%m-%d %H:%M')
-        except ValueError:
-            return jsonify({'error': 'Invalid start_date format. Use YYYY-MM-DD HH:MM'}), 400
-    
-    # Set service provider for pending requests
-    if new_status == 'scheduled' and service['status'] == 'pending':
-        update_fields['service_provider'] = user['username']
-    
-    # Calculate duration for completed services
-    if new_status == 'completed' and service.get('start_date'):
-        try:
-            start_date = datetime.fromisoformat(service['start_date']) if isinstance(service['start_date'], str) else service['start_date']
-            duration = datetime.now() - start_date
-            update_fields['duration'] = duration.total_seconds() / 3600
-        except Exception as e:
-            logger.error(f"Error calculating duration: {e}")
-    
-    success = update_service_status(service_id, new_status, **update_fields)
+    try:
+        new_status, update_fields = prepare_status_update(user, service, data)
+        success = update_service_status(service_id, new_status, current=service, **update_fields)
+    except TransitionError as e:
+        return jsonify({'error': str(e)}), e.http_status
     
     if success:
         return jsonify({'success': True, 'message': 'Service updated successfully'})
     else:
         return jsonify({'error': 'Failed to update service'}), 500
 
-@app.route('/api/assign-service-provider', methods=['POST'])
+@views.route('/api/assign-service-provider', methods=['POST'])
 def api_assign_service_provider():
     if not is_signed_in():
         return jsonify({'error': 'Not signed in'}), 401
     
     user = get_current_user()
-    if not user or user['user_type'] != 'service_provider':
+    if not user or user.user_type != 'service_provider':
         return jsonify({'error': 'Only service providers can accept requests'}), 403
     
     data = request.get_json()
@@ -635,10 +1460,13 @@ def api_assign_service_provider():
     if not service:
         return jsonify({'error': 'Service not found'}), 404
     
-    if service['status'] != 'pending':
+    if service.status != 'pending':
         return jsonify({'error': 'Service is not available for assignment'}), 400
     
-    success = update_service_status(service_id, 'scheduled', service_provider=user['username'])
+    try:
+        success = update_service_status(service_id, 'scheduled', current=service, service_provider=user.username)
+    except TransitionError as e:
+        return jsonify({'error': str(e)}), e.http_status
     
     if success:
         return jsonify({
@@ -648,19 +1476,17 @@ def api_assign_service_provider():
     else:
         return jsonify({'error': 'Failed to assign service provider'}), 500
 
-@app.route('/api/complete-service', methods=['POST'])
+@views.route('/api/complete-service', methods=['POST'])
 def api_complete_service():
     if not is_signed_in():
         return jsonify({'error': 'Not signed in'}), 401
     
     user = get_current_user()
-    if not user or user['user_type'] != 'service_provider':
+    if not user or user.user_type != 'service_provider':
         return jsonify({'error': 'Only service providers can complete services'}), 403
     
     data = request.get_json()
     service_id = data.get('service_id')
-    cost = data.get('cost')
-    notes = data.get('notes', '')
     
     if not service_id:
         return jsonify({'error': 'service_id is required'}), 400
@@ -669,34 +1495,11 @@ def api_complete_service():
     if not service:
         return jsonify({'error': 'Service not found'}), 404
     
-    if service.get('service_provider') != user['username']:
-        return jsonify({'error': 'Permission denied'}), 403
-    
-    if service['status'] != 'in_progress':
-        return jsonify({'error': 'Service must be in progress to complete'}), 400
-    
-    update_fields = {}
-    
-    if cost:
-        try:
-            # Convert to float first, then it will be converted to Decimal in update_service_status
-            update_fields['cost'] = float(cost)
-        except ValueError:
-            return jsonify({'error': 'Invalid cost value'}), 400
-    
-    if notes:
-        update_fields['completion_notes'] = notes
-    
-    # Calculate duration
-    if service.get('start_date'):
-        try:
-            start_date = datetime.fromisoformat(service['start_date']) if isinstance(service['start_date'], str) else service['start_date']
-            duration = datetime.now() - start_date
-            update_fields['duration'] = duration.total_seconds() / 3600
-        except Exception as e:
-            logger.error(f"Error calculating duration: {e}")
-    
-    success = update_service_status(service_id, 'completed', **update_fields)
+    try:
+        update_fields = prepare_completion(user, service, data)
+        success = update_service_status(service_id, 'completed', current=service, **update_fields)
+    except TransitionError as e:
+        return jsonify({'error': str(e)}), e.http_status
     
     if success:
         return jsonify({
@@ -711,8 +1514,45 @@ def api_complete_service():
     else:
         return jsonify({'error': 'Failed to complete service'}), 500
 
+@views.route('/api/batch/update-service-status', methods=['POST'])
+def api_batch_update_service_status():
+    """Several /api/update-service-status changes: {"updates": [{service_id, status, ...}]}"""
+    if not is_signed_in():
+        return jsonify({'error': 'Not signed in'}), 401
+    
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'User not found'}), 401
+    
+    entries, error = read_batch('updates')
+    if error:
+        return error
+    
+    def prepare(service, entry):
+        if not entry.get('status'):
+            raise TransitionError('status is required', 400)
+        return prepare_status_update(user, service, entry)
+    
+    return run_batch(entries, prepare)
+
+@views.route('/api/batch/complete-service', methods=['POST'])
+def api_batch_complete_service():
+    """Several /api/complete-service calls: {"completions": [{service_id, cost, notes}]}"""
+    if not is_signed_in():
+        return jsonify({'error': 'Not signed in'}), 401
+    
+    user = get_current_user()
+    if not user or user.user_type != 'service_provider':
+        return jsonify({'error': 'Only service providers can complete services'}), 403
+    
+    entries, error = read_batch('completions')
+    if error:
+        return error
+    
+    return run_batch(entries, lambda service, entry: ('completed', prepare_completion(user, service, entry)))
+
 # API routes - Data retrieval
-@app.route('/api/get-services')
+@views.route('/api/get-services')
 def api_get_services():
     if not is_signed_in():
         return jsonify({'error': 'Not signed in'}), 401
@@ -721,104 +1561,290 @@ def api_get_services():
     if not user:
         return jsonify({'error': 'User not found'}), 401
     
-    services = get_user_services(user['username'], user['user_type'])
+    since = request.args.get('since')
+    if since:
+        try:
+            services, open_ids, next_cursor = get_service_changes(user, since)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        except StorageError as e:
+            logger.error(f"Error getting service changes for {user.username}: {e}")
+            return jsonify({'error': 'Failed to get service changes'}), 500
+        
+        data = {'services': [service.to_json() for service in services], 'next_cursor': next_cursor, 'delta': True}
+        if open_ids is not None:
+            data['open_ids'] = open_ids
+        return jsonify(data)
+    
+    if 'page' in request.args or 'limit' in request.args:
+        try:
+            limit = max(1, min(int(request.args.get('limit', DASHBOARD_PAGE_SIZE)), DASHBOARD_MAX_PAGE_SIZE))
+            services, next_page = get_dashboard_page(user, request.args.get('page'), limit)
+        except ValueError:
+            return jsonify({'error': 'Invalid page cursor or limit'}), 400
+        except StorageError as e:
+            logger.error(f"Error getting services page for {user.username}: {e}")
+            return jsonify({'error': 'Failed to get services'}), 500
+        return jsonify({'services': [service.to_json() for service in services], 'next_page': next_page})
+    
+    # Versions are read before the list so the cursor never claims more than it saw
+    versions, settled = read_list_versions(dashboard_stat_ids(user))
+    # The username is part of the tag so a browser shared between accounts
+    # never revalidates one user's cached list as another's
+    etag = list_etag(versions, settled, 'services', user.username)
+    
+    def build():
+        services = get_user_services(user.username, user.user_type)
+        return {'services': [service.to_json() for service in services], 'next_cursor': sync_cursor(user, versions)}
+    
+    return list_response(etag, build)
+
+@views.route('/api/dashboard-stats')
+def api_dashboard_stats():
+    """The numbers on the user's dashboard stat cards"""
+    if not is_signed_in():
+        return jsonify({'error': 'Not signed in'}), 401
+    
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'User not found'}), 401
+    
+    stats, versions = get_dashboard_stats(user)
+    if versions is None:
+        return jsonify({'error': 'Failed to get dashboard stats'}), 500
+    return jsonify(stats)
+
+@views.route('/api/services/<service_id>')
+def api_get_service(service_id):
+    if not is_signed_in():
+        return jsonify({'error': 'Not signed in'}), 401
+    
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'User not found'}), 401
+    
+    service = get_service_by_id(service_id)
+    if not service:
+        return jsonify({'error': 'Service not found'}), 404
     
-    services_json = []
-    for service in services:
-        service_copy = service.copy()
-        for key, value in service_copy.items():
-            service_copy[key] = serialize_datetime(value)
-        services_json.append(service_copy)
+    # Homeowners see their own requests; providers see their jobs and the open backlog
+    if user.user_type == 'homeowner':
+        allowed = service.homeowner == user.username
+    else:
+        allowed = service.service_provider == user.username or service.open_request is not None
+    if not allowed:
+        return jsonify({'error': 'Permission denied'}), 403
     
-    return jsonify({'services': services_json})
+    return jsonify({'service': service.to_json()})
 
-@app.route('/api/available-requests')
+@views.route('/api/available-requests')
 def api_available_requests():
+    """Open requests best suited to the given service types, highest priority first"""
     if not is_signed_in():
         return jsonify({'error': 'Not signed in'}), 401
     
     user = get_current_user()
-    if not user or user['user_type'] != 'service_provider':
+    if not user or user.user_type != 'service_provider':
         return jsonify({'error': 'Only service providers can access this endpoint'}), 403
     
     try:
-        response = services_table.scan(
-            FilterExpression='#status = :pending AND service_provider = :null_val',
-            ExpressionAttributeValues={
-                ':pending': 'pending',
-                ':null_val': None
-            },
-            ExpressionAttributeNames={'#status': 'status'}
-        )
+        limit = int(request.args.get('limit', OPEN_REQUESTS_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit value'}), 400
+    limit = max(1, min(limit, OPEN_REQUESTS_MAX_PAGE_SIZE))
+    
+    # Comma-separated service types; without it every type is matched
+    types = None
+    if request.args.get('types'):
+        types = sorted({t.strip() for t in request.args['types'].split(',') if t.strip()})
+    
+    try:
+        cursor = request.args.get('cursor')
+        after = None
+        if cursor:
+            start = decode_cursor(cursor, KEY_FIELDS)
+            after = tuple(start[field] for field in KEY_FIELDS)
+        versions, settled = read_list_versions([OPEN_REQUESTS_STATS_ID])
+        matching_engine.sync(versions[OPEN_REQUESTS_STATS_ID] if versions else None)
+        # Versioned by the shared backlog counter, so every worker holding the
+        # same backlog sends the same ETag
+        etag = list_etag(versions, settled and matching_engine.settled(),
+                         'available', ','.join(types or ()), str(limit), cursor or '')
         
-        available_requests = []
-        for item in response.get('Items', []):
-            service_copy = deserialize_item(item)
-            for key, value in service_copy.items():
-                service_copy[key] = serialize_datetime(value)
-            available_requests.append(service_copy)
+        def build():
+            services, last_key = matching_engine.top(types, limit, after)
+            next_cursor = encode_cursor(dict(zip(KEY_FIELDS, last_key))) if last_key else None
+            return {'requests': [service.to_json() for service in services], 'next_cursor': next_cursor}
         
-        return jsonify({'requests': available_requests})
-    except ClientError as e:
+        return list_response(etag, build)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    except StorageError as e:
         logger.error(f"Error getting available requests: {e}")
         return jsonify({'error': 'Failed to get available requests'}), 500
 
-@app.route('/api/current-user')
+@views.route('/api/events')
+def api_events():
+    """Server-sent stream of changes to the services on the user's dashboard"""
+    if not is_signed_in():
+        return jsonify({'error': 'Not signed in'}), 401
+    
+    user = get_current_user()
+    if not user:
+        return jsonify({'error': 'User not found'}), 401
+    
+    channels = [user_channel(user.username)]
+    if user.user_type == 'service_provider':
+        channels.append(OPEN_REQUESTS_CHANNEL)
+    
+    # Subscribe before the first byte goes out: the client reloads its lists
+    # when the stream opens, so nothing falls between the two. The broker
+    # refuses the subscription once EVENT_STREAM_LIMIT streams are open.
+    try:
+        subscription = event_broker.subscribe(channels)
+    except StreamLimitReached:
+        response = jsonify({'error': 'Too many event streams, poll instead'})
+        response.headers['Retry-After'] = '60'
+        return response, 503
+    
+    # The generator runs after the request's context is gone
+    dumps = current_app.json.dumps
+    
+    def stream():
+        try:
+            yield 'retry: 5000\n\n'
+            deadline = time.monotonic() + EVENT_STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                event = subscription.get(timeout=EVENT_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ': keepalive\n\n'
+                else:
+                    yield f"event: {event['type']}\ndata: {dumps(event['data'])}\n\n"
+        finally:
+            subscription.close()
+    
+    response = current_app.response_class(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Also release the slot if the server closes the response before streaming starts
+    response.call_on_close(subscription.close)
+    return response
+
+@views.route('/api/current-user')
 def api_current_user():
     if not is_signed_in():
         return jsonify({'error': 'Not signed in'}), 401
     
     user = get_current_user()
     if user:
-        return jsonify({
-            'username': user['username'],
-            'user_type': user['user_type'],
-            'created_at': serialize_datetime(user.get('created_at'))
-        })
+        return jsonify(user.to_json())
     else:
         return jsonify({'error': 'User not found'}), 404
 
-@app.route('/api/check-username', methods=['POST'])
+@views.route('/api/check-username', methods=['POST'])
 def check_username():
-    username = request.json.get('username', '').strip()
-    user = get_user_by_username(username)
-    exists = user is not None
+    data = request.get_json(silent=True)
+    username = data.get('username', '') if isinstance(data, dict) else ''
+    if not isinstance(username, str):
+        return jsonify({'error': 'username must be a string'}), 400
+    username = username.strip()
+    if not username:
+        return jsonify({'exists': False})
+    
+    # Only names the filter may have seen cost a storage lookup
+    exists = username_filter.might_exist(username) and get_user_by_username(username) is not None
     return jsonify({'exists': exists})
 
-@app.route('/api/user-stats')
+@views.route('/api/user-stats')
 def user_stats():
     if not is_signed_in():
         return jsonify({'error': 'Not signed in'}), 401
     
-    # Get all users from database (DynamoDB or fallback)
-    all_users = get_all_users_from_db()
+    counts = get_user_counts()
+    if counts is None:
+        return jsonify({'error': 'Failed to get user stats'}), 500
     
-    total_users = len(all_users)
-    homeowners = sum(1 for user in all_users if user.get('user_type') == 'homeowner')
-    service_providers = sum(1 for user in all_users if user.get('user_type') == 'service_provider')
+    return jsonify(counts)
+
+def get_user_counts():
+    """Read the materialized user counters maintained by create_user"""
+    try:
+        item = storage.get_stats([USER_COUNTS_ID]).get(USER_COUNTS_ID, {})
+    except StorageError as e:
+        logger.error(f"Error getting user counts: {e}")
+        return None
     
-    return jsonify({
-        'total_users': total_users,
-        'homeowners': homeowners,
-        'service_providers': service_providers
-    })
+    return {
+        'total_users': int(item.get('total_users', 0)),
+        'homeowners': int(item.get('homeowners', 0)),
+        'service_providers': int(item.get('service_providers', 0))
+    }
+
+# Exportable tables: record type and columns. Password hashes are never read.
+EXPORTS = {
+    'users': (User, ('username', 'user_type', 'created_at')),
+    'services': (Service, tuple(name for name in Service.FIELDS if name != 'open_request'))
+}
 
-# Helper function to get all users (add this function as well)
-def get_all_users_from_db():
-    """Get all users from DynamoDB or fallback storage"""
-    if users_table:
+def is_admin_request():
+    token = current_app.config['ADMIN_TOKEN']
+    supplied = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode())
+
+@views.route('/api/admin/export/<table>')
+def api_admin_export(table):
+    """Stream a whole table as NDJSON, or CSV with ?format=csv.
+    
+    In NDJSON a checkpoint follows every page; pass the last one received
+    back as ?checkpoint= (in either format) to resume an interrupted export
+    without repeating rows. CSV carries rows only.
+    """
+    if not current_app.config['ADMIN_TOKEN']:
+        return jsonify({'error': 'Exports are disabled'}), 404
+    if not is_admin_request():
+        return jsonify({'error': 'Admin token required'}), 401
+    if table not in EXPORTS:
+        return jsonify({'error': 'Unknown export'}), 404
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    checkpoint = request.args.get('checkpoint')
+    if checkpoint:
         try:
-            response = users_table.scan()
-            return response.get('Items', [])
-        except ClientError as e:
-            logger.error(f"Error getting all users from DynamoDB: {e}")
-            return list(users_db.values())
+            segments = decode_checkpoint(checkpoint, table, EXPORT_MAX_SEGMENTS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
     else:
-        return list(users_db.values())
-
+        segments = [None] * max(1, min(EXPORT_SEGMENTS, EXPORT_MAX_SEGMENTS))
+    
+    record_class, columns = EXPORTS[table]
+    # Pages are read on the export's scan threads, outside the app context
+    table_storage = storage._get_current_object()
+    
+    def scan_page(segment, total_segments, start_key, limit):
+        return table_storage.scan_segment(table, segment, total_segments, start_key, limit, attributes=columns)
+    
+    def to_row(item):
+        return record_class.from_item(item).to_json()
+    
+    pages = parallel_scan(scan_page, segments, EXPORT_SCAN_WORKERS, EXPORT_PAGE_SIZE, EXPORT_BUFFERED_PAGES)
+    if export_format == 'csv':
+        body, mimetype = csv_stream(pages, table, columns, to_row), 'text/csv'
+    else:
+        body, mimetype = ndjson_stream(pages, table, to_row), 'application/x-ndjson'
+    
+    logger.info(f"Exporting {table} as {export_format} over {len(segments)} segments")
+    return current_app.response_class(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="fixitnow-{table}.{export_format}"',
+        'Cache-Control': 'no-store',
+        'X-Accel-Buffering': 'no'
+    })
 
 # Template filters
-@app.template_filter('datetime')
+@views.template_filter('datetime')
 def datetime_filter(value):
     if isinstance(value, datetime):
         return value.strftime('%Y-%m-%d %H:%M:%S')
@@ -830,7 +1856,7 @@ def datetime_filter(value):
             return value
     return value
 
-@app.template_filter('currency')
+@views.template_filter('currency')
 def currency_filter(value):
     if value is None:
         return '-'
@@ -839,7 +1865,7 @@ def currency_filter(value):
     except (ValueError, TypeError):
         return '-'
     
-@app.template_filter('duration')
+@views.template_filter('duration')
 def duration_filter(value):
     if value is None:
         return '-'
@@ -853,13 +1879,73 @@ def duration_filter(value):
     except (ValueError, TypeError):
         return '-'
 
-@app.context_processor
+# Dates as the dashboard scripts format them, e.g. "Jan 5, 2026" and "Jan 5, 2026, 03:30 PM"
+@views.template_filter('short_date')
+def short_date_filter(value):
+    try:
+        dt = parse_timestamp(value)
+    except (ValueError, TypeError):
+        return value
+    return f"{dt:%b} {dt.day}, {dt.year}" if dt else 'N/A'
+
+@views.template_filter('short_datetime')
+def short_datetime_filter(value):
+    try:
+        dt = parse_timestamp(value)
+    except (ValueError, TypeError):
+        return value
+    return f"{dt:%b} {dt.day}, {dt.year}, {dt:%I:%M %p}" if dt else 'N/A'
+
+@views.template_global()
+def service_fragment(template_name, service):
+    """Render a service card partial, reusing the cached HTML until the service changes"""
+    key = (template_name, service.service_id, service.updated_at)
+    html = fragment_cache.get(key)
+    if html is None:
+        html = Markup(current_app.jinja_env.get_template(template_name).render(service=service))
+        fragment_cache.set(key, html)
+    return html
+
+@views.context_processor
 def inject_user():
     return dict(current_user=get_current_user(), is_signed_in=is_signed_in())
 
+app = create_app()
+
+def warm_up(flask_app=None):
+    """Create this process's AWS clients for flask_app (default: app) and open their connections.
+
+    Called from gunicorn's post_worker_init hook so the first real request in
+    a fresh worker does not pay for session setup and the TLS handshake.
+    """
+    flask_app = flask_app or app
+    started = time.monotonic()
+    with flask_app.app_context():
+        # Readiness checks start now rather than on the first probe
+        readiness.status()
+        try:
+            if flask_app.config['SNS_TOPIC_ARN']:
+                aws.client('sns')
+            storage.warm_up()
+            password_hasher.start()
+            username_filter.rebuild()
+            matching_engine.reload()
+        except Exception as e:
+            # A worker that cannot reach AWS yet still serves /livez and retries lazily
+            logger.warning(f"Warm-up failed, clients will connect on first use: {e}")
+            return False
+    logger.info(f"Worker {os.getpid()} warmed up in {(time.monotonic() - started) * 1000:.0f}ms")
+    return True
+
 if __name__ == '__main__':
     # Initialize sample data for development
-    initialize_sample_data()
+    with app.app_context():
+        if not storage.has_stats(USER_COUNTS_ID):
+            storage.rebuild_user_counts()
+        if not storage.has_stats(OPEN_REQUESTS_STATS_ID):
+            storage.backfill_open_requests()
+            storage.rebuild_service_stats()
+        initialize_sample_data()
     print("FixItNow Flask App Starting...")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
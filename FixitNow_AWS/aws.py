@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+# Keys AWSSettings.from_mapping reads, in the environment or an app's config
+SETTING_NAMES = ('AWS_MAX_POOL_CONNECTIONS', 'AWS_CONNECT_TIMEOUT', 'AWS_READ_TIMEOUT',
+                 'AWS_RETRY_MODE', 'AWS_MAX_ATTEMPTS', 'AWS_TCP_KEEPALIVE')
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+class AWSSettings:
+    """Connection pool, timeout and retry settings shared by every AWS client"""
+
+    def __init__(self, max_pool_connections=50, connect_timeout=2.0, read_timeout=5.0,
+                 retry_mode='adaptive', max_attempts=5, tcp_keepalive=True):
+        self.max_pool_connections = max_pool_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry_mode = retry_mode
+        self.max_attempts = max_attempts
+        self.tcp_keepalive = tcp_keepalive
+
+    @classmethod
+    def from_mapping(cls, values):
+        """Settings from the SETTING_NAMES keys of values; strings are converted"""
+        return cls(
+            max_pool_connections=int(values.get('AWS_MAX_POOL_CONNECTIONS', 50)),
+            connect_timeout=float(values.get('AWS_CONNECT_TIMEOUT', 2)),
+            read_timeout=float(values.get('AWS_READ_TIMEOUT', 5)),
+            retry_mode=values.get('AWS_RETRY_MODE', 'adaptive'),
+            max_attempts=int(values.get('AWS_MAX_ATTEMPTS', 5)),
+            tcp_keepalive=_as_bool(values.get('AWS_TCP_KEEPALIVE', True))
+        )
+
+    @classmethod
+    def from_env(cls):
+        return cls.from_mapping(os.environ)
+
+    def botocore_config(self):
+        return Config(
+            max_pool_connections=self.max_pool_connections,
+            connect_timeout=self.connect_timeout,
+            read_timeout=self.read_timeout,
+            retries={'mode': self.retry_mode, 'max_attempts': self.max_attempts},
+            tcp_keepalive=self.tcp_keepalive
+        )
+
+
+class AWSClients:
+    """Lazily created boto3 clients and resources, one set per process.
+
+    Nothing touches the network or the credential chain until the first
+    client is requested. Clients are keyed by pid, so a holder created before
+    gunicorn forks hands each worker its own session and connection pool.
+    ``event_handlers`` are (event name, handler) pairs registered on every
+    session before its first client is made, e.g. botocore call timers.
+    """
+
+    def __init__(self, region, settings=None, event_handlers=()):
+        self.region = region
+        self.settings = settings or AWSSettings()
+        self.event_handlers = list(event_handlers)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._session = None
+        self._clients = {}
+        self._resources = {}
+        self._tables = {}
+
+    def _reset_if_forked(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._session = boto3.session.Session(region_name=self.region)
+            for event_name, handler in self.event_handlers:
+                self._session.events.register(event_name, handler)
+            self._clients = {}
+            self._resources = {}
+            self._tables = {}
+
+    def client(self, service_name):
+        clients = self._clients
+        if self._pid == os.getpid() and service_name in clients:
+            return clients[service_name]
+        # boto3 sessions are not thread-safe, so client creation is serialized
+        with self._lock:
+            self._reset_if_forked()
+            if service_name not in self._clients:
+                self._clients[service_name] = self._session.client(
+                    service_name, config=self.settings.botocore_config()
+                )
+                logger.info(f"Created {service_name} client for pid {self._pid}")
+            return self._clients[service_name]
+
+    def resource(self, service_name):
+        resources = self._resources
+        if self._pid == os.getpid() and service_name in resources:
+            return resources[service_name]
+        with self._lock:
+            self._reset_if_forked()
+            if service_name not in self._resources:
+                self._resources[service_name] = self._session.resource(
+                    service_name, config=self.settings.botocore_config()
+                )
+            return self._resources[service_name]
+
+    def table(self, table_name):
+        tables = self._tables
+        if self._pid == os.getpid() and table_name in tables:
+            return tables[table_name]
+        dynamodb = self.resource('dynamodb')
+        with self._lock:
+            if table_name not in self._tables:
+                self._tables[table_name] = dynamodb.Table(table_name)
+            return self._tables[table_name]
@@ -0,0 +1,640 @@
+"""Endpoint load test and latency benchmark for the FixItNow Flask app.
+
+Seeds users and services into a local stand-in backend, replays a mix of
+homeowner and provider traffic through the Flask test client and reports
+p50/p95/p99 latency and requests per second per endpoint.
+
+    python bench/loadtest.py --users 200 --services 5000 --duration 20
+    python bench/loadtest.py --baseline bench/baseline.json
+    python bench/loadtest.py --update-baseline bench/baseline.json
+    python bench/loadtest.py --backend moto --users 50 --services 500 \\
+        --capacity-budgets bench/capacity_budgets.json
+
+The backend is the indexed in-memory engine by default; ``--backend moto``
+runs the DynamoDB code path against moto's mock instead. With ``--baseline``
+the run fails if any endpoint's p95 latency or throughput regresses by more
+than ``--tolerance`` against the stored numbers, or if an endpoint is only
+on one side of the comparison; rewrite the baseline with
+``--update-baseline`` whenever the traffic mix changes. Against moto, each
+endpoint's DynamoDB read and write capacity per request is read from the
+app's Server-Timing header. Moto reports a fixed cost per call, so the app
+estimates it from item sizes instead. With ``--capacity-budgets`` the run
+fails if any endpoint averages more capacity per request than its budget.
+A query that turns into a scan fails this check long before it shows up in
+the latency numbers.
+"""
+import argparse
+import contextlib
+import gzip
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+PASSWORD = 'benchmark'
+SERVICE_TYPES = ['plumbing', 'electrical', 'hvac', 'carpentry', 'painting', 'appliance', 'other']
+PRIORITIES = ['low', 'medium', 'high', 'emergency']
+CAPACITY_TIMING = re.compile(r'capacity;desc="rcu=([0-9.e+-]+) wcu=([0-9.e+-]+)"')
+DASHBOARD_DATA = re.compile(r'<script id="dashboardData" type="application/json">(.*?)</script>', re.S)
+
+# Actions per simulated hour of one signed-in dashboard. Both dashboards poll
+# every 30 seconds (120 polls an hour): a /api/get-services delta sync, then
+# /api/dashboard-stats when something changed and, for providers,
+# available-requests when the open backlog changed. A dashboard load carries
+# its first page, sync cursor and stats in the HTML. Everything else happens a
+# few times an hour.
+HOMEOWNER_MIX = {
+    'poll': 120,
+    'dashboard': 6,
+    'details': 4,
+    'create': 3,
+    'signin': 1
+}
+PROVIDER_MIX = {
+    'poll': 120,
+    'dashboard': 6,
+    'accept': 4,
+    'start': 3,
+    'complete': 3,
+    'signin': 1
+}
+
+
+def create_moto_tables(config):
+    """Create the tables and indexes named in an app's config"""
+    import boto3
+    client = boto3.client('dynamodb', region_name=config['AWS_REGION'])
+
+    def string_attrs(*names):
+        return [{'AttributeName': name, 'AttributeType': 'S'} for name in names]
+
+    def key(partition, sort=None):
+        schema = [{'AttributeName': partition, 'KeyType': 'HASH'}]
+        if sort:
+            schema.append({'AttributeName': sort, 'KeyType': 'RANGE'})
+        return schema
+
+    def index(name, partition, sort):
+        return {'IndexName': name, 'KeySchema': key(partition, sort), 'Projection': {'ProjectionType': 'ALL'}}
+
+    from storage import HOMEOWNER_INDEX, PROVIDER_INDEX, PROVIDER_UPDATED_INDEX, OPEN_REQUESTS_INDEX
+    client.create_table(TableName=config['USERS_TABLE'], KeySchema=key('username'),
+                        AttributeDefinitions=string_attrs('username'), BillingMode='PAY_PER_REQUEST')
+    client.create_table(TableName=config['STATS_TABLE'], KeySchema=key('stat_id'),
+                        AttributeDefinitions=string_attrs('stat_id'), BillingMode='PAY_PER_REQUEST')
+    client.create_table(
+        TableName=config['SERVICES_TABLE'],
+        KeySchema=key('service_id'),
+        AttributeDefinitions=string_attrs('service_id', 'homeowner', 'updated_at', 'service_provider',
+                                          'status', 'open_request', 'created_at'),
+        GlobalSecondaryIndexes=[
+            index(HOMEOWNER_INDEX, 'homeowner', 'updated_at'),
+            index(PROVIDER_INDEX, 'service_provider', 'status'),
+            index(PROVIDER_UPDATED_INDEX, 'service_provider', 'updated_at'),
+            index(OPEN_REQUESTS_INDEX, 'open_request', 'created_at')
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+
+def app_config(backend):
+    """create_app() settings for a local stand-in backend"""
+    return {
+        'TESTING': True,
+        'SNS_TOPIC_ARN': '',
+        'STORAGE_BACKEND': 'memory' if backend == 'memory' else 'dynamodb',
+        # Moto charges a flat unit per call; size-based estimates track real bills
+        'DYNAMODB_CAPACITY': os.getenv('DYNAMODB_CAPACITY', 'estimated'),
+        # Capacity is read back from the Server-Timing header
+        'SERVER_TIMING': True
+    }
+
+
+def load_app(backend):
+    """Build an app from app.py for a local stand-in backend"""
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'benchmark')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'benchmark')
+
+    if backend == 'moto':
+        from moto import mock_aws
+        mock_aws().start()
+
+    import app as app_module
+    logging.getLogger().setLevel(logging.WARNING)
+    flask_app = app_module.create_app(app_config(backend))
+    if backend == 'moto':
+        create_moto_tables(flask_app.config)
+    return flask_app
+
+
+def seed(flask_app, users, services, rng):
+    """Write users and a realistic spread of services straight into storage"""
+    from storage import OPEN_REQUEST_MARKER
+
+    components = flask_app.extensions['fixitnow']
+    storage = components['storage']
+    # Hashed with the configured parameters so sign-ins do not trigger upgrades
+    password_hash = components['password_hasher'].hash(PASSWORD)
+    homeowner_count = max(1, int(users * 0.8))
+    homeowners = [f"bench_home_{i}" for i in range(homeowner_count)]
+    providers = [f"bench_pro_{i}" for i in range(max(1, users - homeowner_count))]
+    now = datetime.now()
+    for username, user_type in [(u, 'homeowner') for u in homeowners] + [(u, 'service_provider') for u in providers]:
+        storage.create_user({
+            'username': username,
+            'password': password_hash,
+            'user_type': user_type,
+            'created_at': (now - timedelta(days=365)).isoformat()
+        })
+
+    for i in range(services):
+        created = now - timedelta(minutes=rng.randint(1, 365 * 24 * 60))
+        status = rng.choices(['pending', 'scheduled', 'in_progress', 'completed'], [15, 10, 10, 65])[0]
+        service_type = rng.choice(SERVICE_TYPES)
+        service = {
+            'service_id': f"service_bench_{i}",
+            'homeowner': rng.choice(homeowners),
+            'service': f"{service_type.title()} Service Request",
+            'service_type': service_type,
+            'priority': rng.choice(PRIORITIES),
+            'description': 'Benchmark request ' + 'x' * rng.randint(20, 400),
+            'preferred_date': (created + timedelta(days=3)).isoformat(),
+            'start_date': None,
+            'cost': None,
+            'status': status,
+            'duration': None,
+            'rating': None,
+            'created_at': created.isoformat(),
+            'updated_at': created.isoformat()
+        }
+        if status == 'pending':
+            service['open_request'] = OPEN_REQUEST_MARKER
+        else:
+            service['service_provider'] = rng.choice(providers)
+        if status in ('in_progress', 'completed'):
+            service['start_date'] = (created + timedelta(days=3)).isoformat()
+        if status == 'completed':
+            service['cost'] = Decimal(rng.randint(40, 900))
+            service['duration'] = Decimal(str(round(rng.uniform(0.5, 8), 2)))
+            service['rating'] = rng.choice([None, 3, 4, 5])
+        storage.put_service(service)
+    return homeowners, providers
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency and status collection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+        self.not_modified = {}
+        # endpoint -> [read units, write units, max read, max write]
+        self.capacity = {}
+
+    def record(self, endpoint, seconds, status_code, capacity=None):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if capacity is not None:
+                totals = self.capacity.setdefault(endpoint, [0.0, 0.0, 0.0, 0.0])
+                totals[0] += capacity[0]
+                totals[1] += capacity[1]
+                totals[2] = max(totals[2], capacity[0])
+                totals[3] = max(totals[3], capacity[1])
+            if status_code >= 400:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+            elif status_code == 304:
+                self.not_modified[endpoint] = self.not_modified.get(endpoint, 0) + 1
+
+    def summary(self, elapsed):
+        results = {}
+        for endpoint, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            results[endpoint] = {
+                'count': len(ordered),
+                'errors': self.errors.get(endpoint, 0),
+                'not_modified': self.not_modified.get(endpoint, 0),
+                'rps': round(len(ordered) / elapsed, 2),
+                'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+                'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+                'p99_ms': round(percentile(ordered, 99) * 1000, 3)
+            }
+            if self.capacity:
+                # Requests that made no DynamoDB call count as zero
+                read, write, max_read, max_write = self.capacity.get(endpoint, (0.0, 0.0, 0.0, 0.0))
+                results[endpoint].update({
+                    'rcu_per_request': round(read / len(ordered), 3),
+                    'wcu_per_request': round(write / len(ordered), 3),
+                    'rcu_max': max_read,
+                    'wcu_max': max_write
+                })
+        return results
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+class VirtualUser:
+    """One signed-in browser session replaying its dashboard's traffic"""
+
+    def __init__(self, flask_app, username, user_type, recorder, rng, serial=None):
+        self.client = flask_app.test_client()
+        # Requests against moto run one at a time: its backend is not thread-safe
+        self.serial = serial or contextlib.nullcontext()
+        # Browsers ask for compressed responses, so the benchmark pays for them too
+        self.client.environ_base['HTTP_ACCEPT_ENCODING'] = 'gzip'
+        self.username = username
+        self.user_type = user_type
+        self.recorder = recorder
+        self.rng = rng
+        config = flask_app.config
+        self.measure_capacity = config['STORAGE_BACKEND'] == 'dynamodb' and config['DYNAMODB_CAPACITY'] != 'off'
+        self.services = []
+        self.services_cursor = None
+        self.available = []
+        # Like the browser's HTTP cache: revalidate list polls with If-None-Match
+        self.cached = {}
+        mix = HOMEOWNER_MIX if user_type == 'homeowner' else PROVIDER_MIX
+        self.actions = list(mix)
+        self.weights = list(mix.values())
+
+    def call(self, endpoint, method, path, **kwargs):
+        with self.serial:
+            started = time.perf_counter()
+            response = self.client.open(path, method=method, **kwargs)
+            elapsed = time.perf_counter() - started
+        match = CAPACITY_TIMING.search(response.headers.get('Server-Timing', ''))
+        capacity = (float(match.group(1)), float(match.group(2))) if match else None
+        if capacity is None and self.measure_capacity:
+            capacity = (0.0, 0.0)
+        self.recorder.record(endpoint, elapsed, response.status_code, capacity)
+        return response
+
+    def body(self, response):
+        data = response.get_data()
+        return gzip.decompress(data) if response.headers.get('Content-Encoding') == 'gzip' else data
+
+    def signin(self):
+        self.call('POST /signin', 'POST', '/signin', data={'username': self.username, 'password': PASSWORD})
+
+    def get_cached(self, endpoint, path):
+        etag, data = self.cached.get(path, (None, None))
+        headers = {'If-None-Match': f'"{etag}"'} if etag else {}
+        response = self.call(endpoint, 'GET', path, headers=headers)
+        if response.status_code == 304:
+            return data
+        if response.status_code != 200:
+            return None
+        data = json.loads(self.body(response))
+        etag = response.get_etag()[0]
+        if etag:
+            self.cached[path] = (etag, data)
+        else:
+            self.cached.pop(path, None)
+        return data
+
+    def get_services(self):
+        """Load or delta-sync the services list.
+
+        Returns (changed, backlog_changed): whether anything on the dashboard
+        changed and whether the open backlog may have.
+        """
+        if self.services_cursor is None:
+            data = self.get_cached('GET /api/get-services', '/api/get-services')
+            if data is not None:
+                self.services = data.get('services', [])
+                self.services_cursor = data.get('next_cursor')
+            return True, True
+        
+        response = self.call('GET /api/get-services?since', 'GET', '/api/get-services',
+                             query_string={'since': self.services_cursor})
+        if response.status_code != 200:
+            self.services_cursor = None
+            return True, True
+        data = json.loads(self.body(response))
+        # The cursor overlaps the last sync; only new versions count as changes
+        known = {s['service_id']: s.get('updated_at') for s in self.services}
+        updated = any(known.get(s['service_id'], '') != s.get('updated_at') for s in data['services'])
+        changed = {service['service_id']: service for service in data['services']}
+        self.services = [changed.pop(s['service_id'], s) for s in self.services] + list(changed.values())
+        if 'open_ids' in data:
+            open_ids = set(data['open_ids'])
+            self.services = [s for s in self.services if s.get('service_provider')
+                             or s.get('status') != 'pending' or s['service_id'] in open_ids]
+        self.services_cursor = data['next_cursor']
+        return updated or 'open_ids' in data, 'open_ids' in data
+
+    def available_requests(self):
+        data = self.get_cached('GET /api/available-requests', '/api/available-requests')
+        if data is not None:
+            self.available = data.get('requests', [])
+
+    def step(self):
+        action = self.rng.choices(self.actions, self.weights)[0]
+        getattr(self, f"do_{action}")()
+
+    def do_signin(self):
+        with self.serial:
+            self.client.get('/logout')
+        self.signin()
+
+    def do_poll(self):
+        # checkForUpdates() / refreshData(): stats reload only after a change,
+        # the provider's backlog only when it changed
+        changed, backlog_changed = self.get_services()
+        if backlog_changed and self.user_type == 'service_provider':
+            self.available_requests()
+        if changed:
+            self.call('GET /api/dashboard-stats', 'GET', '/api/dashboard-stats')
+
+    def do_dashboard(self):
+        # A page load starts over from the data embedded in the page
+        path = '/homeowner_dashboard' if self.user_type == 'homeowner' else '/service_provider_dashboard'
+        response = self.call(f"GET {path}", 'GET', path)
+        match = DASHBOARD_DATA.search(self.body(response).decode()) if response.status_code == 200 else None
+        if match is None:
+            self.services_cursor = None
+            self.do_poll()
+            return
+        data = json.loads(match.group(1))
+        self.services = data.get('services', [])
+        self.services_cursor = data.get('cursor')
+        if 'available' in data:
+            self.available = data['available']
+
+    def do_details(self):
+        if self.services:
+            service_id = self.rng.choice(self.services)['service_id']
+            self.call('GET /api/services/<id>', 'GET', f"/api/services/{service_id}")
+
+    def do_create(self):
+        self.call('POST /api/create-service-request', 'POST', '/api/create-service-request', json={
+            'service_type': self.rng.choice(SERVICE_TYPES),
+            'priority': self.rng.choice(PRIORITIES),
+            'description': 'Load test request',
+            'preferred_date': (datetime.now() + timedelta(days=2)).strftime('%Y-%m-%d')
+        })
+
+    def pick(self, services, status):
+        candidates = [s for s in services if s.get('status') == status
+                      and (status == 'pending' or s.get('service_provider') == self.username)]
+        return self.rng.choice(candidates)['service_id'] if candidates else None
+
+    def do_accept(self):
+        service_id = self.pick(self.available, 'pending')
+        if service_id:
+            self.call('POST /api/assign-service-provider', 'POST', '/api/assign-service-provider',
+                      json={'service_id': service_id})
+            self.available = [s for s in self.available if s['service_id'] != service_id]
+
+    def do_start(self):
+        service_id = self.pick(self.services, 'scheduled')
+        if service_id:
+            self.call('POST /api/update-service-status', 'POST', '/api/update-service-status', json={
+                'service_id': service_id,
+                'status': 'in_progress',
+                'start_date': datetime.now().strftime('%Y-%m-%d %H:%M')
+            })
+
+    def do_complete(self):
+        service_id = self.pick(self.services, 'in_progress')
+        if service_id:
+            self.call('POST /api/complete-service', 'POST', '/api/complete-service',
+                      json={'service_id': service_id, 'cost': self.rng.randint(40, 900)})
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    flask_app = load_app(args.backend)
+    seed_started = time.perf_counter()
+    homeowners, providers = seed(flask_app, args.users, args.services, rng)
+    print(f"Seeded {args.users} users and {args.services} services in {time.perf_counter() - seed_started:.1f}s "
+          f"({args.backend} backend)")
+
+    recorder = Recorder()
+    serial = threading.Lock() if args.backend == 'moto' else None
+    sessions = []
+    for i in range(args.concurrency):
+        if rng.random() < args.provider_share:
+            user = VirtualUser(flask_app, rng.choice(providers), 'service_provider', recorder, random.Random(rng.random()), serial)
+        else:
+            user = VirtualUser(flask_app, rng.choice(homeowners), 'homeowner', recorder, random.Random(rng.random()), serial)
+        user.signin()
+        user.do_dashboard()
+        sessions.append(user)
+    recorder.__init__()
+
+    deadline = time.perf_counter() + args.duration
+    errors = []
+
+    def worker(user):
+        try:
+            while time.perf_counter() < deadline:
+                user.step()
+        except Exception as e:
+            errors.append(e)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(user,)) for user in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+
+    results = recorder.summary(elapsed)
+    total = sum(r['count'] for r in results.values())
+    return {
+        'config': {
+            'backend': args.backend,
+            'users': args.users,
+            'services': args.services,
+            'concurrency': args.concurrency,
+            'duration': args.duration
+        },
+        'total_rps': round(total / elapsed, 2),
+        'endpoints': results
+    }
+
+
+def print_report(report):
+    header = f"{'endpoint':38} {'count':>7} {'err':>5} {'304':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for endpoint, r in report['endpoints'].items():
+        print(f"{endpoint:38} {r['count']:>7} {r['errors']:>5} {r.get('not_modified', 0):>6} {r['rps']:>9.1f} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+    print(f"total: {report['total_rps']:.1f} req/s")
+    if any('rcu_per_request' in r for r in report['endpoints'].values()):
+        print()
+        header = f"{'capacity per request':38} {'rcu':>9} {'rcu max':>9} {'wcu':>9} {'wcu max':>9}"
+        print(header)
+        print('-' * len(header))
+        for endpoint, r in report['endpoints'].items():
+            print(f"{endpoint:38} {r['rcu_per_request']:>9.2f} {r['rcu_max']:>9.1f} "
+                  f"{r['wcu_per_request']:>9.2f} {r['wcu_max']:>9.1f}")
+
+
+# Settings that change what a run measures; a baseline is only comparable
+# with runs that used the same ones
+COMPARABLE_CONFIG = ('backend', 'users', 'services', 'concurrency')
+
+
+def compare(report, baseline, tolerance, min_samples, min_delta_ms=0.0):
+    """(regressions, warnings) of this run against a baseline report.
+
+    Regressions are p95 latency or throughput beyond the tolerance (and, for
+    latency, more than ``min_delta_ms`` slower, so waiting out another
+    thread's work does not fail sub-millisecond endpoints), and
+    endpoints with at least ``min_samples`` requests on one side that the
+    other side never saw: a baseline that lacks an endpoint cannot vouch for
+    it. Total throughput is only compared when both runs hit the same
+    endpoints, since it means nothing across different request mixes.
+    """
+    expected_config = {key: baseline['config'].get(key) for key in COMPARABLE_CONFIG}
+    actual_config = {key: report['config'].get(key) for key in COMPARABLE_CONFIG}
+    if expected_config != actual_config:
+        return [f"baseline was measured with {expected_config}, this run used {actual_config}"], []
+
+    regressions = []
+    warnings = []
+    for endpoint in sorted(set(baseline['endpoints']) - set(report['endpoints'])):
+        message = f"{endpoint}: in the baseline but not exercised by this run"
+        (regressions if baseline['endpoints'][endpoint]['count'] >= min_samples else warnings).append(message)
+    for endpoint in sorted(set(report['endpoints']) - set(baseline['endpoints'])):
+        message = f"{endpoint}: not in the baseline; refresh it with --update-baseline"
+        (regressions if report['endpoints'][endpoint]['count'] >= min_samples else warnings).append(message)
+
+    for endpoint, expected in baseline['endpoints'].items():
+        actual = report['endpoints'].get(endpoint)
+        # Rarely hit endpoints have too few samples for a stable p95
+        if actual is None or min(actual['count'], expected['count']) < min_samples:
+            continue
+        if actual['p95_ms'] > max(expected['p95_ms'] * (1 + tolerance), expected['p95_ms'] + min_delta_ms):
+            regressions.append(f"{endpoint}: p95 {actual['p95_ms']:.2f}ms > baseline {expected['p95_ms']:.2f}ms")
+        if actual['rps'] < expected['rps'] * (1 - tolerance):
+            regressions.append(f"{endpoint}: {actual['rps']:.1f} req/s < baseline {expected['rps']:.1f} req/s")
+    if set(report['endpoints']) == set(baseline['endpoints']):
+        if report['total_rps'] < baseline['total_rps'] * (1 - tolerance):
+            regressions.append(f"total: {report['total_rps']:.1f} req/s < baseline {baseline['total_rps']:.1f} req/s")
+    else:
+        warnings.append('total throughput not compared: the runs hit different endpoints')
+    return regressions, warnings
+
+
+def check_budgets(report, budgets):
+    """List endpoints whose mean capacity per request is over budget"""
+    if not any('rcu_per_request' in r for r in report['endpoints'].values()):
+        return ['no capacity was measured; budgets need --backend moto']
+    over = []
+    for endpoint, budget in budgets['endpoints'].items():
+        actual = report['endpoints'].get(endpoint)
+        if actual is None:
+            continue
+        for kind in ('rcu', 'wcu'):
+            if actual[f"{kind}_per_request"] > budget[kind]:
+                over.append(f"{endpoint}: {actual[f'{kind}_per_request']:.2f} {kind.upper()}/request "
+                            f"> budget {budget[kind]:.2f}")
+    return over
+
+
+def budgets_from(report, headroom):
+    """Budgets of the measured capacity per request plus headroom, rounded up to half units"""
+    endpoints = {}
+    for endpoint, r in report['endpoints'].items():
+        endpoints[endpoint] = {
+            kind: max(0.5, math.ceil(r[f"{kind}_per_request"] * headroom * 2) / 2) for kind in ('rcu', 'wcu')
+        }
+    return {'config': report['config'], 'headroom': headroom, 'endpoints': endpoints}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', choices=['memory', 'moto'], default='memory')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--services', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--provider-share', type=float, default=0.3)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='fail if results regress against this JSON report')
+    parser.add_argument('--update-baseline', help='write the JSON report as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='allowed relative regression before failing (default 0.5 = 50%%)')
+    parser.add_argument('--min-samples', type=int, default=50,
+                        help='skip endpoints with fewer samples than this when comparing')
+    # Test client threads share one GIL, so a request that lands behind a page
+    # render waits one render (~20ms) however fast it is itself
+    parser.add_argument('--min-delta-ms', type=float, default=20.0,
+                        help='ignore p95 increases smaller than this many milliseconds (default 20)')
+    parser.add_argument('--capacity-budgets', help='fail if any endpoint exceeds its capacity budget in this file')
+    parser.add_argument('--update-capacity-budgets', help='write budgets from this run\'s capacity per request')
+    parser.add_argument('--budget-headroom', type=float, default=1.5,
+                        help='budgets written are the measured capacity times this (default 1.5)')
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    print_report(report)
+
+    for path in (args.output, args.update_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+                f.write('\n')
+
+    if args.update_capacity_budgets:
+        with open(args.update_capacity_budgets, 'w') as f:
+            json.dump(budgets_from(report, args.budget_headroom), f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions, warnings = compare(report, json.load(f), args.tolerance, args.min_samples, args.min_delta_ms)
+        for warning in warnings:
+            print(f"WARNING: {warning}")
+        if regressions:
+            print('Regressions against baseline:')
+            for regression in regressions:
+                print(f"  {regression}")
+            status = 1
+        else:
+            print('No regressions against baseline')
+
+    if args.capacity_budgets:
+        with open(args.capacity_budgets) as f:
+            budgets = json.load(f)
+        # Reads grow with the data each user has, so compare like with like
+        measured = {key: budgets['config'].get(key) for key in ('users', 'services')}
+        if measured != {key: report['config'][key] for key in ('users', 'services')}:
+            print(f"Note: budgets were measured with {measured['users']} users and {measured['services']} services")
+        over = check_budgets(report, budgets)
+        if over:
+            print('Over capacity budget:')
+            for line in over:
+                print(f"  {line}")
+            status = 1
+        else:
+            print('All endpoints within capacity budgets')
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import math
+
+# DynamoDB bills reads in 4 KB units (half a unit when eventually consistent)
+# and writes in 1 KB units; transactions cost twice as much
+READ_UNIT_BYTES = 4096
+WRITE_UNIT_BYTES = 1024
+
+READ_OPERATIONS = frozenset({'GetItem', 'BatchGetItem', 'Query', 'Scan', 'TransactGetItems'})
+
+# 'reported' asks DynamoDB for ReturnConsumedCapacity on every call;
+# 'estimated' sizes the items each call touched, for local stand-ins whose
+# reported numbers are fixed per call; 'off' records nothing
+MODES = ('reported', 'estimated', 'off')
+
+
+def attribute_size(value):
+    """Approximate stored size of one attribute value in DynamoDB's wire format"""
+    (kind, inner), = value.items()
+    if kind == 'S':
+        return len(inner.encode())
+    if kind == 'N':
+        return len(inner.lstrip('-').replace('.', '')) // 2 + 1
+    if kind == 'B':
+        return len(inner)
+    if kind in ('SS', 'NS', 'BS'):
+        return sum(attribute_size({kind[0]: member}) for member in inner)
+    if kind == 'L':
+        return 3 + sum(1 + attribute_size(member) for member in inner)
+    if kind == 'M':
+        return 3 + sum(len(name.encode()) + 1 + attribute_size(member) for name, member in inner.items())
+    return 1
+
+
+def item_size(item):
+    if not item:
+        return 0
+    return sum(len(name.encode()) + attribute_size(value) for name, value in item.items())
+
+
+def read_units(size, consistent=False):
+    units = max(1, math.ceil(size / READ_UNIT_BYTES))
+    return units if consistent else units / 2
+
+
+def write_units(size):
+    return max(1, math.ceil(size / WRITE_UNIT_BYTES))
+
+
+def reported_capacity(operation, parsed):
+    """(table, read units, write units) from a response's ConsumedCapacity"""
+    consumed = parsed.get('ConsumedCapacity')
+    if not consumed:
+        return []
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    usage = []
+    for entry in consumed:
+        total = float(entry.get('CapacityUnits', 0))
+        if 'ReadCapacityUnits' in entry or 'WriteCapacityUnits' in entry:
+            read, write = float(entry.get('ReadCapacityUnits', 0)), float(entry.get('WriteCapacityUnits', 0))
+        elif operation in READ_OPERATIONS:
+            read, write = total, 0.0
+        else:
+            read, write = 0.0, total
+        usage.append((entry.get('TableName', '-'), read, write))
+    return usage
+
+
+def estimated_capacity(operation, params, parsed):
+    """(table, read units, write units) sized from the items a call read or wrote.
+
+    Queries and scans are charged for every item evaluated, not just those
+    returned, so filtered-out items are counted at the returned items' average
+    size. Writes to secondary indexes are not included.
+    """
+    table = params.get('TableName', '-')
+    consistent = bool(params.get('ConsistentRead'))
+    if operation == 'GetItem':
+        return [(table, read_units(item_size(parsed.get('Item')), consistent), 0.0)]
+    if operation in ('Query', 'Scan'):
+        items = parsed.get('Items', [])
+        size = sum(item_size(item) for item in items)
+        scanned = parsed.get('ScannedCount', len(items))
+        if scanned > len(items):
+            size += (scanned - len(items)) * (size / len(items) if items else WRITE_UNIT_BYTES)
+        return [(table, read_units(size, consistent), 0.0)]
+    if operation == 'BatchGetItem':
+        requested = params.get('RequestItems', {})
+        return [(name, sum(read_units(item_size(item), requested.get(name, {}).get('ConsistentRead', False))
+                           for item in items), 0.0)
+                for name, items in parsed.get('Responses', {}).items()]
+    if operation == 'TransactGetItems':
+        usage = []
+        for action, response in zip(params.get('TransactItems', []), parsed.get('Responses', [])):
+            usage.append((action['Get']['TableName'], 2 * read_units(item_size(response.get('Item')), True), 0.0))
+        return usage
+    if operation == 'PutItem':
+        return [(table, 0.0, float(write_units(item_size(params.get('Item')))))]
+    if operation in ('UpdateItem', 'DeleteItem'):
+        return [(table, 0.0, float(write_units(item_size(parsed.get('Attributes')))))]
+    if operation == 'BatchWriteItem':
+        return [(name, 0.0, float(sum(write_units(item_size(request.get('PutRequest', {}).get('Item')))
+                                      for request in requests)))
+                for name, requests in params.get('RequestItems', {}).items()]
+    if operation == 'TransactWriteItems':
+        usage = []
+        for action in params.get('TransactItems', []):
+            (kind, body), = action.items()
+            usage.append((body['TableName'], 0.0, 2.0 * write_units(item_size(body.get('Item')))))
+        return usage
+    return []
+
+
+def capacity_handlers(record, mode='reported'):
+    """botocore (event name, handler) pairs that pass each DynamoDB call's
+    consumption to ``record(table, operation, read_units, write_units)``"""
+    if mode not in MODES:
+        raise ValueError(f"DynamoDB capacity mode must be one of {', '.join(MODES)}")
+    if mode == 'off':
+        return []
+
+    def before_parameter_build(params, model, context, **kwargs):
+        if mode == 'reported':
+            if 'ReturnConsumedCapacity' in model.input_shape.members:
+                params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+        else:
+            # The resource layer serializes these in place, so by the time
+            # the call returns they hold the wire format item_size expects
+            context['capacity_params'] = params
+
+    def after_call(parsed, model, context, **kwargs):
+        operation = model.name
+        if mode == 'reported':
+            usage = reported_capacity(operation, parsed)
+        else:
+            usage = estimated_capacity(operation, context.pop('capacity_params', {}), parsed)
+        for table, read, write in usage:
+            record(table, operation, read, write)
+
+    return [('before-parameter-build.dynamodb', before_parameter_build), ('after-call.dynamodb', after_call)]
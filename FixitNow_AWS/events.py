@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Returned by Subscription.get() after events were dropped; the client should
+# reload its lists instead of applying deltas
+RESYNC = {'type': 'resync', 'data': {}}
+
+
+class StreamLimitReached(Exception):
+    """The broker already holds as many subscriptions as it allows"""
+
+
+class Subscription:
+    """One event stream's bounded inbox"""
+
+    def __init__(self, broker, channels, maxsize):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._overflowed = False
+
+    def deliver(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # A slow reader loses deltas; it gets one resync instead
+            self._overflowed = True
+
+    def get(self, timeout):
+        """Next event, RESYNC after an overflow, or None when the timeout passes"""
+        if self._overflowed:
+            self._overflowed = False
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    return RESYNC
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """In-process pub/sub: events reach subscribers in this worker only.
+
+    At most ``max_subscriptions`` streams may be open at once (no limit when
+    None); the check and the registration happen under one lock, so
+    concurrent connects cannot overshoot it.
+    """
+
+    def __init__(self, queue_size=100, max_subscriptions=None):
+        self.queue_size = queue_size
+        self.max_subscriptions = max_subscriptions
+        self._lock = threading.Lock()
+        self._channels = {}
+        self._subscriptions = set()
+
+    def subscribe(self, channels):
+        """Open a subscription; raises StreamLimitReached when the broker is full"""
+        subscription = Subscription(self, channels, self.queue_size)
+        with self._lock:
+            if self.max_subscriptions is not None and len(self._subscriptions) >= self.max_subscriptions:
+                raise StreamLimitReached(f"{len(self._subscriptions)} event streams are already open")
+            self._subscriptions.add(subscription)
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def publish(self, channels, event):
+        self.deliver_local(channels, event)
+
+    def deliver_local(self, channels, event):
+        with self._lock:
+            subscribers = set()
+            for channel in channels:
+                subscribers.update(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+
+class RedisBroker(LocalBroker):
+    """Fans events out through Redis pub/sub so every worker's subscribers see them.
+
+    Each process runs one listener thread, started lazily after fork, that
+    hands messages from Redis to its local subscribers.
+    """
+
+    def __init__(self, url, queue_size=100, topic='fixitnow:events', max_subscriptions=None):
+        super().__init__(queue_size, max_subscriptions)
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("EVENT_BROKER_URL points at Redis but the redis package is not installed") from e
+        self._redis = redis.Redis.from_url(url)
+        self.topic = topic
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            threading.Thread(target=self._listen, name='event-listener', daemon=True).start()
+            self._listener_pid = os.getpid()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.topic)
+                for message in pubsub.listen():
+                    self._dispatch(message)
+            except Exception as e:
+                logger.warning(f"Event listener lost its Redis connection: {e}")
+                # Anything published while disconnected is gone; make every stream reload
+                with self._lock:
+                    channels = list(self._channels)
+                self.deliver_local(channels, RESYNC)
+                time.sleep(1)
+
+    def _dispatch(self, message):
+        try:
+            payload = json.loads(message['data'])
+            self.deliver_local(payload['channels'], payload['event'])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed event message: {e}")
+
+    def subscribe(self, channels):
+        self._ensure_listener()
+        return super().subscribe(channels)
+
+    def publish(self, channels, event):
+        self._redis.publish(self.topic, json.dumps({'channels': list(channels), 'event': event}))
+
+
+def create_broker(url, queue_size=100, max_subscriptions=None):
+    """Build the broker named by EVENT_BROKER_URL: empty for in-process, or redis://..."""
+    if not url or url == 'local':
+        return LocalBroker(queue_size, max_subscriptions)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisBroker(url, queue_size, max_subscriptions=max_subscriptions)
+    raise ValueError(f"Unsupported event broker: {url}")
@@ -0,0 +1,143 @@
+import base64
+import binascii
+import csv
+import io
+import json
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Segment state in a checkpoint: None (not started), the start key of the
+# next page, or DONE once the segment has been read to the end
+DONE = True
+
+_PAGE = 'page'
+_ERROR = 'error'
+_FINISHED = 'finished'
+
+
+class ExportError(Exception):
+    """A segment scan failed; the export can resume from its last checkpoint"""
+
+
+def encode_checkpoint(table, segments):
+    payload = json.dumps({'table': table, 'segments': segments}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_checkpoint(token, table, max_segments):
+    """Per-segment state from a checkpoint token; raises ValueError if it is not one for table"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Malformed checkpoint') from e
+    if not isinstance(data, dict) or data.get('table') != table:
+        raise ValueError('Checkpoint belongs to another export')
+    segments = data.get('segments')
+    if not isinstance(segments, list) or not 1 <= len(segments) <= max_segments:
+        raise ValueError('Malformed checkpoint')
+    for state in segments:
+        if state is None or state is DONE:
+            continue
+        if not isinstance(state, dict) or not all(isinstance(k, str) and isinstance(v, str) for k, v in state.items()):
+            raise ValueError('Malformed checkpoint')
+    return segments
+
+
+def parallel_scan(scan_page, segments, workers=4, page_size=500, buffered_pages=8):
+    """Yield (items, segments) for every page of a parallel scan.
+
+    ``scan_page(segment, total_segments, start_key, limit)`` reads one page
+    and returns ``(items, last_key)``. ``segments`` holds the state of each
+    segment as in a checkpoint; the copy yielded with a page is safe to
+    resume from once that page's items have been written out. Segment
+    threads hand pages over through a bounded queue, so memory stays at
+    ``buffered_pages`` pages however large the table is, and they stop when
+    the consumer goes away. Raises ExportError when a segment fails.
+    """
+    total = len(segments)
+    state = list(segments)
+    pages = queue.Queue(maxsize=buffered_pages)
+    stop = threading.Event()
+
+    def hand_over(message):
+        while not stop.is_set():
+            try:
+                pages.put(message, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read_segment(segment, start_key):
+        try:
+            while not stop.is_set():
+                items, last_key = scan_page(segment, total, start_key, page_size)
+                if not hand_over((_PAGE, segment, items, last_key)):
+                    return
+                if not last_key:
+                    break
+                start_key = last_key
+        except Exception as e:
+            hand_over((_ERROR, segment, e, None))
+            return
+        hand_over((_FINISHED, segment, None, None))
+
+    pending = [segment for segment in range(total) if state[segment] is not DONE]
+    executor = ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending) or 1)), thread_name_prefix='export-scan')
+    try:
+        for segment in pending:
+            executor.submit(read_segment, segment, state[segment])
+        running = len(pending)
+        while running:
+            kind, segment, payload, last_key = pages.get()
+            if kind == _ERROR:
+                raise ExportError(f"Segment {segment} failed: {payload}") from payload
+            if kind == _FINISHED:
+                running -= 1
+                continue
+            state[segment] = last_key if last_key else DONE
+            yield payload, list(state)
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def ndjson_stream(pages, table, to_row):
+    """NDJSON rows with a {"_checkpoint": ...} line after each page"""
+    rows = 0
+    try:
+        for items, segments in pages:
+            lines = [json.dumps(to_row(item), default=str) for item in items]
+            rows += len(lines)
+            lines.append(json.dumps({'_checkpoint': encode_checkpoint(table, segments)}))
+            yield '\n'.join(lines) + '\n'
+    except ExportError as e:
+        logger.error(f"Export of {table} failed: {e}")
+        yield json.dumps({'_error': 'Export interrupted; resume from the last checkpoint'}) + '\n'
+        return
+    yield json.dumps({'_complete': True, 'rows': rows}) + '\n'
+
+
+def csv_stream(pages, table, columns, to_row):
+    """Plain CSV: the header, then the rows, with nothing a CSV reader would
+    mistake for data. Checkpoints are only sent in NDJSON. A failed scan is
+    re-raised so the server aborts the response; the client then sees an
+    incomplete transfer rather than a file that merely looks short.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+    try:
+        for items, _ in pages:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(to_row(item) for item in items)
+            yield buffer.getvalue()
+    except ExportError as e:
+        logger.error(f"Export of {table} failed: {e}")
+        raise
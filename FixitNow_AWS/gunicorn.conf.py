@@ -0,0 +1,21 @@
+import multiprocessing
+import os
+
+# gunicorn picks this file up automatically when started from FixitNow_AWS:
+#   gunicorn app:app
+# or, to build a fresh app from the factory:
+#   gunicorn 'app:create_app()'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)))
+# Each open /api/events stream holds a thread; keep this above EVENT_STREAM_LIMIT
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+
+# Import the app once in the master; workers get their own AWS clients after fork
+preload_app = True
+
+
+def post_worker_init(worker):
+    # Runs in each worker after the app is loaded, before it accepts requests
+    from app import warm_up
+    warm_up(worker.wsgi)
@@ -0,0 +1,184 @@
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Lower ranks are dispatched first; unknown priorities go last
+PRIORITY_RANKS = {'emergency': 0, 'high': 1, 'medium': 2, 'low': 3}
+# Sorts after every ISO date, so requests without a preferred date come last
+NO_DATE = '~'
+# Names of the parts of a ranking key, in order, as used in page cursors
+KEY_FIELDS = ('rank', 'preferred_date', 'created_at', 'service_id')
+
+# Changes this process wrote are replayed over reloads for this long, so a
+# load from a lagging index cannot undo them. A settled load that started
+# after a change already reflects it; replaying the change there would bring
+# back requests that other workers have since taken.
+RECENT_CHANGE_SECONDS = 60.0
+
+
+def is_open(service):
+    """Whether a service belongs in the backlog (mirrors the open-requests stats record)"""
+    return service.status == 'pending' and not service.service_provider
+
+
+def rank_key(service):
+    """Sort key of an open request: priority, then earliest preferred date, then oldest"""
+    return (str(PRIORITY_RANKS.get(service.priority, len(PRIORITY_RANKS))),
+            service.preferred_date or NO_DATE, service.created_at or '', service.service_id)
+
+
+class MatchingEngine:
+    """Per-process index of the open backlog, ranked within each service type.
+
+    Each type keeps its open requests in a list sorted by rank_key, so a page
+    of the best matches for any set of types is one bisect per type and a
+    k-way merge of ``limit`` entries, however large the backlog is. Changes
+    written by this process are applied as they happen and advance the
+    index's copy of the backlog's change counter. ``sync`` is given the
+    stored counter on every query; when it moved for a reason this process
+    did not see, such as another worker's write, the index is reloaded from
+    ``load`` before answering. ``load()`` returns ``(services, version,
+    settled)``; a load taken while the counter had not settled may predate
+    the index catching up, so it is repeated once ``settle_seconds`` pass.
+
+    A reload reads the whole open-requests index, so every write made by
+    another worker costs each worker one full backlog read (a paged Query of
+    the sparse index, about one read unit per 8 KB of open requests) on its
+    next query. Concurrent queries share a single reload.
+    """
+
+    def __init__(self, load, settle_seconds=2.0):
+        self.load = load
+        self.settle_seconds = settle_seconds
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._by_type = {}
+        self._entries = {}
+        self._recent = {}
+        self._version = None
+        self._recheck_at = None
+        self._pid = None
+        self._counters = {'queries': 0, 'applied': 0, 'reloads': 0}
+
+    def _current(self, version):
+        if self._pid != os.getpid() or (version is not None and self._version != version):
+            return False
+        return self._recheck_at is None or time.monotonic() < self._recheck_at
+
+    def sync(self, version=None):
+        """Make sure the index reflects the given backlog version (None: any loaded state)"""
+        version = None if version is None else int(version)
+        if self._current(version):
+            return
+        with self._load_lock:
+            # Concurrent queries wait for one reload instead of each running their own
+            if not self._current(version):
+                self.reload()
+
+    def reload(self):
+        """Rebuild the index from load(); the old one keeps serving meanwhile"""
+        started = time.monotonic()
+        services, version, settled = self.load()
+
+        by_type = {}
+        entries = {}
+        for service in services:
+            if is_open(service):
+                key = rank_key(service)
+                by_type.setdefault(service.service_type, []).append(key)
+                entries[service.service_id] = (key, service)
+        for keys in by_type.values():
+            keys.sort()
+
+        with self._lock:
+            self._by_type = by_type
+            self._entries = entries
+            self._recent = {service_id: change for service_id, change in self._recent.items()
+                            if started - change[1] < RECENT_CHANGE_SECONDS}
+            for service, applied_at in self._recent.values():
+                if not settled or applied_at >= started:
+                    self._apply(service)
+            self._version = None if version is None else int(version)
+            self._recheck_at = None if settled else started + self.settle_seconds
+            self._pid = os.getpid()
+            self._counters['reloads'] += 1
+        logger.debug(f"Matching index loaded {len(entries)} open requests in {(time.monotonic() - started) * 1000:.0f}ms")
+
+    def apply(self, old_service, new_service):
+        """Apply a change this process wrote; old_service is None for a new request"""
+        if not is_open(new_service) and (old_service is None or not is_open(old_service)):
+            return
+        with self._lock:
+            self._recent[new_service.service_id] = (new_service, time.monotonic())
+            if self._pid != os.getpid():
+                return
+            self._apply(new_service)
+            if self._version is not None:
+                self._version += 1
+            self._counters['applied'] += 1
+
+    def _apply(self, service):
+        service_id = service.service_id
+        entry = self._entries.get(service_id)
+        if entry is not None:
+            if (entry[1].updated_at or '') > (service.updated_at or ''):
+                return
+            self._discard(service_id)
+        if is_open(service):
+            key = rank_key(service)
+            bisect.insort(self._by_type.setdefault(service.service_type, []), key)
+            self._entries[service_id] = (key, service)
+
+    def _discard(self, service_id):
+        key, service = self._entries.pop(service_id)
+        keys = self._by_type.get(service.service_type, [])
+        position = bisect.bisect_left(keys, key)
+        if position < len(keys) and keys[position] == key:
+            del keys[position]
+        if not keys:
+            self._by_type.pop(service.service_type, None)
+
+    def settled(self):
+        """Whether the index was loaded from a settled backlog, so that any
+        process at the same version answers every query the same way"""
+        with self._lock:
+            return self._pid == os.getpid() and self._version is not None and self._recheck_at is None
+
+    def top(self, types=None, limit=50, after=None):
+        """Best-ranked open requests of the given types (all types when None).
+
+        ``after`` is the ranking key of the last request on the previous
+        page. Returns (services, last_key); last_key is None on the last page.
+        """
+        with self._lock:
+            self._counters['queries'] += 1
+            if types is None:
+                lists = list(self._by_type.values())
+            else:
+                lists = [self._by_type[service_type] for service_type in set(types) if service_type in self._by_type]
+            runs = []
+            for keys in lists:
+                start = bisect.bisect_right(keys, after) if after else 0
+                runs.append(map(keys.__getitem__, range(start, len(keys))))
+            page = []
+            for key in heapq.merge(*runs):
+                page.append(key)
+                if len(page) > limit:
+                    break
+            more = len(page) > limit
+            page = page[:limit]
+            services = [self._entries[key[-1]][1] for key in page]
+        return services, (page[-1] if more and page else None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['open_requests'] = len(self._entries)
+            stats['service_types'] = len(self._by_type)
+            stats['version'] = self._version
+        return stats
@@ -0,0 +1,244 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds; Prometheus' default buckets with a finer low end for cache hits
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+# DynamoDB capacity units consumed by one request
+CAPACITY_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+# Route label for work done outside a request, such as background SNS delivery
+BACKGROUND = 'background'
+
+_current = ContextVar('request_timings', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_bound(bound):
+    return repr(float(bound)) if bound != int(bound) else f"{int(bound)}.0"
+
+
+class Histogram:
+    """Prometheus histogram with one series per combination of label values"""
+
+    def __init__(self, name, documentation, labels, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> per-bucket counts (the last one is +Inf), then the sum
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((values, list(counts)) for values, counts in self._series.items())
+        for values, counts in series:
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values))
+            prefix = f"{labels}," if labels else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_bound(bound)}"}} {cumulative}')
+            cumulative += counts[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ''
+            lines.append(f"{self.name}_sum{suffix} {counts[-1]}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return '\n'.join(lines)
+
+
+class Counter:
+    """Prometheus counter with one series per combination of label values"""
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def inc(self, amount, *label_values):
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for values, total in series:
+            labels = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, values))
+            lines.append(f"{self.name}{{{labels}}} {total}")
+        return '\n'.join(lines)
+
+
+class RequestTimings:
+    """Where one request's time went: phase name -> [calls, seconds], plus
+    the DynamoDB read and write capacity units it consumed"""
+
+    __slots__ = ('route', 'started', 'phases', 'template_started', 'read_units', 'write_units')
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.template_started = None
+        self.read_units = 0.0
+        self.write_units = 0.0
+
+    def add(self, phase, seconds):
+        entry = self.phases.get(phase)
+        if entry is None:
+            self.phases[phase] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+
+class Instrumentation:
+    """Per-process request metrics, exported in Prometheus text format.
+
+    ``start`` and ``finish`` bracket a request; in between, AWS calls (via
+    the botocore hooks from ``botocore_handlers``), template renders and
+    ``timed`` blocks are charged to it. Work on other threads, such as
+    background SNS delivery or export scans, is recorded under the
+    ``background`` route. Each gunicorn worker keeps its own numbers.
+    """
+
+    def __init__(self, prefix='fixitnow'):
+        self.request_duration = Histogram(
+            f"{prefix}_request_duration_seconds", 'Time to build a response, by route.',
+            ('route', 'method', 'status'))
+        self.phase_duration = Histogram(
+            f"{prefix}_request_phase_seconds", 'Time one request spent in each phase, by route.',
+            ('route', 'phase'))
+        self.aws_call_duration = Histogram(
+            f"{prefix}_aws_call_duration_seconds", 'Latency of AWS API calls, retries included.',
+            ('route', 'service', 'operation'))
+        self.dynamodb_calls = Histogram(
+            f"{prefix}_dynamodb_calls_per_request", 'DynamoDB calls made by one request, by route.',
+            ('route',), CALL_COUNT_BUCKETS)
+        self.template_duration = Histogram(
+            f"{prefix}_template_render_seconds", 'Template render time, by route and template.',
+            ('route', 'template'))
+        self.request_capacity = Histogram(
+            f"{prefix}_dynamodb_request_capacity_units", 'DynamoDB capacity units consumed by one request.',
+            ('route', 'kind'), CAPACITY_BUCKETS)
+        self.consumed_capacity = Counter(
+            f"{prefix}_dynamodb_consumed_capacity_units_total", 'DynamoDB capacity units consumed.',
+            ('route', 'table', 'operation', 'kind'))
+        self._metrics = (self.request_duration, self.phase_duration, self.aws_call_duration,
+                            self.dynamodb_calls, self.template_duration, self.request_capacity,
+                            self.consumed_capacity)
+
+    def start(self, route):
+        timings = RequestTimings(route)
+        _current.set(timings)
+        return timings
+
+    def finish(self, method, status):
+        """Record the current request and return its timings (None outside a request)"""
+        timings = _current.get()
+        if timings is None:
+            return None
+        _current.set(None)
+        route = timings.route
+        self.request_duration.observe(time.perf_counter() - timings.started, route, method, str(status))
+        for phase, (_, seconds) in timings.phases.items():
+            self.phase_duration.observe(seconds, route, phase)
+        self.dynamodb_calls.observe(timings.phases.get('dynamodb', (0,))[0], route)
+        if timings.read_units or timings.write_units:
+            self.request_capacity.observe(timings.read_units, route, 'read')
+            self.request_capacity.observe(timings.write_units, route, 'write')
+        return timings
+
+    def record(self, phase, seconds):
+        timings = _current.get()
+        if timings is not None:
+            timings.add(phase, seconds)
+
+    def record_capacity(self, table, operation, read_units, write_units):
+        """Charge one DynamoDB call's consumed capacity to the current request"""
+        timings = _current.get()
+        route = timings.route if timings else BACKGROUND
+        if read_units:
+            self.consumed_capacity.inc(read_units, route, table, operation, 'read')
+        if write_units:
+            self.consumed_capacity.inc(write_units, route, table, operation, 'write')
+        if timings is not None:
+            timings.read_units += read_units
+            timings.write_units += write_units
+
+    @contextmanager
+    def timed(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - started)
+
+    def template_started(self, template):
+        timings = _current.get()
+        if timings is not None:
+            timings.template_started = time.perf_counter()
+
+    def template_rendered(self, template):
+        timings = _current.get()
+        if timings is None or timings.template_started is None:
+            return
+        seconds = time.perf_counter() - timings.template_started
+        timings.template_started = None
+        timings.add('template', seconds)
+        self.template_duration.observe(seconds, timings.route, template.name or '-')
+
+    def botocore_handlers(self):
+        """(event name, handler) pairs to register on every boto3 session"""
+
+        def before_call(context, **kwargs):
+            context['metrics_started'] = time.perf_counter()
+            # A non-None return would short-circuit the call
+
+        def after_call(event_name, context, **kwargs):
+            started = context.pop('metrics_started', None)
+            if started is None:
+                return
+            seconds = time.perf_counter() - started
+            # event_name is "after-call[-error].<service>.<operation>"
+            _, service, operation = event_name.split('.', 2)
+            timings = _current.get()
+            self.aws_call_duration.observe(seconds, timings.route if timings else BACKGROUND, service, operation)
+            if timings is not None:
+                timings.add(service, seconds)
+
+        return [('before-call', before_call), ('after-call', after_call), ('after-call-error', after_call)]
+
+    def render(self):
+        return '\n'.join(histogram.render() for histogram in self._metrics) + '\n'
+
+
+def server_timing(timings):
+    """Server-Timing header value: total time, each phase's time and call count,
+    and the DynamoDB capacity consumed"""
+    total = (time.perf_counter() - timings.started) * 1000
+    entries = [f"app;dur={total:.1f}"]
+    for phase, (calls, seconds) in timings.phases.items():
+        entries.append(f'{phase};dur={seconds * 1000:.1f};desc="{calls} call{"s" if calls != 1 else ""}"')
+    if timings.read_units or timings.write_units:
+        entries.append(f'capacity;desc="rcu={timings.read_units:g} wcu={timings.write_units:g}"')
+    return ', '.join(entries)
@@ -0,0 +1,121 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class NotificationDispatcher:
+    """Bounded in-process queue drained by a small pool of worker threads.
+
+    ``publish`` is called as ``publish(message, subject)`` on a worker thread and
+    is retried with exponential backoff when it raises. Workers are started
+    lazily in the process that first submits, so the dispatcher is safe to
+    create before gunicorn forks.
+    """
+
+    def __init__(self, publish, workers=2, queue_size=1000, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0):
+        self.publish = publish
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._counters = {'queued': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'dropped': 0}
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._threads = []
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"notification-worker-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            self._pid = os.getpid()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def submit(self, message, subject):
+        """Queue a notification; returns False if it had to be dropped"""
+        if self._closed:
+            self._count('dropped')
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((message, subject))
+        except queue.Full:
+            self._count('dropped')
+            logger.warning(f"Notification queue full, dropping: {subject}")
+            return False
+        self._count('queued')
+        return True
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _STOP:
+                    return
+                self._deliver(*job)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, message, subject):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.publish(message, subject)
+                self._count('sent')
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self._count('failed')
+                    logger.error(f"Giving up on notification '{subject}' after {attempt + 1} attempts: {e}")
+                    return
+                self._count('retried')
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                time.sleep(random.uniform(delay / 2, delay))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+    def shutdown(self, timeout=10.0):
+        """Stop accepting work and give queued notifications time to drain"""
+        self._closed = True
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        for _ in self._threads:
+            try:
+                self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        remaining = self._queue.qsize()
+        if remaining:
+            logger.warning(f"Notification dispatcher stopped with {remaining} undelivered notifications")
+
+    def register_atexit(self):
+        atexit.register(self.shutdown)
+        return self
@@ -0,0 +1,131 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+class HasherBusy(Exception):
+    """Raised when too many hashes are already waiting for the pool"""
+
+
+def normalize_method(method):
+    """Spell out werkzeug's defaults so the method matches stored hash prefixes"""
+    name, _, params = method.partition(':')
+    if name == 'scrypt' and not params:
+        return DEFAULT_METHOD
+    if name == 'pbkdf2':
+        parts = params.split(':') if params else []
+        if not parts:
+            parts.append('sha256')
+        if len(parts) == 1:
+            parts.append(str(DEFAULT_PBKDF2_ITERATIONS))
+        return ':'.join([name] + parts)
+    return method
+
+
+class PasswordHasher:
+    """Runs werkzeug password hashing in a bounded pool of worker processes.
+
+    KDFs are deliberately CPU-bound, so running them on request threads holds
+    the GIL and stalls every other request in the worker. At most
+    ``max_pending`` hashes may be queued or running; callers beyond that wait
+    up to ``wait_timeout`` seconds for a slot and then get HasherBusy, as do
+    callers whose hash was lost to a crashed pool process. The
+    pool is created lazily in the process that first hashes, so the hasher is
+    safe to create before gunicorn forks. Pool processes are started by a
+    forkserver and import the main module, so scripts that hash through the
+    app need the usual ``if __name__ == '__main__'`` guard. With
+    ``workers=0`` hashing runs inline on the calling thread.
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, salt_length=16, workers=2, max_pending=32, wait_timeout=10.0):
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.workers = workers
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._counters = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0}
+
+    def _executor(self):
+        if self._pid == os.getpid():
+            return self._pool
+        with self._lock:
+            if self._pid != os.getpid():
+                # forkserver children start from a clean process instead of
+                # copying this one's threads and AWS connections
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                self._pid = os.getpid()
+                logger.info(f"Started {self.workers} password hashing processes for pid {self._pid}")
+            return self._pool
+
+    def start(self):
+        """Start one hashing process now so the first sign-in does not wait for it"""
+        if self.workers > 0:
+            self._executor().submit(os.getpid).result()
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _run(self, function, *args):
+        if self.workers <= 0:
+            return function(*args)
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            self._count('rejected')
+            raise HasherBusy('Password hashing is saturated')
+        try:
+            return self._executor().submit(function, *args).result()
+        except BrokenProcessPool as e:
+            # A hashing process died; the next call starts a fresh pool
+            with self._lock:
+                self._pid = None
+            logger.error(f"Password hashing pool broke: {e}")
+            raise HasherBusy('Password hashing pool restarted') from e
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        password_hash = self._run(generate_password_hash, password, self.method, self.salt_length)
+        self._count('hashed')
+        return password_hash
+
+    def check(self, password_hash, password):
+        """Verify a password against its stored hash.
+
+        Returns ``(matched, new_hash)``; new_hash is a fresh hash with the
+        configured parameters when the stored one is outdated, otherwise None.
+        """
+        if not password_hash:
+            return False, None
+        matched = self._run(check_password_hash, password_hash, password)
+        self._count('verified')
+        if not matched or not self.needs_rehash(password_hash):
+            return matched, None
+        new_hash = self.hash(password)
+        self._count('rehashed')
+        return True, new_hash
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with other KDF parameters than the configured ones"""
+        return password_hash.partition('$')[0] != self.method
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def shutdown(self):
+        if self._pid == os.getpid() and self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,116 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessChecker:
+    """Per-process readiness computed off the request path.
+
+    A daemon thread runs every named check in ``checks`` (callables that
+    raise on failure) each ``interval`` seconds, so a probe only reads the
+    cached result. The process is ready once every check has passed, and stays
+    ready until one has failed ``failure_threshold`` times in a row. A result
+    older than three intervals counts as not ready, so a stuck checker cannot
+    keep reporting an old success. The thread starts lazily in the process
+    that first asks, which makes the checker safe to create before gunicorn
+    forks.
+    """
+
+    def __init__(self, checks, interval=10.0, failure_threshold=2):
+        self.checks = dict(checks)
+        self.interval = interval
+        self.failure_threshold = failure_threshold
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._ready = False
+        self._results = {}
+        self._failures = {}
+        self._checked_at = None
+        self._counters = {'runs': 0, 'failed_checks': 0, 'transitions': 0}
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Results and the thread from before a fork do not belong to this process
+            self._pid = os.getpid()
+            self._ready = False
+            self._results = {}
+            self._failures = {}
+            self._checked_at = None
+            self._wake = threading.Event()
+        threading.Thread(target=self._run, name='readiness-checker', daemon=True).start()
+
+    def _run(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            self.check_now()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def check_now(self):
+        """Run every check once and update the cached state"""
+        results = {}
+        failures = {}
+        for name, check in self.checks.items():
+            started = time.monotonic()
+            try:
+                check()
+                error = None
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            results[name] = {
+                'ok': error is None,
+                'latency_ms': round((time.monotonic() - started) * 1000, 1)
+            }
+            if error is not None:
+                results[name]['error'] = error
+                failures[name] = self._failures.get(name, 0) + 1
+
+        with self._lock:
+            was_ready = self._ready
+            self._results = results
+            self._failures = failures
+            if not failures:
+                self._ready = True
+            elif max(failures.values()) >= self.failure_threshold or not was_ready:
+                self._ready = False
+            self._checked_at = time.monotonic()
+            self._counters['runs'] += 1
+            self._counters['failed_checks'] += len(failures)
+            if self._ready != was_ready:
+                self._counters['transitions'] += 1
+            ready = self._ready
+        if ready != was_ready:
+            log = logger.info if ready else logger.warning
+            log(f"Worker {os.getpid()} is {'ready' if ready else 'not ready'}: {results}")
+        return ready
+
+    def status(self):
+        """Cached (ready, details); never runs a check on the caller's thread"""
+        self._ensure_started()
+        with self._lock:
+            checked_at = self._checked_at
+            ready = self._ready
+            details = {'checks': dict(self._results)}
+        if checked_at is None:
+            details['reason'] = 'first check pending'
+            return False, details
+        age = time.monotonic() - checked_at
+        details['age_seconds'] = round(age, 1)
+        if age > 3 * self.interval:
+            details['reason'] = 'checks are stale'
+            return False, details
+        return ready, details
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['ready'] = self._ready
+        return stats
@@ -0,0 +1,156 @@
+from datetime import datetime
+from decimal import Decimal
+
+
+class FieldType:
+    """How one attribute is decoded from DynamoDB and encoded to JSON.
+
+    ``decode`` and ``to_json`` are None when the stored value is already the
+    right type, so the compiled codecs skip the call entirely.
+    """
+
+    __slots__ = ('name', 'decode', 'to_json')
+
+    def __init__(self, name, decode=None, to_json=None):
+        self.name = name
+        self.decode = decode
+        self.to_json = to_json
+
+
+# Strings as stored
+TEXT = FieldType('text')
+# ISO-8601 strings as stored; they are already their own JSON form. Use
+# parse_timestamp() where a datetime is actually needed.
+TIMESTAMP = FieldType('timestamp')
+# DynamoDB numbers stay exact Decimals on the record and become floats in JSON
+NUMBER = FieldType('number', to_json=float)
+# Whole numbers such as ratings
+INTEGER = FieldType('integer', decode=int)
+
+
+def parse_timestamp(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def to_attribute(value):
+    """Convert a Python value from request handling to its stored DynamoDB form"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, float):
+        return Decimal(str(value))
+    return value
+
+
+def _json_value(value):
+    # Only used for attributes outside the schema
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+class Record:
+    """Base for slotted, schema-driven views of DynamoDB items.
+
+    Subclasses declare ``FIELDS`` (attribute name -> FieldType) and
+    ``__slots__ = tuple(FIELDS)``; the per-field codecs are compiled once when
+    the class is created. Missing attributes read as None. Attributes outside
+    the schema are kept in ``extra`` so writing a record back loses nothing.
+    Records are shared (e.g. from the user cache) and treated as read-only.
+    """
+
+    __slots__ = ('extra',)
+    FIELDS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._names = tuple(cls.FIELDS)
+        cls._field_names = frozenset(cls.FIELDS)
+        cls._decoders = tuple((name, field.decode) for name, field in cls.FIELDS.items())
+        cls._encoders = tuple((name, field.to_json) for name, field in cls.FIELDS.items())
+
+    @classmethod
+    def from_item(cls, item):
+        if not item:
+            return None
+        record = cls.__new__(cls)
+        matched = 0
+        for name, decode in cls._decoders:
+            value = item.get(name)
+            if value is not None:
+                matched += 1
+                if decode is not None:
+                    value = decode(value)
+            setattr(record, name, value)
+        if matched == len(item):
+            record.extra = None
+        else:
+            record.extra = {key: item[key] for key in item.keys() - cls._field_names} or None
+        return record
+
+    def to_item(self):
+        """The record in its stored form; None attributes are left out"""
+        item = {}
+        for name in self._names:
+            value = getattr(self, name)
+            if value is not None:
+                item[name] = value
+        if self.extra:
+            item.update(self.extra)
+        return item
+
+    def to_json(self):
+        data = {}
+        for name, encode in self._encoders:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value if encode is None else encode(value)
+        if self.extra:
+            for key, value in self.extra.items():
+                data[key] = _json_value(value)
+        return data
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_item()!r})"
+
+
+class Service(Record):
+    FIELDS = {
+        'service_id': TEXT,
+        'homeowner': TEXT,
+        'service_provider': TEXT,
+        'service': TEXT,
+        'service_type': TEXT,
+        'priority': TEXT,
+        'description': TEXT,
+        'status': TEXT,
+        'open_request': TEXT,
+        'preferred_date': TIMESTAMP,
+        'start_date': TIMESTAMP,
+        'created_at': TIMESTAMP,
+        'updated_at': TIMESTAMP,
+        'cost': NUMBER,
+        'duration': NUMBER,
+        'rating': INTEGER,
+        'completion_notes': TEXT
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class User(Record):
+    FIELDS = {
+        'username': TEXT,
+        'password': TEXT,
+        'user_type': TEXT,
+        'created_at': TIMESTAMP
+    }
+    __slots__ = tuple(FIELDS)
+
+    def to_json(self):
+        # Never expose the password hash
+        return {
+            'username': self.username,
+            'user_type': self.user_type,
+            'created_at': self.created_at
+        }
@@ -0,0 +1,117 @@
+import gzip
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Response types worth compressing; everything else (images, event streams,
+# exports) is passed through as is
+COMPRESSIBLE_TYPES = frozenset({
+    'application/json', 'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript'
+})
+
+
+def _default(value):
+    """Encode the non-JSON values stored records and stats carry"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's provider, with numbers for Decimals and ISO-8601 for datetimes"""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson.
+
+    Encodes Decimal and datetime values the same way as StdlibJSONProvider.
+    ``response`` hands orjson's bytes straight to the response without the
+    decode and re-encode a str provider costs. Keys are not sorted unless a
+    caller asks for it (the ``tojson`` filter does).
+    """
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps(obj, **kwargs).decode()
+
+    def _dumps(self, obj, sort_keys=False, indent=None, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', _default), option=option)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._dumps(obj, indent=indent) + b'\n', mimetype=self.mimetype)
+
+
+def json_provider_class(name='auto'):
+    """The provider for JSON_PROVIDER: 'orjson', 'stdlib', or 'auto' for orjson when installed"""
+    if name == 'stdlib' or (name == 'auto' and orjson is None):
+        return StdlibJSONProvider
+    if orjson is None:
+        raise RuntimeError("JSON_PROVIDER is orjson but the orjson package is not installed")
+    return OrjsonProvider
+
+
+def choose_encoding(accept_encoding):
+    """Preferred content coding the client accepts: br, then gzip, else None"""
+    if brotli is not None and accept_encoding['br']:
+        return 'br'
+    if accept_encoding['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response, accept_encoding, min_size=1024, gzip_level=5, brotli_quality=4):
+    """Compress a buffered text response in place when it is large enough.
+
+    Streamed, already encoded, partial and error responses are left alone.
+    Returns the encoding used, or None.
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES):
+        return None
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return None
+    body = response.get_data()
+    if len(body) < min_size:
+        return None
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=brotli_quality))
+    else:
+        response.set_data(gzip.compress(body, compresslevel=gzip_level, mtime=0))
+    response.headers['Content-Encoding'] = encoding
+    # Compressed bytes differ from the identity ones, so the validator must too
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return encoding
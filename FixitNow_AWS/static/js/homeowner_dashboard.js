@@ -1,5 +1,14 @@
 // Homeowner Dashboard JavaScript
 
+// Services on the dashboard, kept current by the event stream between reloads
+let dashboardServices = [];
+let eventStreamConnected = false;
+// Cursor from the last /api/get-services response; later loads fetch only what changed since
+let servicesCursor = null;
+let servicesSync = null;
+// Page cursor behind the "Older Requests" link
+let olderPage = null;
+
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize dashboard
     initializeDashboard();
@@ -10,8 +19,11 @@ document.addEventListener('DOMContentLoaded', function() {
         serviceRequestForm.addEventListener('submit', handleServiceRequest);
     }
     
-    // Load user services
-    loadUserServices();
+    // The page arrives rendered with its newest services; start from that data
+    loadDashboardData();
+    
+    // Live updates; polling takes over whenever the stream is down
+    connectEventStream();
     
     // Set minimum date for preferred date picker
     const preferredDateInput = document.getElementById('preferredDate');
@@ -26,9 +38,52 @@ function initializeDashboard() {
     
     // Add event listeners for action buttons
     addActionButtonListeners();
+}
+
+// Adopt the services and sync cursor the page was rendered with instead of fetching them again
+function loadDashboardData() {
+    const element = document.getElementById('dashboardData');
+    if (!element) {
+        loadUserServices();
+        return;
+    }
+    const data = JSON.parse(element.textContent);
+    dashboardServices = data.services || [];
+    servicesCursor = data.cursor || null;
+    setOlderPage(data.next_page);
+}
+
+function setOlderPage(page) {
+    olderPage = page || null;
+    const link = document.querySelector('a[data-action="load-older"]');
+    if (link) {
+        link.classList.toggle('d-none', !olderPage);
+    }
+}
+
+// Add the next page of older services to the lists
+function loadOlderServices(event) {
+    event.preventDefault();
+    if (!olderPage) return;
     
-    // Load real-time stats
-    loadDashboardStats();
+    fetch(`/api/get-services?page=${encodeURIComponent(olderPage)}`)
+    .then(response => response.json())
+    .then(data => {
+        if (!data.services) {
+            throw new Error(data.error || 'Failed to load older requests');
+        }
+        // Services already on the dashboard are at least as recent as the page's copy
+        data.services
+            .filter(service => !dashboardServices.some(s => s.service_id === service.service_id))
+            .forEach(mergeService);
+        setOlderPage(data.next_page);
+        updateActiveRequests(dashboardServices);
+        updateMaintenanceRecords(dashboardServices);
+    })
+    .catch(error => {
+        console.error('Error loading older services:', error);
+        showAlert('Failed to load older requests', 'error');
+    });
 }
 
 function handleServiceRequest(event) {
@@ -73,8 +128,7 @@ function handleServiceRequest(event) {
         if (data.success) {
             showAlert('Service request submitted successfully!', 'success');
             event.target.reset();
-            loadUserServices(); // Refresh the services list
-            loadDashboardStats(); // Update stats
+            loadUserServices(); // Refresh the services list and stats
         } else {
             showAlert(data.error || 'Failed to submit service request', 'error');
         }
@@ -90,14 +144,57 @@ function handleServiceRequest(event) {
     });
 }
 
-function loadUserServices() {
-    fetch('/api/get-services')
+// Bring dashboardServices up to date. Concurrent callers share one request,
+// and once a cursor is known only the changed services are downloaded.
+function syncServices() {
+    if (servicesSync) return servicesSync;
+    
+    const url = servicesCursor ? `/api/get-services?since=${encodeURIComponent(servicesCursor)}` : '/api/get-services';
+    servicesSync = fetch(url)
     .then(response => response.json())
     .then(data => {
-        if (data.services) {
-            updateActiveRequests(data.services);
-            updateMaintenanceRecords(data.services);
+        if (!data.services) {
+            // A rejected or expired cursor falls back to a full load next time
+            servicesCursor = null;
+            throw new Error(data.error || 'Failed to load services');
+        }
+        let changed = data.services;
+        if (data.delta) {
+            // The cursor overlaps the last sync, so most deltas repeat known versions
+            const known = new Map(dashboardServices.map(s => [s.service_id, s.updated_at]));
+            changed = data.services.filter(service => known.get(service.service_id) !== service.updated_at);
+            changed.forEach(mergeService);
+        } else {
+            dashboardServices = data.services;
         }
+        servicesCursor = data.next_cursor || null;
+        // Whether anything on the dashboard may have changed
+        return !data.delta || changed.length > 0;
+    })
+    .finally(() => {
+        servicesSync = null;
+    });
+    return servicesSync;
+}
+
+// Replace or add one service, keeping the newest first like the server's list
+function mergeService(service) {
+    const index = dashboardServices.findIndex(s => s.service_id === service.service_id);
+    if (index >= 0) {
+        dashboardServices[index] = service;
+    } else {
+        dashboardServices.push(service);
+    }
+    dashboardServices.sort((a, b) => (b.updated_at || '').localeCompare(a.updated_at || ''));
+}
+
+function loadUserServices() {
+    syncServices()
+    .then(changed => {
+        if (!changed) return;
+        updateActiveRequests(dashboardServices);
+        updateMaintenanceRecords(dashboardServices);
+        loadDashboardStats();
     })
     .catch(error => {
         console.error('Error loading services:', error);
@@ -211,31 +308,26 @@ function updateMaintenanceRecords(services) {
     });
 }
 
+// The dashboard only holds a page of services, so totals come from the server's counters
 function loadDashboardStats() {
-    fetch('/api/get-services')
+    fetch('/api/dashboard-stats')
     .then(response => response.json())
-    .then(data => {
-        if (data.services) {
-            updateStatsCards(data.services);
+    .then(stats => {
+        if (stats.error) {
+            throw new Error(stats.error);
         }
+        updateStatsCards(stats);
     })
     .catch(error => {
         console.error('Error loading stats:', error);
     });
 }
 
-function updateStatsCards(services) {
-    const stats = {
-        total: services.length,
-        inProgress: services.filter(s => s.status === 'in_progress').length,
-        completed: services.filter(s => s.status === 'completed').length,
-        scheduled: services.filter(s => s.status === 'scheduled').length
-    };
-    
+function updateStatsCards(stats) {
     const statCards = document.querySelectorAll('.stat-card .stat-number');
     if (statCards.length >= 4) {
-        statCards[0].textContent = stats.total;
-        statCards[1].textContent = stats.inProgress;
+        statCards[0].textContent = stats.total_requests;
+        statCards[1].textContent = stats.in_progress;
         statCards[2].textContent = stats.completed;
         statCards[3].textContent = stats.scheduled;
     }
@@ -253,6 +345,11 @@ function addActionButtonListeners() {
         viewAllButton.addEventListener('click', viewAllRequests);
     }
     
+    const olderLink = document.querySelector('a[data-action="load-older"]');
+    if (olderLink) {
+        olderLink.addEventListener('click', loadOlderServices);
+    }
+    
     // Add hover effects for service cards (preserve your existing functionality)
     document.addEventListener('mouseenter', function(e) {
         if (e.target.closest('.service-card')) {
@@ -270,12 +367,13 @@ function addActionButtonListeners() {
 // Action functions
 function viewServiceDetails(serviceId) {
     // Create a modal to show service details
-    fetch('/api/get-services')
+    fetch(`/api/services/${encodeURIComponent(serviceId)}`)
     .then(response => response.json())
     .then(data => {
-        const service = data.services.find(s => s.service_id === serviceId);
-        if (service) {
-            showServiceDetailsModal(service);
+        if (data.service) {
+            showServiceDetailsModal(data.service);
+        } else {
+            showAlert(data.error || 'Failed to load service details', 'error');
         }
     })
     .catch(error => {
@@ -749,8 +847,7 @@ function updateServiceStatus(serviceId, status, additionalData = {}) {
     .then(data => {
         if (data.success) {
             showAlert('Service status updated successfully!', 'success');
-            loadUserServices(); // Refresh the services list
-            loadDashboardStats(); // Update stats
+            loadUserServices(); // Refresh the services list and stats
         } else {
             showAlert(data.error || 'Failed to update service status', 'error');
         }
@@ -765,8 +862,36 @@ function updateServiceStatus(serviceId, status, additionalData = {}) {
 function checkForUpdates() {
     console.log('Checking for request updates...');
     loadUserServices();
+}
+
+function connectEventStream() {
+    if (!window.EventSource) return;
+    
+    const source = new EventSource('/api/events');
+    source.addEventListener('open', () => {
+        eventStreamConnected = true;
+        // Catch up on anything that changed while the stream was down
+        checkForUpdates();
+    });
+    source.addEventListener('error', () => {
+        // The browser reconnects on its own unless the server refused the stream
+        eventStreamConnected = source.readyState === EventSource.OPEN;
+    });
+    source.addEventListener('service', event => applyServiceUpdate(JSON.parse(event.data)));
+    source.addEventListener('resync', checkForUpdates);
+}
+
+// Merge one pushed service into the dashboard without refetching the list
+function applyServiceUpdate(service) {
+    mergeService(service);
+    updateActiveRequests(dashboardServices);
+    updateMaintenanceRecords(dashboardServices);
     loadDashboardStats();
 }
 
-// Check for updates every 30 seconds
-setInterval(checkForUpdates, 30000);
\ No newline at end of file
+// Poll every 30 seconds only while the event stream is not connected
+setInterval(() => {
+    if (!eventStreamConnected) {
+        checkForUpdates();
+    }
+}, 30000);
\ No newline at end of file
@@ -5,6 +5,14 @@ class ServiceProviderDashboard {
     constructor() {
         this.currentUser = null;
         this.services = [];
+        this.availableRequests = [];
+        this.descriptions = {};
+        // Cursor from the last /api/get-services response; refreshes fetch only what changed since
+        this.servicesCursor = null;
+        // Page cursor behind the "Older Jobs" link
+        this.olderPage = null;
+        this.eventSource = null;
+        this.eventStreamConnected = false;
         this.stats = {};
         this.init();
     }
@@ -12,10 +20,14 @@ class ServiceProviderDashboard {
     // Initialize the dashboard
     async init() {
         try {
-            await this.loadCurrentUser();
-            await this.loadServices();
-            await this.loadStats();
+            // The page arrives rendered with its newest jobs and best matches; start from that data
+            if (!this.loadDashboardData()) {
+                await this.loadCurrentUser();
+                await this.loadServices();
+                await this.loadStats();
+            }
             this.setupEventListeners();
+            this.connectEventStream();
             this.startAutoRefresh();
             console.log('Service Provider Dashboard initialized successfully');
         } catch (error) {
@@ -24,6 +36,53 @@ class ServiceProviderDashboard {
         }
     }
 
+    // Adopt the data the page was rendered with instead of fetching it again
+    loadDashboardData() {
+        const element = document.getElementById('dashboardData');
+        if (!element) return false;
+
+        const data = JSON.parse(element.textContent);
+        this.currentUser = data.user;
+        this.services = data.services || [];
+        this.availableRequests = data.available || [];
+        this.servicesCursor = data.cursor || null;
+        this.stats = data.stats || {};
+        this.setOlderPage(data.next_page);
+        // The page's active jobs and backlog carry their descriptions
+        this.rememberDescriptions(this.services);
+        this.rememberDescriptions(this.availableRequests);
+        return true;
+    }
+
+    setOlderPage(page) {
+        this.olderPage = page || null;
+        const link = document.querySelector('a[data-action="load-older"]');
+        if (link) {
+            link.classList.toggle('d-none', !this.olderPage);
+        }
+    }
+
+    // Add the next page of older jobs to the lists
+    async loadOlderServices() {
+        if (!this.olderPage) return;
+        try {
+            const response = await fetch(`/api/get-services?page=${encodeURIComponent(this.olderPage)}`);
+            if (!response.ok) {
+                throw new Error('Failed to load older jobs');
+            }
+            const data = await response.json();
+            // Jobs already on the dashboard are at least as recent as the page's copy
+            data.services
+                .filter(service => !this.services.some(s => s.service_id === service.service_id))
+                .forEach(service => this.services.push(service));
+            this.setOlderPage(data.next_page);
+            this.renderServices();
+        } catch (error) {
+            console.error('Error loading older jobs:', error);
+            this.showNotification('Failed to load older jobs', 'error');
+        }
+    }
+
     // Load current user information
     async loadCurrentUser() {
         try {
@@ -39,60 +98,70 @@ class ServiceProviderDashboard {
         }
     }
 
-    // Load services data
+    // Load services data, or only the changes since the last load once a cursor is known.
+    // Resolves to whether anything on the dashboard may have changed.
     async loadServices() {
         try {
-            const response = await fetch('/api/get-services');
+            const url = this.servicesCursor
+                ? `/api/get-services?since=${encodeURIComponent(this.servicesCursor)}`
+                : '/api/get-services';
+            const response = await fetch(url);
             if (response.ok) {
                 const data = await response.json();
-                this.services = data.services || [];
-                this.renderServices();
+                let changed = !data.delta || Boolean(data.open_ids);
+                if (data.delta) {
+                    changed = this.applyServiceChanges(data) || changed;
+                } else {
+                    this.services = data.services || [];
+                }
+                this.servicesCursor = data.next_cursor || null;
+                // The backlog only needs reloading when it changed
+                if (!data.delta || data.open_ids) {
+                    this.availableRequests = await this.loadAvailableRequests();
+                    this.rememberDescriptions(this.availableRequests);
+                }
+                if (changed) {
+                    this.renderServices();
+                }
+                return changed;
             } else {
+                // A rejected cursor falls back to a full load next time
+                this.servicesCursor = null;
                 throw new Error('Failed to load services');
             }
         } catch (error) {
             console.error('Error loading services:', error);
             this.showNotification('Failed to load services', 'error');
+            return false;
         }
     }
 
-    // Load available service requests
+    // Load the best-matching page of available service requests
     async loadAvailableRequests() {
         try {
             const response = await fetch('/api/available-requests');
-            if (response.ok) {
-                const data = await response.json();
-                return data.requests || [];
-            } else {
+            if (!response.ok) {
                 throw new Error('Failed to load available requests');
             }
+            const data = await response.json();
+            return data.requests || [];
         } catch (error) {
             console.error('Error loading available requests:', error);
             return [];
         }
     }
 
-    // Load dashboard statistics
+    // Load dashboard statistics; the dashboard only holds a page of jobs, so totals come from the server's counters
     async loadStats() {
         try {
-            // Calculate stats from services data
-            const pending = this.services.filter(s => s.status === 'pending').length;
-            const inProgress = this.services.filter(s => s.status === 'in_progress').length;
-            const completed = this.services.filter(s => s.status === 'completed').length;
-            const totalEarnings = this.services
-                .filter(s => s.status === 'completed' && s.cost)
-                .reduce((sum, s) => sum + (parseFloat(s.cost) || 0), 0);
-
-            this.stats = {
-                pending,
-                in_progress: inProgress,
-                completed,
-                total_earnings: totalEarnings
-            };
-
+            const response = await fetch('/api/dashboard-stats');
+            if (!response.ok) {
+                throw new Error('Failed to load stats');
+            }
+            this.stats = await response.json();
             this.updateStatsDisplay();
         } catch (error) {
-            console.error('Error calculating stats:', error);
+            console.error('Error loading stats:', error);
         }
     }
 
@@ -119,11 +188,11 @@ class ServiceProviderDashboard {
     }
 
     // Render pending job requests
-    async renderPendingJobs() {
+    renderPendingJobs() {
         const container = document.getElementById('pendingJobs');
         if (!container) return;
 
-        const availableRequests = await this.loadAvailableRequests();
+        const availableRequests = this.availableRequests;
         
         if (availableRequests.length === 0) {
             container.innerHTML = `
@@ -166,6 +235,35 @@ class ServiceProviderDashboard {
         container.innerHTML = activeServices.map(service => this.createActiveJobCard(service)).join('');
     }
 
+    // List updates omit descriptions, so keep the ones the page and the backlog brought.
+    // A job accepted elsewhere since the page loaded has none until it is opened.
+    rememberDescriptions(services) {
+        services.forEach(service => {
+            if (typeof service.description === 'string') {
+                this.descriptions[service.service_id] = service.description;
+            }
+        });
+    }
+
+    // Fetch one job's description when the provider asks for it
+    async showDescription(serviceId) {
+        try {
+            const response = await fetch(`/api/services/${encodeURIComponent(serviceId)}`);
+            const data = await response.json();
+            if (!response.ok || !data.service) {
+                throw new Error(data.error || 'Failed to load service details');
+            }
+            this.descriptions[serviceId] = data.service.description || '';
+            const element = document.querySelector(`[data-job-id="${serviceId}"] .job-description`);
+            if (element) {
+                element.textContent = this.descriptions[serviceId];
+            }
+        } catch (error) {
+            console.error('Error loading service details:', error);
+            this.showNotification('Failed to load service details', 'error');
+        }
+    }
+
     // Render completed jobs table
     renderCompletedJobs() {
         const tbody = document.querySelector('.table tbody');
@@ -173,8 +271,7 @@ class ServiceProviderDashboard {
 
         const completedServices = this.services
             .filter(s => s.status === 'completed')
-            .sort((a, b) => new Date(b.updated_at) - new Date(a.updated_at))
-            .slice(0, 10); // Show last 10 completed jobs
+            .sort((a, b) => new Date(b.updated_at) - new Date(a.updated_at));
 
         if (completedServices.length === 0) {
             tbody.innerHTML = `
@@ -195,8 +292,7 @@ class ServiceProviderDashboard {
     createPendingJobCard(service) {
         const priorityClass = this.getPriorityClass(service.priority);
         const priorityColor = this.getPriorityColor(service.priority);
-        const preferredDate = service.preferred_date ? 
-            new Date(service.preferred_date).toLocaleDateString() : 'Flexible';
+        const preferredDate = service.preferred_date ? this.formatDate(service.preferred_date) : 'Flexible';
 
         return `
             <div class="card job-card priority-${service.priority}" data-job-id="${service.service_id}">
@@ -244,8 +340,7 @@ class ServiceProviderDashboard {
     createActiveJobCard(service) {
         const statusBadge = this.getStatusBadge(service.status);
         const actionButton = this.getActionButton(service);
-        const startDate = service.start_date ? 
-            new Date(service.start_date).toLocaleString() : 'Not started';
+        const startDate = service.start_date ? this.formatDateTime(service.start_date) : 'Not started';
 
         return `
             <div class="card job-card" data-job-id="${service.service_id}">
@@ -259,12 +354,14 @@ class ServiceProviderDashboard {
                         <i class="fas fa-user me-1"></i>${service.homeowner}
                     </p>
                     
-                    <p class="card-text">${service.description}</p>
+                    <p class="card-text job-description">${service.service_id in this.descriptions
+                        ? this.descriptions[service.service_id]
+                        : `<a href="#" onclick="dashboard.showDescription('${service.service_id}'); return false;">Show details</a>`}</p>
                     
                     <div class="row text-center mb-3">
                         <div class="col-6">
                             <small class="text-muted">Cost</small>
-                            <div class="fw-bold">${service.cost ? '$' + service.cost : 'TBD'}</div>
+                            <div class="fw-bold">${service.cost ? '$' + Number(service.cost).toFixed(2) : 'TBD'}</div>
                         </div>
                         <div class="col-6">
                             <small class="text-muted">${service.status === 'scheduled' ? 'Scheduled' : 'Started'}</small>
@@ -282,9 +379,9 @@ class ServiceProviderDashboard {
 
     // Create completed job row HTML
     createCompletedJobRow(service) {
-        const completedDate = new Date(service.updated_at).toLocaleDateString();
+        const completedDate = this.formatDate(service.updated_at);
         const duration = service.duration ? `${service.duration.toFixed(1)}h` : '-';
-        const cost = service.cost ? `$${service.cost}` : '-';
+        const cost = service.cost ? `$${Number(service.cost).toFixed(2)}` : '-';
         const rating = this.createRatingStars(service.rating);
 
         return `
@@ -302,6 +399,17 @@ class ServiceProviderDashboard {
         `;
     }
 
+    // Dates as the server renders them, e.g. "Jan 5, 2026" and "Jan 5, 2026, 03:30 PM"
+    formatDate(dateString) {
+        return new Date(dateString).toLocaleDateString('en-US', { year: 'numeric', month: 'short', day: 'numeric' });
+    }
+
+    formatDateTime(dateString) {
+        return new Date(dateString).toLocaleDateString('en-US', {
+            year: 'numeric', month: 'short', day: 'numeric', hour: '2-digit', minute: '2-digit'
+        });
+    }
+
     // Get priority CSS class
     getPriorityClass(priority) {
         const classes = {
@@ -497,8 +605,9 @@ class ServiceProviderDashboard {
     // Refresh all dashboard data
     async refreshData() {
         try {
-            await this.loadServices();
-            await this.loadStats();
+            if (await this.loadServices()) {
+                await this.loadStats();
+            }
         } catch (error) {
             console.error('Error refreshing data:', error);
         }
@@ -506,6 +615,14 @@ class ServiceProviderDashboard {
 
     // Setup event listeners
     setupEventListeners() {
+        const olderLink = document.querySelector('a[data-action="load-older"]');
+        if (olderLink) {
+            olderLink.addEventListener('click', (e) => {
+                e.preventDefault();
+                this.loadOlderServices();
+            });
+        }
+
         // Refresh button
         const refreshBtn = document.getElementById('refreshBtn');
         if (refreshBtn) {
@@ -537,11 +654,93 @@ class ServiceProviderDashboard {
         });
     }
 
+    // Subscribe to pushed service changes; polling covers any gaps
+    connectEventStream() {
+        if (!window.EventSource) return;
+
+        this.eventSource = new EventSource('/api/events');
+        this.eventSource.addEventListener('open', () => {
+            this.eventStreamConnected = true;
+            // Catch up on anything that changed while the stream was down
+            this.refreshData();
+        });
+        this.eventSource.addEventListener('error', () => {
+            // The browser reconnects on its own unless the server refused the stream
+            this.eventStreamConnected = this.eventSource.readyState === EventSource.OPEN;
+        });
+        this.eventSource.addEventListener('service', (event) => this.applyServiceUpdate(JSON.parse(event.data)));
+        this.eventSource.addEventListener('resync', () => this.refreshData());
+    }
+
+    // Merge one pushed service into local state and re-render without refetching
+    applyServiceUpdate(service) {
+        const isOpen = service.status === 'pending' && !service.service_provider;
+        const isMine = this.currentUser && service.service_provider === this.currentUser.username;
+
+        this.mergeService(this.services, service, isOpen || isMine);
+        this.rememberDescriptions([service]);
+        // Pushes from the backlog channel carry the description the pending cards show
+        const existing = this.availableRequests.find(s => s.service_id === service.service_id);
+        this.mergeService(this.availableRequests, { ...existing, ...service }, isOpen);
+        this.availableRequests.sort((a, b) => this.compareRequests(a, b));
+
+        this.renderServices();
+        this.loadStats();
+    }
+
+    // Merge a delta from /api/get-services?since= into this.services
+    // Returns whether any service actually changed; deltas overlap the last
+    // sync, so most of them repeat what is already shown
+    applyServiceChanges(data) {
+        const username = this.currentUser && this.currentUser.username;
+        const known = new Map(this.services.map(s => [s.service_id, s.updated_at]));
+        const changed = data.services.some(service => known.get(service.service_id) !== service.updated_at);
+        data.services.forEach(service => {
+            const isOpen = service.status === 'pending' && !service.service_provider;
+            this.mergeService(this.services, service, isOpen || service.service_provider === username);
+        });
+        if (data.open_ids) {
+            // Open requests missing from the backlog were accepted or cancelled elsewhere
+            const openIds = new Set(data.open_ids);
+            this.services = this.services.filter(s =>
+                s.service_provider || s.status !== 'pending' || openIds.has(s.service_id)
+            );
+        }
+        return changed;
+    }
+
+    // The server's ranking: priority, then earliest preferred date, then oldest
+    compareRequests(a, b) {
+        const ranks = { emergency: 0, high: 1, medium: 2, low: 3 };
+        const key = s => [ranks[s.priority] ?? 4, s.preferred_date || '~', s.created_at || '', s.service_id];
+        const ka = key(a);
+        const kb = key(b);
+        for (let i = 0; i < ka.length; i++) {
+            if (ka[i] < kb[i]) return -1;
+            if (ka[i] > kb[i]) return 1;
+        }
+        return 0;
+    }
+
+    mergeService(list, service, keep) {
+        const index = list.findIndex(s => s.service_id === service.service_id);
+        if (!keep) {
+            if (index >= 0) list.splice(index, 1);
+        } else if (index >= 0) {
+            list[index] = service;
+        } else {
+            list.push(service);
+        }
+    }
+
     // Start auto-refresh
     startAutoRefresh() {
         this.stopAutoRefresh(); // Clear existing interval
         this.autoRefreshInterval = setInterval(() => {
-            this.refreshData();
+            // Only poll while the event stream is down
+            if (!this.eventStreamConnected) {
+                this.refreshData();
+            }
         }, 30000); // Refresh every 30 seconds
     }
 
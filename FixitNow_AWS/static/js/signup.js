@@ -75,9 +75,11 @@
         });
 
         // Username validation
+        let usernameCheckTimer = null;
         document.getElementById('username').addEventListener('input', function() {
             const username = this.value;
             const errorDiv = document.getElementById('usernameError');
+            clearTimeout(usernameCheckTimer);
             
             if (username.length === 0) {
                 errorDiv.style.display = 'none';
@@ -92,9 +94,29 @@
                 errorDiv.style.display = 'block';
             } else {
                 errorDiv.style.display = 'none';
+                // Ask the server once typing pauses
+                usernameCheckTimer = setTimeout(() => checkUsernameAvailable(username, errorDiv), 300);
             }
         });
 
+        async function checkUsernameAvailable(username, errorDiv) {
+            try {
+                const response = await fetch('/api/check-username', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ username: username })
+                });
+                const result = await response.json();
+                // Ignore answers for a name the user has already changed
+                if (result.exists && document.getElementById('username').value === username) {
+                    errorDiv.textContent = 'This username is already taken';
+                    errorDiv.style.display = 'block';
+                }
+            } catch (error) {
+                console.error('Error checking username:', error);
+            }
+        }
+
         // Handle signup form submission
         document.getElementById('signupForm').addEventListener('submit', async function(e) {
             e.preventDefault();
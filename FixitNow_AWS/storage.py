@@ -0,0 +1,906 @@
+import bisect
+import logging
+import random
+import threading
+import time
+import zlib
+from decimal import Decimal
+from functools import wraps
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+# Global secondary indexes on the services table
+# homeowner-updated_at-index:       PK homeowner (S), SK updated_at (S)
+# service_provider-status-index:    PK service_provider (S), SK status (S)
+# service_provider-updated_at-index: PK service_provider (S), SK updated_at (S)
+# open-requests-index (sparse):     PK open_request (S), SK created_at (S)
+# Unassigned requests must not carry a service_provider attribute, since a
+# NULL value cannot be written into an index key. Only pending, unassigned
+# requests carry open_request, so the open index holds just the backlog.
+HOMEOWNER_INDEX = 'homeowner-updated_at-index'
+PROVIDER_INDEX = 'service_provider-status-index'
+PROVIDER_UPDATED_INDEX = 'service_provider-updated_at-index'
+OPEN_REQUESTS_INDEX = 'open-requests-index'
+OPEN_REQUEST_MARKER = 'pending'
+OPEN_REQUEST_KEYS = ('service_id', 'open_request', 'created_at')
+# Index keys of user_services_page() pages, by the role the user plays
+USER_PAGE_KEYS = {
+    'homeowner': ('service_id', 'homeowner', 'updated_at'),
+    'service_provider': ('service_id', 'service_provider', 'updated_at')
+}
+
+# Attributes the dashboard list views render. List reads project to these so
+# free text (description, completion_notes) is only fetched by the detail
+# view. Creating the list indexes with an INCLUDE projection of these
+# attributes also cuts the read capacity each query consumes, not just the
+# payload, since index reads are billed on the size of the index entry.
+LIST_ATTRIBUTES = (
+    'service_id', 'homeowner', 'service_provider', 'service', 'service_type',
+    'priority', 'status', 'preferred_date', 'start_date', 'created_at',
+    'updated_at', 'cost', 'duration', 'rating'
+)
+
+# Materialized counters in the stats table (PK stat_id)
+USER_COUNTS_ID = 'user_counts'
+USER_TYPE_COUNTERS = {
+    'homeowner': 'homeowners',
+    'service_provider': 'service_providers'
+}
+# Per-user dashboard stats live under user#<username>; open_requests counts the
+# unassigned backlog every provider sees as pending
+OPEN_REQUESTS_STATS_ID = 'open_requests'
+# Every service write also bumps 'version' on each stats record whose list it
+# touches (the homeowner's, the provider's and the open backlog) and stamps
+# 'changed_at' (epoch seconds), so list endpoints can answer conditional GETs
+# from the stats record alone
+VERSION_COUNTER = 'version'
+CHANGED_AT = 'changed_at'
+
+# TransactWriteItems takes at most 100 actions and may touch each item once
+TRANSACTION_LIMIT = 100
+
+# BatchGetItem takes at most 100 keys. Keys it leaves unprocessed (it does so
+# when throttled) are retried after a capped exponential backoff with full
+# jitter, at most BATCH_GET_MAX_RETRIES times per batch
+BATCH_GET_LIMIT = 100
+BATCH_GET_MAX_RETRIES = 8
+BATCH_RETRY_BASE_SECONDS = 0.05
+BATCH_RETRY_MAX_SECONDS = 2.0
+
+# Key read from every table by health probes; no item is ever stored under it
+HEALTH_PROBE_KEY = '__health_probe__'
+
+_MISSING = object()
+
+
+def project(item, attributes):
+    """Keep only the given attributes, as a ProjectionExpression would"""
+    if attributes is None:
+        return dict(item)
+    return {name: item[name] for name in attributes if name in item}
+
+
+class StorageError(Exception):
+    """A storage backend operation failed"""
+
+
+class ConditionFailed(StorageError):
+    """A conditional write did not apply; current is the stored item, if any"""
+
+    def __init__(self, message, current=None):
+        super().__init__(message)
+        self.current = current
+
+
+def to_decimal(value):
+    if value is None:
+        return Decimal(0)
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def user_stats_id(username):
+    return f"user#{username}"
+
+
+def service_stat_contributions(service):
+    """Map each stats record to the counter values one service contributes to it"""
+    contributions = {}
+    if not service:
+        return contributions
+
+    status = service.get('status')
+    completed = status == 'completed'
+    cost = to_decimal(service.get('cost')) if completed else Decimal(0)
+    duration = to_decimal(service.get('duration')) if completed else Decimal(0)
+
+    shared = {status: 1}
+    if service.get('rating') is not None:
+        shared['rating_sum'] = to_decimal(service['rating'])
+        shared['rating_count'] = 1
+
+    if service.get('homeowner'):
+        contributions[user_stats_id(service['homeowner'])] = dict(
+            shared, total_requests=1, total_spent=cost
+        )
+    if service.get('service_provider'):
+        contributions[user_stats_id(service['service_provider'])] = dict(
+            shared, total_jobs=1, total_earnings=cost, total_hours=duration
+        )
+    elif status == 'pending':
+        contributions[OPEN_REQUESTS_STATS_ID] = {'count': 1}
+    return contributions
+
+
+def stats_deltas(old_service, new_service):
+    """Counter changes, per stats record, that move the stats from old_service to new_service"""
+    old_contributions = service_stat_contributions(old_service)
+    new_contributions = service_stat_contributions(new_service)
+
+    deltas = {}
+    for stat_id in sorted(set(old_contributions) | set(new_contributions)):
+        old_values = old_contributions.get(stat_id, {})
+        new_values = new_contributions.get(stat_id, {})
+        record = {VERSION_COUNTER: Decimal(1)}
+        for counter in set(old_values) | set(new_values):
+            delta = to_decimal(new_values.get(counter)) - to_decimal(old_values.get(counter))
+            if delta:
+                record[counter] = delta
+        deltas[stat_id] = record
+    return deltas
+
+
+def merge_deltas(deltas_list):
+    """Sum several stats_deltas() results into one update per stats record"""
+    merged = {}
+    for deltas in deltas_list:
+        for stat_id, record in deltas.items():
+            target = merged.setdefault(stat_id, {})
+            for counter, value in record.items():
+                target[counter] = target.get(counter, Decimal(0)) + value
+    return merged
+
+
+def rebuild_stats_records(services):
+    """Recompute every service stats record from scratch"""
+    records = {OPEN_REQUESTS_STATS_ID: {'count': Decimal(0)}}
+    for item in services:
+        for stat_id, values in service_stat_contributions(item).items():
+            record = records.setdefault(stat_id, {})
+            for counter, value in values.items():
+                record[counter] = record.get(counter, Decimal(0)) + to_decimal(value)
+    return records
+
+
+def next_versions(records, existing):
+    """Carry each record's version forward across a rebuild so ETags never repeat"""
+    changed_at = Decimal(str(round(time.time(), 3)))
+    for stat_id, record in records.items():
+        previous = existing.get(stat_id, {}).get(VERSION_COUNTER, Decimal(0))
+        record[VERSION_COUNTER] = previous + 1
+        record[CHANGED_AT] = changed_at
+    return records
+
+
+def count_users(users):
+    counts = {'total_users': len(users)}
+    for user_type, counter in USER_TYPE_COUNTERS.items():
+        counts[counter] = sum(1 for user in users if user.get('user_type') == user_type)
+    return counts
+
+
+def _storage_errors(method):
+    """Translate botocore errors into backend-neutral StorageErrors"""
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        try:
+            return method(*args, **kwargs)
+        except ClientError as e:
+            raise StorageError(str(e)) from e
+    return wrapper
+
+
+class DynamoDBStorage:
+    """Repository over the fixitnow DynamoDB tables"""
+
+    def __init__(self, aws, users_table, services_table, stats_table):
+        self.aws = aws
+        self.users_table_name = users_table
+        self.services_table_name = services_table
+        self.stats_table_name = stats_table
+        self._deserializer = TypeDeserializer()
+
+    # Clients resolve per process through the AWSClients holder, so building
+    # the storage object does no I/O and is safe before gunicorn forks
+    @property
+    def dynamodb(self):
+        return self.aws.resource('dynamodb')
+
+    @property
+    def client(self):
+        return self.dynamodb.meta.client
+
+    @property
+    def users_table(self):
+        return self.aws.table(self.users_table_name)
+
+    @property
+    def services_table(self):
+        return self.aws.table(self.services_table_name)
+
+    @property
+    def stats_table(self):
+        return self.aws.table(self.stats_table_name)
+
+    # Helper function to read every page of a DynamoDB query or scan
+    @staticmethod
+    def collect_pages(operation, **kwargs):
+        items = []
+        while True:
+            response = operation(**kwargs)
+            items.extend(response.get('Items', []))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return items
+            kwargs['ExclusiveStartKey'] = last_key
+
+    @staticmethod
+    def _projected(query_args, attributes):
+        if attributes is not None:
+            names = query_args.setdefault('ExpressionAttributeNames', {})
+            placeholders = []
+            for i, name in enumerate(attributes):
+                names[f"#p{i}"] = name
+                placeholders.append(f"#p{i}")
+            query_args['ProjectionExpression'] = ', '.join(placeholders)
+        return query_args
+
+    @staticmethod
+    def _conflict(error, index=0):
+        reasons = error.response.get('CancellationReasons') or []
+        return len(reasons) > index and reasons[index].get('Code') == 'ConditionalCheckFailed'
+
+    def _stats_updates(self, deltas):
+        updates = []
+        changed_at = Decimal(str(round(time.time(), 3)))
+        for stat_id, record in deltas.items():
+            counters = sorted(record)
+            update = {
+                'TableName': self.stats_table_name,
+                'Key': {'stat_id': stat_id},
+                'UpdateExpression': 'ADD ' + ', '.join(f"#c{i} :c{i}" for i in range(len(counters))),
+                'ExpressionAttributeNames': {f"#c{i}": counter for i, counter in enumerate(counters)},
+                'ExpressionAttributeValues': {f":c{i}": record[counter] for i, counter in enumerate(counters)}
+            }
+            if VERSION_COUNTER in record:
+                update['UpdateExpression'] += ' SET #changed_at = :changed_at'
+                update['ExpressionAttributeNames']['#changed_at'] = CHANGED_AT
+                update['ExpressionAttributeValues'][':changed_at'] = changed_at
+            updates.append({'Update': update})
+        return updates
+
+    # Users
+    @_storage_errors
+    def get_user(self, username):
+        return self.users_table.get_item(Key={'username': username}).get('Item')
+
+    def create_user(self, user):
+        """Write a new user and bump the user counters in one transaction"""
+        try:
+            self.client.transact_write_items(TransactItems=[
+                {'Put': {
+                    'TableName': self.users_table_name,
+                    'Item': user,
+                    'ConditionExpression': 'attribute_not_exists(username)'
+                }},
+                {'Update': {
+                    'TableName': self.stats_table_name,
+                    'Key': {'stat_id': USER_COUNTS_ID},
+                    'UpdateExpression': 'ADD total_users :one, #user_type :one',
+                    'ExpressionAttributeNames': {'#user_type': USER_TYPE_COUNTERS[user['user_type']]},
+                    'ExpressionAttributeValues': {':one': 1}
+                }}
+            ])
+        except ClientError as e:
+            if self._conflict(e):
+                raise ConditionFailed(f"User {user['username']} already exists") from e
+            raise StorageError(str(e)) from e
+
+    def update_user_password(self, username, old_hash, new_hash):
+        """Replace a password hash, unless it changed since old_hash was read"""
+        try:
+            self.users_table.update_item(
+                Key={'username': username},
+                UpdateExpression='SET #password = :new_hash',
+                ConditionExpression='#password = :old_hash',
+                ExpressionAttributeNames={'#password': 'password'},
+                ExpressionAttributeValues={':new_hash': new_hash, ':old_hash': old_hash}
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                raise ConditionFailed(f"Password of {username} changed concurrently") from e
+            raise StorageError(str(e)) from e
+
+    @_storage_errors
+    def scan_users(self):
+        return self.collect_pages(self.users_table.scan)
+
+    @_storage_errors
+    def scan_usernames(self):
+        items = self.collect_pages(self.users_table.scan, **self._projected({}, ('username',)))
+        return [item['username'] for item in items]
+
+    # Services
+    @_storage_errors
+    def get_service(self, service_id):
+        return self.services_table.get_item(Key={'service_id': service_id}).get('Item')
+
+    @_storage_errors
+    def get_services(self, service_ids):
+        """Read several services in batches of 100, keyed by service_id"""
+        return self._batch_get(self.services_table_name, 'service_id', service_ids)
+
+    @_storage_errors
+    def homeowner_services(self, username, attributes=None, since=None):
+        """The homeowner's services, newest change first; only those updated after since if given"""
+        query_args = {
+            'IndexName': HOMEOWNER_INDEX,
+            'KeyConditionExpression': 'homeowner = :username',
+            'ExpressionAttributeValues': {':username': username},
+            'ScanIndexForward': False
+        }
+        if since:
+            query_args['KeyConditionExpression'] += ' AND updated_at > :since'
+            query_args['ExpressionAttributeValues'][':since'] = since
+        return self.collect_pages(self.services_table.query, **self._projected(query_args, attributes))
+
+    @_storage_errors
+    def provider_services(self, username, attributes=None, since=None):
+        """The provider's jobs; only those updated after since if given"""
+        query_args = {
+            'IndexName': PROVIDER_INDEX,
+            'KeyConditionExpression': 'service_provider = :username',
+            'ExpressionAttributeValues': {':username': username}
+        }
+        if since:
+            query_args['IndexName'] = PROVIDER_UPDATED_INDEX
+            query_args['KeyConditionExpression'] += ' AND updated_at > :since'
+            query_args['ExpressionAttributeValues'][':since'] = since
+        return self.collect_pages(self.services_table.query, **self._projected(query_args, attributes))
+
+    @_storage_errors
+    def user_services_page(self, role, username, limit, start_key=None, attributes=None):
+        """One page of a homeowner's or provider's services, newest change first, and its LastEvaluatedKey"""
+        query_args = self._projected({
+            'IndexName': HOMEOWNER_INDEX if role == 'homeowner' else PROVIDER_UPDATED_INDEX,
+            'KeyConditionExpression': f'{role} = :username',
+            'ExpressionAttributeValues': {':username': username},
+            'ScanIndexForward': False,
+            'Limit': limit
+        }, attributes)
+        if start_key:
+            query_args['ExclusiveStartKey'] = start_key
+        response = self.services_table.query(**query_args)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    @_storage_errors
+    def active_services(self, role, username, statuses, attributes=None, expected=None):
+        """The homeowner's or provider's services in any of the given statuses.
+
+        Providers' are read straight off the status index. Homeowners' are
+        filtered from their newest-first index, which stops once ``expected``
+        have been found, since open work is nearly always recent.
+        """
+        if role == 'service_provider':
+            items = []
+            for status in statuses:
+                items.extend(self.collect_pages(self.services_table.query, **self._projected({
+                    'IndexName': PROVIDER_INDEX,
+                    'KeyConditionExpression': 'service_provider = :username AND #status = :status',
+                    'ExpressionAttributeNames': {'#status': 'status'},
+                    'ExpressionAttributeValues': {':username': username, ':status': status}
+                }, attributes)))
+            return items
+
+        values = {f":s{i}": status for i, status in enumerate(statuses)}
+        query_args = self._projected({
+            'IndexName': HOMEOWNER_INDEX,
+            'KeyConditionExpression': 'homeowner = :username',
+            'FilterExpression': f"#status IN ({', '.join(values)})",
+            'ExpressionAttributeNames': {'#status': 'status'},
+            'ExpressionAttributeValues': dict(values, **{':username': username}),
+            'ScanIndexForward': False
+        }, attributes)
+        items = []
+        while True:
+            response = self.services_table.query(**query_args)
+            items.extend(response.get('Items', []))
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key or (expected is not None and len(items) >= expected):
+                return items
+            query_args['ExclusiveStartKey'] = last_key
+
+    @_storage_errors
+    def open_requests(self, limit=None, start_key=None, attributes=None, created_after=None):
+        """Return open requests oldest first; with a limit, one page and its LastEvaluatedKey"""
+        query_args = self._projected({
+            'IndexName': OPEN_REQUESTS_INDEX,
+            'KeyConditionExpression': 'open_request = :open',
+            'ExpressionAttributeValues': {':open': OPEN_REQUEST_MARKER}
+        }, attributes)
+        if created_after:
+            query_args['KeyConditionExpression'] += ' AND created_at > :created_after'
+            query_args['ExpressionAttributeValues'][':created_after'] = created_after
+        if limit is None:
+            return self.collect_pages(self.services_table.query, **query_args), None
+        query_args['Limit'] = limit
+        if start_key:
+            query_args['ExclusiveStartKey'] = start_key
+        response = self.services_table.query(**query_args)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    @_storage_errors
+    def scan_services(self):
+        return self.collect_pages(self.services_table.scan)
+
+    def put_service(self, service, if_absent=False):
+        """Write a new service together with its stats changes"""
+        put = {'TableName': self.services_table_name, 'Item': service}
+        if if_absent:
+            put['ConditionExpression'] = 'attribute_not_exists(service_id)'
+        try:
+            self.client.transact_write_items(
+                TransactItems=[{'Put': put}] + self._stats_updates(stats_deltas(None, service))
+            )
+        except ClientError as e:
+            if self._conflict(e):
+                raise ConditionFailed(f"Service {service['service_id']} already exists") from e
+            raise StorageError(str(e)) from e
+
+    def _service_update(self, old_service, new_service):
+        """Transaction action writing new_service over an unchanged old_service"""
+        names = {}
+        values = {
+            ':expected_status': old_service.get('status'),
+            ':expected_updated_at': old_service.get('updated_at')
+        }
+        set_clauses = []
+        for index, (key, value) in enumerate(sorted(new_service.items())):
+            if key == 'service_id' or old_service.get(key, _MISSING) == value:
+                continue
+            names[f"#s{index}"] = key
+            values[f":s{index}"] = value
+            set_clauses.append(f"#s{index} = :s{index}")
+        removed = sorted(set(old_service) - set(new_service))
+        for index, key in enumerate(removed):
+            names[f"#r{index}"] = key
+        names['#status'] = 'status'
+        names['#updated_at'] = 'updated_at'
+
+        update_expression = 'SET ' + ', '.join(set_clauses)
+        if removed:
+            update_expression += ' REMOVE ' + ', '.join(f"#r{i}" for i in range(len(removed)))
+
+        return {'Update': {
+            'TableName': self.services_table_name,
+            'Key': {'service_id': new_service['service_id']},
+            'UpdateExpression': update_expression,
+            'ConditionExpression': '#status = :expected_status AND #updated_at = :expected_updated_at',
+            'ExpressionAttributeNames': names,
+            'ExpressionAttributeValues': values,
+            'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+        }}
+
+    def _lost_race(self, error, index, service_id):
+        latest = error.response['CancellationReasons'][index].get('Item')
+        if latest:
+            latest = {k: self._deserializer.deserialize(v) for k, v in latest.items()}
+        return ConditionFailed(f"Service {service_id} changed concurrently", latest)
+
+    def update_service(self, old_service, new_service):
+        """Replace old_service with new_service if it is still stored unchanged.
+
+        The service update and the stats deltas derived from the two images are
+        one transaction, conditioned on the expected status and updated_at. On a
+        lost race the stored item is returned through ConditionFailed.current.
+        """
+        try:
+            self.client.transact_write_items(TransactItems=[
+                self._service_update(old_service, new_service)
+            ] + self._stats_updates(stats_deltas(old_service, new_service)))
+        except ClientError as e:
+            if self._conflict(e):
+                raise self._lost_race(e, 0, new_service['service_id']) from e
+            raise StorageError(str(e)) from e
+
+    def update_services(self, changes):
+        """Apply several (old_service, new_service) changes in as few transactions as possible.
+
+        Returns one result per change: None when it was applied, otherwise the
+        StorageError it failed with, ConditionFailed for lost races as in
+        update_service. Each chunk commits atomically with its stats deltas
+        merged per record; changes whose conditions fail are dropped and the
+        rest of their chunk is retried.
+        """
+        deltas = [stats_deltas(old, new) for old, new in changes]
+        results = [None] * len(changes)
+        pending = list(range(len(changes)))
+        while pending:
+            chunk, stat_ids = [], set()
+            for index in pending:
+                needed = stat_ids | set(deltas[index])
+                if chunk and len(chunk) + 1 + len(needed) > TRANSACTION_LIMIT:
+                    break
+                chunk.append(index)
+                stat_ids = needed
+
+            try:
+                self.client.transact_write_items(
+                    TransactItems=[self._service_update(*changes[index]) for index in chunk]
+                    + self._stats_updates(merge_deltas(deltas[index] for index in chunk))
+                )
+            except ClientError as e:
+                lost = [position for position in range(len(chunk)) if self._conflict(e, position)]
+                if not lost:
+                    # Throttling, transaction conflicts and the like fail the whole chunk
+                    for index in chunk:
+                        results[index] = StorageError(str(e))
+                    pending = pending[len(chunk):]
+                    continue
+                for position in lost:
+                    index = chunk[position]
+                    results[index] = self._lost_race(e, position, changes[index][1]['service_id'])
+                    pending.remove(index)
+                continue
+            pending = pending[len(chunk):]
+        return results
+
+    # Exports
+    @_storage_errors
+    def scan_segment(self, table, segment, total_segments, start_key=None, limit=None, attributes=None):
+        """One page of a parallel scan of 'users' or 'services'; returns (items, last_key)"""
+        scan_args = self._projected({'Segment': segment, 'TotalSegments': total_segments}, attributes)
+        if start_key:
+            scan_args['ExclusiveStartKey'] = start_key
+        if limit:
+            scan_args['Limit'] = limit
+        target = self.users_table if table == 'users' else self.services_table
+        response = target.scan(**scan_args)
+        return response.get('Items', []), response.get('LastEvaluatedKey')
+
+    # Stats
+    @_storage_errors
+    def get_stats(self, stat_ids):
+        """Read several stats records in one batch, keyed by stat_id"""
+        return self._batch_get(self.stats_table_name, 'stat_id', stat_ids)
+
+    def _batch_get(self, table_name, key_name, key_values):
+        """Items of one table keyed by key_name, read BATCH_GET_LIMIT keys per call.
+
+        Unprocessed keys are resubmitted after a backoff rather than at once,
+        which would only add to the throttling that left them unprocessed.
+        """
+        items = {}
+        key_values = list(dict.fromkeys(key_values))
+        for start in range(0, len(key_values), BATCH_GET_LIMIT):
+            keys = [{key_name: value} for value in key_values[start:start + BATCH_GET_LIMIT]]
+            request_items = {table_name: {'Keys': keys}}
+            retries = 0
+            while True:
+                response = self.dynamodb.batch_get_item(RequestItems=request_items)
+                for item in response['Responses'].get(table_name, []):
+                    items[item[key_name]] = item
+                request_items = response.get('UnprocessedKeys')
+                if not request_items:
+                    break
+                if retries == BATCH_GET_MAX_RETRIES:
+                    unread = len(request_items[table_name]['Keys'])
+                    raise StorageError(f"{unread} keys of {table_name} still unprocessed after {retries} retries")
+                time.sleep(random.uniform(0, min(BATCH_RETRY_MAX_SECONDS, BATCH_RETRY_BASE_SECONDS * 2 ** retries)))
+                retries += 1
+        return items
+
+    # Maintenance
+    @_storage_errors
+    def check_health(self):
+        """One data-plane read that touches every table.
+
+        DescribeTable is a control-plane call with low rate limits; a batch
+        get of one key per table proves the same tables exist and are
+        readable at the cost of a few read units.
+        """
+        self.client.batch_get_item(RequestItems={
+            self.users_table_name: {'Keys': [{'username': HEALTH_PROBE_KEY}]},
+            self.services_table_name: {'Keys': [{'service_id': HEALTH_PROBE_KEY}]},
+            self.stats_table_name: {'Keys': [{'stat_id': HEALTH_PROBE_KEY}]}
+        })
+
+    @_storage_errors
+    def warm_up(self):
+        """Resolve credentials and open a pooled connection with a single key read"""
+        self.stats_table.get_item(Key={'stat_id': USER_COUNTS_ID})
+
+    @_storage_errors
+    def backfill_open_requests(self):
+        """One-off migration for requests created before the open-requests index existed"""
+        legacy_items = self.collect_pages(
+            self.services_table.scan,
+            FilterExpression='#status = :pending AND attribute_not_exists(open_request) AND (attribute_not_exists(service_provider) OR service_provider = :null_val)',
+            ExpressionAttributeValues={
+                ':pending': 'pending',
+                ':null_val': None
+            },
+            ExpressionAttributeNames={'#status': 'status'},
+            ProjectionExpression='service_id'
+        )
+        for item in legacy_items:
+            self.services_table.update_item(
+                Key={'service_id': item['service_id']},
+                UpdateExpression='SET open_request = :open REMOVE service_provider',
+                ExpressionAttributeValues={':open': OPEN_REQUEST_MARKER}
+            )
+        return len(legacy_items)
+
+    @_storage_errors
+    def has_stats(self, stat_id):
+        return 'Item' in self.stats_table.get_item(Key={'stat_id': stat_id})
+
+    @_storage_errors
+    def rebuild_user_counts(self):
+        counts = count_users(self.scan_users())
+        self.stats_table.put_item(Item=dict(counts, stat_id=USER_COUNTS_ID))
+        return counts
+
+    @_storage_errors
+    def rebuild_service_stats(self):
+        records = rebuild_stats_records(self.scan_services())
+        next_versions(records, self.get_stats(list(records)))
+        with self.stats_table.batch_writer() as batch:
+            for stat_id, record in records.items():
+                batch.put_item(Item=dict(record, stat_id=stat_id))
+        return len(records)
+
+
+class MemoryStorage:
+    """Indexed in-process backend for local runs, load tests and profiling.
+
+    Items are stored exactly as the DynamoDB backend stores them (Decimal
+    numbers, ISO-8601 strings) and the same secondary indexes are maintained
+    as dicts and a sorted list, so reads cost what the index lookups cost.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users = {}
+        self._services = {}
+        self._stats = {}
+        self._by_homeowner = {}
+        self._by_provider = {}
+        self._open = []
+
+    def _index(self, service):
+        self._by_homeowner.setdefault(service.get('homeowner'), set()).add(service['service_id'])
+        if service.get('service_provider'):
+            self._by_provider.setdefault(service['service_provider'], set()).add(service['service_id'])
+        if service.get('open_request'):
+            bisect.insort(self._open, (service['created_at'], service['service_id']))
+
+    def _unindex(self, service):
+        self._by_homeowner.get(service.get('homeowner'), set()).discard(service['service_id'])
+        if service.get('service_provider'):
+            self._by_provider.get(service['service_provider'], set()).discard(service['service_id'])
+        if service.get('open_request'):
+            key = (service['created_at'], service['service_id'])
+            position = bisect.bisect_left(self._open, key)
+            if position < len(self._open) and self._open[position] == key:
+                del self._open[position]
+
+    def _apply_deltas(self, deltas):
+        changed_at = Decimal(str(round(time.time(), 3)))
+        for stat_id, record in deltas.items():
+            stored = self._stats.setdefault(stat_id, {'stat_id': stat_id})
+            for counter, delta in record.items():
+                stored[counter] = stored.get(counter, Decimal(0)) + delta
+            if VERSION_COUNTER in record:
+                stored[CHANGED_AT] = changed_at
+
+    # Users
+    def get_user(self, username):
+        user = self._users.get(username)
+        return dict(user) if user else None
+
+    def create_user(self, user):
+        with self._lock:
+            if user['username'] in self._users:
+                raise ConditionFailed(f"User {user['username']} already exists")
+            self._users[user['username']] = dict(user)
+            self._apply_deltas({USER_COUNTS_ID: {
+                'total_users': Decimal(1),
+                USER_TYPE_COUNTERS[user['user_type']]: Decimal(1)
+            }})
+
+    def update_user_password(self, username, old_hash, new_hash):
+        with self._lock:
+            user = self._users.get(username)
+            if user is None or user.get('password') != old_hash:
+                raise ConditionFailed(f"Password of {username} changed concurrently")
+            user['password'] = new_hash
+
+    def scan_users(self):
+        with self._lock:
+            return [dict(user) for user in self._users.values()]
+
+    def scan_usernames(self):
+        with self._lock:
+            return list(self._users)
+
+    # Services
+    def get_services(self, service_ids):
+        with self._lock:
+            return {service_id: dict(self._services[service_id])
+                    for service_id in service_ids if service_id in self._services}
+
+    def get_service(self, service_id):
+        service = self._services.get(service_id)
+        return dict(service) if service else None
+
+    def _updated_since(self, service_ids, since, attributes):
+        services = (self._services[sid] for sid in service_ids)
+        return [project(service, attributes) for service in services
+                if not since or (service.get('updated_at') or '') > since]
+
+    def homeowner_services(self, username, attributes=None, since=None):
+        with self._lock:
+            services = self._updated_since(self._by_homeowner.get(username, ()), since, attributes)
+        services.sort(key=lambda service: service.get('updated_at') or '', reverse=True)
+        return services
+
+    def provider_services(self, username, attributes=None, since=None):
+        with self._lock:
+            services = self._updated_since(self._by_provider.get(username, ()), since, attributes)
+        if since:
+            services.sort(key=lambda service: service.get('updated_at') or '')
+        else:
+            services.sort(key=lambda service: service.get('status') or '')
+        return services
+
+    def active_services(self, role, username, statuses, attributes=None, expected=None):
+        index = self._by_homeowner if role == 'homeowner' else self._by_provider
+        with self._lock:
+            services = [project(self._services[sid], attributes) for sid in index.get(username, ())
+                        if self._services[sid].get('status') in statuses]
+        services.sort(key=lambda service: service.get('updated_at') or '', reverse=True)
+        return services
+
+    def user_services_page(self, role, username, limit, start_key=None, attributes=None):
+        index = self._by_homeowner if role == 'homeowner' else self._by_provider
+        with self._lock:
+            keys = sorted(((self._services[sid].get('updated_at') or '', sid) for sid in index.get(username, ())),
+                          reverse=True)
+            if start_key:
+                boundary = (start_key['updated_at'], start_key['service_id'])
+                keys = [key for key in keys if key < boundary]
+            page = [project(self._services[sid], attributes) for _, sid in keys[:limit]]
+            last_key = None
+            if len(keys) > limit:
+                updated_at, service_id = keys[limit - 1]
+                last_key = {'service_id': service_id, role: username, 'updated_at': updated_at}
+        return page, last_key
+
+    def open_requests(self, limit=None, start_key=None, attributes=None, created_after=None):
+        with self._lock:
+            start = 0
+            if start_key:
+                start = bisect.bisect_right(self._open, (start_key['created_at'], start_key['service_id']))
+            elif created_after:
+                # Every key for a later timestamp sorts after (created_after, '\uffff')
+                start = bisect.bisect_right(self._open, (created_after, '\uffff'))
+            end = len(self._open) if limit is None else start + limit
+            service_ids = [sid for _, sid in self._open[start:end]]
+            page = [project(self._services[sid], attributes) for sid in service_ids]
+            more = end < len(self._open)
+            last_key = None
+            if limit is not None and more and service_ids:
+                last_item = self._services[service_ids[-1]]
+                last_key = {key: last_item[key] for key in OPEN_REQUEST_KEYS}
+        return page, last_key
+
+    def scan_services(self):
+        with self._lock:
+            return [dict(service) for service in self._services.values()]
+
+    def put_service(self, service, if_absent=False):
+        with self._lock:
+            existing = self._services.get(service['service_id'])
+            if existing and if_absent:
+                raise ConditionFailed(f"Service {service['service_id']} already exists")
+            if existing:
+                self._unindex(existing)
+            self._services[service['service_id']] = dict(service)
+            self._index(service)
+            self._apply_deltas(stats_deltas(existing, service))
+
+    def update_service(self, old_service, new_service):
+        with self._lock:
+            current = self._services.get(new_service['service_id'])
+            if (current is None or current.get('status') != old_service.get('status')
+                    or current.get('updated_at') != old_service.get('updated_at')):
+                raise ConditionFailed(
+                    f"Service {new_service['service_id']} changed concurrently",
+                    dict(current) if current else None
+                )
+            self._unindex(current)
+            self._services[new_service['service_id']] = dict(new_service)
+            self._index(new_service)
+            self._apply_deltas(stats_deltas(old_service, new_service))
+
+    def update_services(self, changes):
+        results = []
+        for old_service, new_service in changes:
+            try:
+                self.update_service(old_service, new_service)
+                results.append(None)
+            except StorageError as e:
+                results.append(e)
+        return results
+
+    # Exports
+    def scan_segment(self, table, segment, total_segments, start_key=None, limit=None, attributes=None):
+        key_name = 'username' if table == 'users' else 'service_id'
+        with self._lock:
+            source = self._users if table == 'users' else self._services
+            # Keys are spread over segments by hash, as DynamoDB does
+            keys = sorted(key for key in source
+                          if zlib.crc32(key.encode()) % total_segments == segment
+                          and (not start_key or key > start_key[key_name]))
+            if limit:
+                keys = keys[:limit + 1]
+            items = [project(source[key], attributes) for key in keys[:limit or None]]
+        last_key = {key_name: keys[limit - 1]} if limit and len(keys) > limit else None
+        return items, last_key
+
+    # Stats
+    def get_stats(self, stat_ids):
+        with self._lock:
+            return {stat_id: dict(self._stats[stat_id]) for stat_id in stat_ids if stat_id in self._stats}
+
+    # Maintenance
+    def check_health(self):
+        return None
+
+    def warm_up(self):
+        return None
+
+    def backfill_open_requests(self):
+        return 0
+
+    def has_stats(self, stat_id):
+        return stat_id in self._stats
+
+    def rebuild_user_counts(self):
+        with self._lock:
+            counts = count_users(list(self._users.values()))
+            self._stats[USER_COUNTS_ID] = dict(counts, stat_id=USER_COUNTS_ID)
+        return counts
+
+    def rebuild_service_stats(self):
+        with self._lock:
+            records = rebuild_stats_records(self._services.values())
+            next_versions(records, self._stats)
+            for stat_id, record in records.items():
+                self._stats[stat_id] = dict(record, stat_id=stat_id)
+        return len(records)
+
+
+def create_storage(backend, aws, users_table, services_table, stats_table):
+    """Build the storage backend named by STORAGE_BACKEND ('dynamodb' or 'memory')"""
+    if backend == 'memory':
+        logger.info("Using in-memory storage backend")
+        return MemoryStorage()
+    if backend == 'dynamodb':
+        return DynamoDBStorage(aws, users_table, services_table, stats_table)
+    raise ValueError(f"Unknown storage backend: {backend}")
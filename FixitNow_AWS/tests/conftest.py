@@ -0,0 +1,29 @@
+import pytest
+from moto import mock_aws
+
+import app as app_module
+from bench.loadtest import create_moto_tables
+
+# Cheap hashing and no SNS; filter misses re-check the signup counter every time
+TEST_CONFIG = {
+    'TESTING': True,
+    'SECRET_KEY': 'test',
+    'SNS_TOPIC_ARN': '',
+    'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+    'USERNAME_FILTER_VERSION_SECONDS': 0
+}
+
+
+@pytest.fixture
+def memory_app():
+    return app_module.create_app(dict(TEST_CONFIG, STORAGE_BACKEND='memory'))
+
+
+@pytest.fixture(scope='module')
+def moto_app():
+    """An app on moto's DynamoDB, with capacity estimated from item sizes"""
+    with mock_aws():
+        flask_app = app_module.create_app(dict(TEST_CONFIG, STORAGE_BACKEND='dynamodb',
+                                               DYNAMODB_CAPACITY='estimated', SERVER_TIMING=True))
+        create_moto_tables(flask_app.config)
+        yield flask_app
@@ -0,0 +1,58 @@
+"""Each budgeted route's DynamoDB capacity against bench/capacity_budgets.json.
+
+Seeds moto with the data the budgets were measured on and replays the load
+test's traffic mix, one step at a time so the run is repeatable. Budgets
+are mean capacity per request over that mix. A query that turns into a
+scan, or a write that starts touching more items, fails here.
+"""
+import json
+import os
+import random
+
+import pytest
+
+from bench.loadtest import Recorder, VirtualUser, seed
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'bench', 'capacity_budgets.json')
+with open(BUDGETS_PATH) as f:
+    BUDGETS = json.load(f)
+
+SESSIONS = 8
+PROVIDER_SHARE = 0.3
+STEPS = 80
+
+
+@pytest.fixture(scope='module')
+def capacity(moto_app):
+    """Capacity per request of every route the replayed sessions called"""
+    rng = random.Random(42)
+    homeowners, providers = seed(moto_app, BUDGETS['config']['users'], BUDGETS['config']['services'], rng)
+    recorder = Recorder()
+    sessions = []
+    for _ in range(SESSIONS):
+        if rng.random() < PROVIDER_SHARE:
+            user = VirtualUser(moto_app, rng.choice(providers), 'service_provider', recorder, random.Random(rng.random()))
+        else:
+            user = VirtualUser(moto_app, rng.choice(homeowners), 'homeowner', recorder, random.Random(rng.random()))
+        user.signin()
+        user.do_dashboard()
+        sessions.append(user)
+    # Like the load test, leave out the first page loads: they warm the
+    # worker's matching index with one read of the whole backlog
+    recorder.__init__()
+
+    for _ in range(STEPS):
+        for user in sessions:
+            user.step()
+    return recorder.summary(1.0)
+
+
+@pytest.mark.parametrize('endpoint', sorted(BUDGETS['endpoints']))
+def test_route_within_capacity_budget(capacity, endpoint):
+    measured = capacity.get(endpoint)
+    assert measured is not None, f"{endpoint} was not exercised"
+    assert measured['errors'] == 0
+    budget = BUDGETS['endpoints'][endpoint]
+    assert measured['rcu_per_request'] <= budget['rcu']
+    assert measured['wcu_per_request'] <= budget['wcu']
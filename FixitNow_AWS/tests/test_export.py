@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+import app as app_module
+from export import DONE, ExportError, decode_checkpoint, encode_checkpoint, ndjson_stream, parallel_scan
+
+
+class Table:
+    """Segments of numbered rows, read a page at a time; fails once on a chosen page"""
+
+    def __init__(self, segments=4, rows=10, fail_at=None):
+        self.rows = {segment: [f'{segment}-{i:02d}' for i in range(rows)] for segment in range(segments)}
+        self.fail_at = fail_at
+
+    def scan_page(self, segment, total_segments, start_key, limit):
+        assert total_segments == len(self.rows)
+        start = int(start_key['row']) if start_key else 0
+        if (segment, start) == self.fail_at:
+            self.fail_at = None
+            raise RuntimeError('throttled')
+        rows = self.rows[segment][start:start + limit]
+        end = start + len(rows)
+        return rows, ({'row': str(end)} if end < len(self.rows[segment]) else None)
+
+    def all_rows(self):
+        return sorted(row for rows in self.rows.values() for row in rows)
+
+
+def test_parallel_scan_reads_every_row_once():
+    table = Table()
+    pages = list(parallel_scan(table.scan_page, [None] * 4, workers=2, page_size=3, buffered_pages=2))
+
+    assert sorted(row for items, _ in pages for row in items) == table.all_rows()
+    assert pages[-1][1] == [DONE] * 4
+
+
+def test_checkpoint_round_trip():
+    segments = [None, {'service_id': 'service_1'}, DONE]
+    token = encode_checkpoint('services', segments)
+
+    assert decode_checkpoint(token, 'services', 64) == segments
+
+
+@pytest.mark.parametrize('token, max_segments', [
+    (encode_checkpoint('users', [None]), 64),
+    (encode_checkpoint('services', []), 64),
+    (encode_checkpoint('services', [None, None]), 1),
+    (encode_checkpoint('services', [{'service_id': 1}]), 64),
+    (encode_checkpoint('services', ['service_1']), 64),
+    ('not a checkpoint', 64),
+])
+def test_bad_checkpoints_are_rejected(token, max_segments):
+    with pytest.raises(ValueError):
+        decode_checkpoint(token, 'services', max_segments)
+
+
+def test_failed_export_resumes_without_repeating_rows():
+    table = Table(fail_at=(2, 6))
+    lines = ''.join(ndjson_stream(parallel_scan(table.scan_page, [None] * 4, page_size=3), 'services', str))
+    lines = [json.loads(line) for line in lines.splitlines()]
+
+    assert lines[-1] == {'_error': 'Export interrupted; resume from the last checkpoint'}
+    checkpoint = [line['_checkpoint'] for line in lines if '_checkpoint' in line][-1]
+    exported = [line for line in lines if isinstance(line, str)]
+
+    segments = decode_checkpoint(checkpoint, 'services', 64)
+    assert segments[2] != DONE
+    resumed = ''.join(ndjson_stream(parallel_scan(table.scan_page, segments, page_size=3), 'services', str))
+    resumed = [json.loads(line) for line in resumed.splitlines()]
+
+    assert resumed[-1]['_complete']
+    exported += [line for line in resumed if isinstance(line, str)]
+    assert sorted(exported) == table.all_rows()
+
+
+def test_scan_failures_raise_export_error():
+    table = Table(fail_at=(0, 0))
+
+    with pytest.raises(ExportError):
+        list(parallel_scan(table.scan_page, [None] * 4, page_size=3))
+
+
+def test_export_endpoint_resumes_from_a_checkpoint(memory_app, monkeypatch):
+    monkeypatch.setattr(app_module, 'EXPORT_PAGE_SIZE', 2)
+    memory_app.config['ADMIN_TOKEN'] = 'secret'
+    with memory_app.app_context():
+        service_ids = {app_module.create_service_request('alice', 'plumbing', 'low', f'Job {i}') for i in range(12)}
+    client = memory_app.test_client()
+    headers = {'Authorization': 'Bearer secret'}
+
+    assert client.get('/api/admin/export/services').status_code == 401
+    assert client.get('/api/admin/export/services?checkpoint=nope', headers=headers).status_code == 400
+
+    response = client.get('/api/admin/export/services', headers=headers)
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[-1] == {'_complete': True, 'rows': 12}
+    assert {line['service_id'] for line in lines if 'service_id' in line} == service_ids
+
+    # Stop reading after the third checkpoint, as a dropped connection would
+    checkpoints = [index for index, line in enumerate(lines) if '_checkpoint' in line]
+    cut = checkpoints[2]
+    seen = [line['service_id'] for line in lines[:cut] if 'service_id' in line]
+    response = client.get(f"/api/admin/export/services?checkpoint={lines[cut]['_checkpoint']}", headers=headers)
+    rest = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    seen += [line['service_id'] for line in rest if 'service_id' in line]
+
+    assert sorted(seen) == sorted(service_ids)
@@ -0,0 +1,156 @@
+import matching
+from matching import MatchingEngine, rank_key
+from records import Service
+
+
+def make_service(service_id, service_type='plumbing', priority='medium', preferred_date=None,
+                 created_at='2026-01-01T09:00:00', **fields):
+    item = {
+        'service_id': service_id,
+        'homeowner': 'alice',
+        'service_type': service_type,
+        'priority': priority,
+        'status': 'pending',
+        'preferred_date': preferred_date,
+        'created_at': created_at,
+        'updated_at': created_at
+    }
+    item.update(fields)
+    return Service.from_item(item)
+
+
+class Backlog:
+    """Stands in for load_open_backlog(): the stored services and their version"""
+
+    def __init__(self, services, version=1, settled=True):
+        self.services = list(services)
+        self.version = version
+        self.settled = settled
+        self.loads = 0
+
+    def __call__(self):
+        self.loads += 1
+        return list(self.services), self.version, self.settled
+
+
+def ids(services):
+    return [service.service_id for service in services]
+
+
+def test_top_ranks_by_priority_then_date_then_age():
+    backlog = Backlog([
+        make_service('low', priority='low'),
+        make_service('undated', priority='high'),
+        make_service('later', priority='high', preferred_date='2026-02-02T00:00:00'),
+        make_service('sooner', priority='high', preferred_date='2026-02-01T00:00:00'),
+        make_service('emergency', service_type='electrical', priority='emergency'),
+        make_service('taken', priority='emergency', service_provider='bob', status='scheduled')
+    ])
+    engine = MatchingEngine(backlog)
+    engine.sync(1)
+
+    services, last_key = engine.top()
+    assert ids(services) == ['emergency', 'sooner', 'later', 'undated', 'low']
+    assert last_key is None
+
+    services, _ = engine.top(types=['plumbing', 'roofing'])
+    assert ids(services) == ['sooner', 'later', 'undated', 'low']
+
+
+def test_top_pages_with_the_last_key():
+    backlog = Backlog([make_service(f'service_{i}', created_at=f'2026-01-0{i}T09:00:00') for i in range(1, 6)])
+    engine = MatchingEngine(backlog)
+    engine.sync(1)
+
+    first, last_key = engine.top(limit=2)
+    assert ids(first) == ['service_1', 'service_2']
+    assert last_key == rank_key(first[-1])
+
+    second, last_key = engine.top(limit=2, after=last_key)
+    third, end = engine.top(limit=2, after=last_key)
+    assert ids(second) == ['service_3', 'service_4']
+    assert ids(third) == ['service_5']
+    assert end is None
+
+
+def test_sync_reloads_only_when_the_version_moves():
+    backlog = Backlog([make_service('a')])
+    engine = MatchingEngine(backlog)
+
+    engine.sync(1)
+    engine.sync(1)
+    assert backlog.loads == 1
+
+    # Another worker took the request
+    backlog.services = []
+    backlog.version = 2
+    engine.sync('2')
+    assert backlog.loads == 2
+    assert engine.top()[0] == []
+
+
+def test_applied_changes_advance_the_version():
+    backlog = Backlog([make_service('a')])
+    engine = MatchingEngine(backlog)
+    engine.sync(1)
+
+    engine.apply(None, make_service('b', priority='high'))
+    taken = make_service('a', status='scheduled', service_provider='bob', updated_at='2026-01-02T00:00:00')
+    engine.apply(make_service('a'), taken)
+
+    # The stored counter moved by the two writes this process made: no reload
+    engine.sync(3)
+    assert backlog.loads == 1
+    assert ids(engine.top()[0]) == ['b']
+    assert engine.stats()['applied'] == 2
+
+
+def test_apply_ignores_stale_images():
+    backlog = Backlog([make_service('a', priority='low', updated_at='2026-01-03T00:00:00')])
+    engine = MatchingEngine(backlog)
+    engine.sync(1)
+
+    engine.apply(make_service('a'), make_service('a', priority='high', updated_at='2026-01-02T00:00:00'))
+
+    assert engine.top()[0][0].priority == 'low'
+
+
+def test_unsettled_load_is_repeated_after_settling():
+    backlog = Backlog([], settled=False)
+    engine = MatchingEngine(backlog, settle_seconds=0)
+
+    engine.sync(1)
+    assert not engine.settled()
+
+    backlog.services = [make_service('a')]
+    backlog.settled = True
+    engine.sync(1)
+    assert backlog.loads == 2
+    assert engine.settled()
+    assert ids(engine.top()[0]) == ['a']
+
+
+def test_reload_from_a_lagging_index_keeps_local_changes():
+    backlog = Backlog([], settled=False)
+    engine = MatchingEngine(backlog, settle_seconds=0)
+    engine.sync(1)
+
+    engine.apply(None, make_service('mine'))
+    # The index has not caught up with the write yet
+    backlog.version = 5
+    engine.sync(5)
+    assert ids(engine.top()[0]) == ['mine']
+
+
+def test_settled_reload_does_not_bring_back_taken_requests(monkeypatch):
+    clock = iter(range(100, 200))
+    monkeypatch.setattr(matching.time, 'monotonic', lambda: next(clock))
+    backlog = Backlog([])
+    engine = MatchingEngine(backlog)
+    engine.sync(1)
+
+    engine.apply(None, make_service('mine'))
+    # Another worker has taken it since; a settled load started later is the truth
+    backlog.version = 3
+    engine.sync(3)
+    assert engine.top()[0] == []
@@ -0,0 +1,96 @@
+from decimal import Decimal
+
+import pytest
+
+from app import TransitionError, build_status_change
+from storage import (OPEN_REQUESTS_STATS_ID, VERSION_COUNTER, merge_deltas, rebuild_stats_records,
+                     stats_deltas)
+
+PENDING = {
+    'service_id': 'service_1',
+    'homeowner': 'alice',
+    'service_type': 'plumbing',
+    'priority': 'high',
+    'status': 'pending',
+    'open_request': 'open',
+    'created_at': '2026-01-01T09:00:00',
+    'updated_at': '2026-01-01T09:00:00'
+}
+SCHEDULED = dict(PENDING, status='scheduled', service_provider='bob', open_request=None)
+COMPLETED = dict(SCHEDULED, status='completed', cost=Decimal('120.50'), duration=Decimal('2.5'))
+
+
+def test_new_request_counts_for_homeowner_and_backlog():
+    deltas = stats_deltas(None, PENDING)
+
+    assert deltas == {
+        OPEN_REQUESTS_STATS_ID: {VERSION_COUNTER: 1, 'count': 1},
+        'user#alice': {VERSION_COUNTER: 1, 'pending': 1, 'total_requests': 1}
+    }
+
+
+def test_accepting_moves_request_from_backlog_to_provider():
+    deltas = stats_deltas(PENDING, SCHEDULED)
+
+    assert deltas[OPEN_REQUESTS_STATS_ID] == {VERSION_COUNTER: 1, 'count': -1}
+    # Unchanged counters are left out, but the version still moves
+    assert deltas['user#alice'] == {VERSION_COUNTER: 1, 'pending': -1, 'scheduled': 1}
+    assert deltas['user#bob'] == {VERSION_COUNTER: 1, 'scheduled': 1, 'total_jobs': 1}
+
+
+def test_completion_adds_cost_and_hours():
+    deltas = stats_deltas(SCHEDULED, COMPLETED)
+
+    assert deltas['user#alice'] == {VERSION_COUNTER: 1, 'scheduled': -1, 'completed': 1,
+                                    'total_spent': Decimal('120.50')}
+    assert deltas['user#bob'] == {VERSION_COUNTER: 1, 'scheduled': -1, 'completed': 1,
+                                  'total_earnings': Decimal('120.50'), 'total_hours': Decimal('2.5')}
+    assert OPEN_REQUESTS_STATS_ID not in deltas
+
+
+def test_rating_only_touches_rating_counters():
+    deltas = stats_deltas(COMPLETED, dict(COMPLETED, rating=4))
+
+    for stat_id in ('user#alice', 'user#bob'):
+        assert deltas[stat_id] == {VERSION_COUNTER: 1, 'rating_sum': 4, 'rating_count': 1}
+
+
+def test_deltas_replay_to_the_rebuilt_records():
+    history = [(None, PENDING), (PENDING, SCHEDULED), (SCHEDULED, COMPLETED)]
+    merged = merge_deltas(stats_deltas(old, new) for old, new in history)
+    rebuilt = rebuild_stats_records([COMPLETED])
+
+    assert merged.pop(OPEN_REQUESTS_STATS_ID) == {VERSION_COUNTER: 2, 'count': 0}
+    assert rebuilt.pop(OPEN_REQUESTS_STATS_ID) == {'count': 0}
+    assert set(merged) == set(rebuilt)
+    for stat_id, record in rebuilt.items():
+        applied = {counter: value for counter, value in merged[stat_id].items() if value}
+        assert applied.pop(VERSION_COUNTER) == (3 if stat_id == 'user#alice' else 2)
+        assert applied == {counter: value for counter, value in record.items() if value}
+
+
+def test_status_change_builds_the_new_image():
+    new_service = build_status_change(PENDING, 'scheduled', service_provider='bob', cost=80.0, rating=None)
+
+    assert new_service['status'] == 'scheduled'
+    assert new_service['service_provider'] == 'bob'
+    assert new_service['cost'] == Decimal('80.0')
+    assert new_service['updated_at'] > PENDING['updated_at']
+    # None means "leave as is", and assigned requests leave the open index
+    assert 'rating' not in new_service
+    assert 'open_request' not in new_service
+    assert PENDING['status'] == 'pending' and 'open_request' in PENDING
+
+
+@pytest.mark.parametrize('old_status, status', [
+    ('pending', 'completed'),
+    ('pending', 'in_progress'),
+    ('completed', 'pending'),
+    ('cancelled', 'scheduled'),
+])
+def test_disallowed_transitions_are_rejected(old_status, status):
+    with pytest.raises(TransitionError) as error:
+        build_status_change(dict(PENDING, status=old_status), status)
+
+    assert error.value.http_status == 400
+    assert error.value.current.status == old_status
@@ -0,0 +1,108 @@
+import pytest
+
+import app as app_module
+from app import (create_service_request, create_user, dashboard_stat_ids, decode_cursor, encode_cursor,
+                 get_service_changes, get_user_by_username, read_list_versions, sync_cursor,
+                 update_service_status)
+
+
+@pytest.fixture
+def dashboard(memory_app, monkeypatch):
+    """A signed-up homeowner and provider. List versions settle as soon as
+    they are written (changed_at is rounded, so it may be just ahead of now)
+    and deltas do not overlap, so each one holds exactly the latest changes.
+    """
+    monkeypatch.setattr(app_module, 'LIST_ETAG_SETTLE_SECONDS', -1)
+    monkeypatch.setattr(app_module, 'DELTA_OVERLAP_SECONDS', 0)
+    with memory_app.app_context():
+        create_user('alice', 'password123', 'homeowner')
+        create_user('bob', 'password123', 'service_provider')
+        yield get_user_by_username('alice'), get_user_by_username('bob')
+
+
+def cursor_for(user):
+    versions, settled = read_list_versions(dashboard_stat_ids(user))
+    assert settled
+    return sync_cursor(user, versions)
+
+
+def test_cursor_records_the_list_versions(dashboard):
+    alice, bob = dashboard
+    create_service_request('alice', 'plumbing', 'high', 'Leaking tap')
+
+    state = decode_cursor(cursor_for(bob), app_module.SYNC_CURSOR_KEYS)
+    assert state['user_version'] == '0'
+    assert state['open_version'] == '1'
+    assert decode_cursor(cursor_for(alice), app_module.SYNC_CURSOR_KEYS)['open_version'] == ''
+
+
+def test_unchanged_versions_return_an_empty_delta(dashboard):
+    alice, bob = dashboard
+    create_service_request('alice', 'plumbing', 'high', 'Leaking tap')
+
+    for user in (alice, bob):
+        cursor = cursor_for(user)
+        assert get_service_changes(user, cursor) == ([], None, cursor)
+
+
+def test_homeowner_sees_their_changed_services(dashboard):
+    alice, _ = dashboard
+    cursor = cursor_for(alice)
+    service_id = create_service_request('alice', 'plumbing', 'high', 'Leaking tap')
+
+    services, open_ids, next_cursor = get_service_changes(alice, cursor)
+    assert [service.service_id for service in services] == [service_id]
+    assert open_ids is None
+    assert next_cursor != cursor
+    assert get_service_changes(alice, next_cursor) == ([], None, next_cursor)
+
+
+def test_provider_learns_about_new_and_taken_requests(dashboard):
+    _, bob = dashboard
+    taken = create_service_request('alice', 'plumbing', 'high', 'Leaking tap')
+    cursor = cursor_for(bob)
+
+    added = create_service_request('alice', 'electrical', 'low', 'Flickering light')
+    services, open_ids, cursor = get_service_changes(bob, cursor)
+    assert [service.service_id for service in services] == [added]
+    assert sorted(open_ids) == sorted([taken, added])
+
+    # Accepted by another provider: it drops out of the open ids
+    update_service_status(taken, 'scheduled', service_provider='carol')
+    _, open_ids, _ = get_service_changes(bob, cursor)
+    assert open_ids == [added]
+
+
+def test_provider_sees_their_own_jobs_change(dashboard):
+    _, bob = dashboard
+    service_id = create_service_request('alice', 'plumbing', 'high', 'Leaking tap')
+    update_service_status(service_id, 'scheduled', service_provider='bob')
+    cursor = cursor_for(bob)
+
+    update_service_status(service_id, 'in_progress')
+    services, open_ids, _ = get_service_changes(bob, cursor)
+    assert [(service.service_id, service.status) for service in services] == [(service_id, 'in_progress')]
+    assert open_ids is None
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', 'e30', encode_cursor({'page': 'x'})])
+def test_foreign_cursors_are_rejected(dashboard, cursor):
+    alice, _ = dashboard
+    with pytest.raises(ValueError):
+        get_service_changes(alice, cursor)
+
+
+def test_get_services_answers_bad_cursors_with_400(memory_app):
+    with memory_app.app_context():
+        create_user('alice', 'password123', 'homeowner')
+    client = memory_app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 'alice'
+
+    response = client.get('/api/get-services?since=e30')
+    assert response.status_code == 400
+
+    cursor = client.get('/api/get-services').get_json()['next_cursor']
+    data = client.get(f'/api/get-services?since={cursor}').get_json()
+    assert data['delta'] is True
+    assert data['services'] == []
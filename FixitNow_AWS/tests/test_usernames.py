@@ -0,0 +1,141 @@
+import threading
+
+from usernames import BloomFilter, UsernameFilter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    names = [f'user_{i}' for i in range(1000)]
+    for name in names:
+        bloom.add(name)
+
+    assert all(name in bloom for name in names)
+
+
+def test_bloom_filter_false_positives_stay_near_the_error_rate():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f'user_{i}')
+
+    false_positives = sum(f'other_{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+
+
+class Users:
+    """Stands in for storage: registered usernames and the signup counter"""
+
+    def __init__(self, names=()):
+        self.names = set(names)
+        self.scans = 0
+
+    def load_usernames(self):
+        self.scans += 1
+        return list(self.names)
+
+    def load_version(self):
+        return len(self.names)
+
+    def sign_up(self, name):
+        self.names.add(name)
+
+
+def built_filter(users, **kwargs):
+    kwargs.setdefault('refresh_seconds', 300)
+    username_filter = UsernameFilter(users.load_usernames, load_version=users.load_version,
+                                     version_seconds=0, **kwargs)
+    assert username_filter.rebuild()
+    return username_filter
+
+
+def test_lookups_are_needed_until_the_filter_is_built():
+    scanned = threading.Event()
+    release = threading.Event()
+
+    def load_usernames():
+        scanned.set()
+        release.wait(5)
+        return ['alice']
+
+    username_filter = UsernameFilter(load_usernames, refresh_seconds=300)
+    # The first check starts the build in the background and does not wait for it
+    assert username_filter.might_exist('carol')
+    assert scanned.wait(5)
+    assert username_filter.might_exist('dave')
+    release.set()
+
+
+def test_misses_are_definite_and_hits_are_looked_up():
+    users = Users(['alice', 'bob'])
+    username_filter = built_filter(users)
+
+    assert username_filter.might_exist('alice')
+    assert not username_filter.might_exist('carol')
+    stats = username_filter.stats()
+    assert stats['definite_misses'] == 1
+    assert stats['lookups'] == 1
+    assert stats['version'] == 2
+
+
+def test_local_signups_are_added():
+    users = Users(['alice'])
+    username_filter = built_filter(users)
+
+    users.sign_up('carol')
+    username_filter.add('carol')
+
+    assert username_filter.might_exist('carol')
+
+
+def test_signups_on_other_workers_fall_through_to_lookups():
+    users = Users(['alice'])
+    username_filter = built_filter(users, min_rebuild_seconds=3600)
+
+    # Another worker registers carol; this filter never saw it
+    users.sign_up('carol')
+
+    assert username_filter.might_exist('carol')
+    assert username_filter.might_exist('dave')
+    stats = username_filter.stats()
+    assert stats['stale_misses'] == 2
+    assert stats['definite_misses'] == 0
+    assert stats['latest_version'] == 2
+
+
+def test_rebuild_catches_up_with_the_shared_version():
+    users = Users(['alice'])
+    username_filter = built_filter(users)
+    users.sign_up('carol')
+
+    assert username_filter.rebuild()
+
+    assert username_filter.might_exist('carol')
+    assert not username_filter.might_exist('dave')
+    assert username_filter.stats()['version'] == 2
+
+
+def test_names_added_during_a_rebuild_are_kept():
+    users = Users(['alice'])
+    username_filter = built_filter(users)
+
+    def load_usernames():
+        # A signup lands on this worker while the scan runs
+        username_filter.add('carol')
+        return ['alice']
+
+    username_filter.load_usernames = load_usernames
+    assert username_filter.rebuild()
+
+    assert username_filter.might_exist('carol')
+
+
+def test_failed_version_checks_fall_back_to_lookups():
+    users = Users(['alice'])
+    username_filter = built_filter(users, min_rebuild_seconds=3600)
+
+    def broken():
+        raise RuntimeError('stats unavailable')
+
+    username_filter.load_version = broken
+
+    assert username_filter.might_exist('dave')
+    assert username_filter.stats()['version_failures'] == 1
@@ -0,0 +1,199 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Membership tests never give false negatives; false positives occur at
+    roughly ``error_rate`` once ``capacity`` values have been added.
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, value):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        positions = self._positions(value)
+        # Byte updates are read-modify-write; concurrent adds must not lose bits
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class UsernameFilter:
+    """Per-process Bloom filter of registered usernames for availability checks.
+
+    ``might_exist`` returning False is a definite "available" as far as this
+    process knows; True means the caller must look the user up. The filter is
+    built in the background from ``load_usernames`` on first use and rebuilt
+    every ``refresh_seconds``; names added while a rebuild runs are carried
+    into the new filter.
+
+    Other workers' signups are caught through ``load_version``, a shared
+    counter every signup bumps (read before each rebuild's scan, and on a
+    miss at most every ``version_seconds``). While it is ahead of the
+    version the filter was built from, misses are looked up too and the
+    filter is rebuilt, at most every ``min_rebuild_seconds``. Local signups
+    do not advance the filter's version, since a signup may or may not be
+    counted in the version a concurrent rebuild reads: undercounting only
+    costs lookups, overcounting would hide another worker's signup.
+    """
+
+    def __init__(self, load_usernames, refresh_seconds=300, error_rate=0.01, headroom=2.0,
+                 load_version=None, version_seconds=1.0, min_rebuild_seconds=10.0):
+        self.load_usernames = load_usernames
+        self.refresh_seconds = refresh_seconds
+        self.error_rate = error_rate
+        self.headroom = headroom
+        self.load_version = load_version
+        self.version_seconds = version_seconds
+        self.min_rebuild_seconds = min_rebuild_seconds
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._built_at = 0.0
+        self._count = 0
+        self._pid = None
+        self._pending = None
+        # Shared version the filter was built from, and the last one read
+        self._version = None
+        self._latest = None
+        self._checked_at = None
+        self._counters = {'definite_misses': 0, 'stale_misses': 0, 'lookups': 0, 'rebuilds': 0,
+                          'rebuild_failures': 0, 'version_failures': 0}
+
+    def might_exist(self, username):
+        self._maybe_refresh()
+        bloom = self._bloom
+        if bloom is not None and username not in bloom:
+            if not self._behind():
+                self._bump('definite_misses')
+                return False
+            # Someone signed up since the filter was built, maybe on another worker
+            self._bump('stale_misses')
+            self._maybe_refresh()
+        self._bump('lookups')
+        return True
+
+    def _behind(self):
+        """Whether the shared version may count signups the filter has not seen"""
+        if self.load_version is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            due = self._checked_at is None or now - self._checked_at >= self.version_seconds
+            if due:
+                # One reader per interval; the others use the last version read
+                self._checked_at = now
+        if due:
+            try:
+                latest = self.load_version()
+            except Exception as e:
+                logger.warning(f"Username filter version check failed: {e}")
+                latest = None
+                self._bump('version_failures')
+            with self._lock:
+                self._latest = latest
+        with self._lock:
+            return self._version is None or self._latest is None or self._latest > self._version
+
+    def add(self, username):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(username)
+                self._count += 1
+            if self._pending is not None:
+                self._pending.append(username)
+
+    def _bump(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _refresh_due(self):
+        age = time.monotonic() - self._built_at
+        if age >= self.refresh_seconds:
+            return True
+        # Set by _behind(); the version is not read here, on every check
+        behind = self.load_version is not None and (
+            self._version is None or self._latest is None or self._latest > self._version)
+        return behind and age >= self.min_rebuild_seconds
+
+    def _maybe_refresh(self):
+        if self._pid == os.getpid() and (self._pending is not None or not self._refresh_due()):
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # A rebuild running in the parent does not exist in this process
+                self._pid = os.getpid()
+                self._pending = None
+            elif self._pending is not None or not self._refresh_due():
+                return
+            self._pending = []
+        threading.Thread(target=self.rebuild, name='username-filter', daemon=True).start()
+
+    def rebuild(self):
+        """Build a fresh filter from storage; the old one keeps serving meanwhile"""
+        started = time.monotonic()
+        with self._lock:
+            if self._pending is None:
+                self._pending = []
+            self._pid = os.getpid()
+        try:
+            # Read first: signups the scan sees beyond it only cost lookups
+            version = self.load_version() if self.load_version is not None else None
+            usernames = self.load_usernames()
+        except Exception as e:
+            logger.warning(f"Username filter rebuild failed: {e}")
+            with self._lock:
+                self._pending = None
+                # Try again after a short pause rather than on every request
+                self._built_at = started - self.refresh_seconds + min(30.0, self.refresh_seconds)
+                self._counters['rebuild_failures'] += 1
+            return False
+
+        bloom = BloomFilter(int(len(usernames) * self.headroom) + 1024, self.error_rate)
+        for username in usernames:
+            bloom.add(username)
+        with self._lock:
+            for username in self._pending:
+                bloom.add(username)
+            self._count = len(usernames) + len(self._pending)
+            self._bloom = bloom
+            self._built_at = started
+            self._pending = None
+            self._version = version
+            if version is not None and (self._latest is None or self._latest < version):
+                self._latest = version
+            self._counters['rebuilds'] += 1
+        logger.info(f"Username filter rebuilt with {len(usernames)} names in {(time.monotonic() - started) * 1000:.0f}ms")
+        return True
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['names'] = self._count
+            stats['bits'] = self._bloom.size if self._bloom is not None else 0
+            stats['age_seconds'] = round(time.monotonic() - self._built_at, 1) if self._bloom is not None else None
+            stats['version'] = self._version
+            stats['latest_version'] = self._latest
+        return stats